@@ -0,0 +1,24 @@
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from app.core.auth import get_current_user
+from app.core.config import settings
+from app.db.models import User
+from app.db.session import get_session
+from app.services.analytics import analyze_cohort
+
+router = APIRouter()
+
+@router.get("/analytics/cohort")
+async def cohort_analytics(
+    user_id: List[int] = Query(...),
+    current_user: User = Depends(get_current_user),
+    session=Depends(get_session)
+):
+    # Admins only: nothing links teachers to their students yet, so a teacher
+    # could otherwise read any student's results
+    if current_user.role != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    if len(user_id) > settings.ANALYTICS_MAX_USERS:
+        raise HTTPException(status_code=400, detail=f"Request at most {settings.ANALYTICS_MAX_USERS} users at a time")
+    results = await analyze_cohort(session, user_id)
+    return {"users": results}
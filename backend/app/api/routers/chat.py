@@ -1,19 +1,38 @@
-from fastapi import APIRouter, Depends
+import asyncio
+import contextlib
+import json
+import time
+from typing import Any, Dict, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect, status
 from pydantic import BaseModel
-from app.services.chat import get_chat_service, ChatService
-from app.core.auth import get_current_user
+from app.db.session import get_session
+from app.services.chat import get_chat_service, ChatService, ChatSession
+from app.services.chat_log import get_chat_history
+from app.core.auth import get_current_user, user_from_token
+from app.core.config import settings
+from app.core.metrics import errors, registry
+from app.core.ratelimit import LLMOverloaded, rate_limit, rate_limiter
+from app.core.resilience import CircuitOpen
+from app.core.responses import FastJSONResponse, dumps
 from app.db.models import User
 
 router = APIRouter()
 
+# Open WebSocket chat connections in this worker
+_connections = 0
+
+@registry.collector("chat_ws_connections", "gauge", "Open WebSocket chat connections.")
+def _connection_samples():
+    yield "chat_ws_connections", {}, _connections
+
 class ChatRequest(BaseModel):
     message: str
 
 class ChatHistoryRequest(BaseModel):
     limit: int = 20
-    offset: int = 0
+    before: Optional[str] = None
 
-@router.post("/chat")
+@router.post("/chat", dependencies=[Depends(rate_limit("chat"))])
 async def chat(
     req: ChatRequest, 
     current_user: User = Depends(get_current_user),
@@ -24,10 +43,136 @@ async def chat(
 
 @router.get("/chat/history")
 async def chat_history(
-    limit: int = 20, 
-    offset: int = 0,
-    current_user: User = Depends(get_current_user)
+    limit: int = Query(20, ge=1, le=100),
+    before: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+    session=Depends(get_session)
 ):
-    # In a real implementation, you'd query the chat history from the database
-    # This is a placeholder
-    return {"history": []}
\ No newline at end of file
+    try:
+        history = await get_chat_history(session, current_user.id, limit, before)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # Plain dicts: skip jsonable_encoder
+    return FastJSONResponse(history)
+
+async def _send(websocket: WebSocket, message: Dict[str, Any]):
+    """Send a frame, disconnecting clients that stop reading instead of buffering for them."""
+    try:
+        await asyncio.wait_for(websocket.send_text(dumps(message).decode()), settings.CHAT_WS_SEND_TIMEOUT)
+    except asyncio.TimeoutError:
+        reason = "Client is not reading"
+        # Tell the client why before the handler drops the connection
+        try:
+            await asyncio.wait_for(
+                websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=reason), settings.CHAT_WS_SEND_TIMEOUT
+            )
+        except Exception as e:
+            print(f"Error closing unresponsive chat socket: {e}")
+        raise WebSocketDisconnect(code=status.WS_1008_POLICY_VIOLATION, reason=reason)
+
+async def _reply(websocket: WebSocket, chat: ChatSession, chat_service: ChatService, message: str):
+    try:
+        await rate_limiter.check("chat", chat.user.id)
+    except HTTPException as e:
+        await _send(websocket, {
+            "type": "error", "detail": e.detail, "retry_after": int(e.headers["Retry-After"])
+        })
+        return
+    
+    try:
+        async with contextlib.aclosing(chat_service.stream_chat_response(chat, message)) as chunks:
+            async for chunk in chunks:
+                await _send(websocket, {"type": "token", "text": chunk})
+    except WebSocketDisconnect:
+        raise
+    except LLMOverloaded as e:
+        await _send(websocket, {
+            "type": "error",
+            "detail": "The tutor is busy right now, please try again shortly",
+            "retry_after": round(e.retry_after),
+        })
+        return
+    except CircuitOpen as e:
+        await _send(websocket, {
+            "type": "error",
+            "detail": "The tutor is temporarily unavailable, please try again shortly",
+            "retry_after": max(1, round(e.retry_after)),
+        })
+        return
+    except Exception as e:
+        print(f"Error streaming chat reply: {e}")
+        errors.labels("chat_ws").inc()
+        await _send(websocket, {"type": "error", "detail": "Could not generate a reply"})
+        return
+    await _send(websocket, {"type": "done"})
+
+async def _serve(websocket: WebSocket, chat: ChatSession, chat_service: ChatService):
+    """
+    Handle one message at a time; frames sent meanwhile wait in the server's
+    receive buffer, which bounds what a client can queue up.
+    """
+    last_seen = time.monotonic()
+    while True:
+        try:
+            text = await asyncio.wait_for(websocket.receive_text(), settings.CHAT_WS_PING_INTERVAL)
+        except asyncio.TimeoutError:
+            if time.monotonic() - last_seen >= settings.CHAT_WS_IDLE_TIMEOUT:
+                await websocket.close(code=status.WS_1001_GOING_AWAY)
+                return
+            await _send(websocket, {"type": "ping"})
+            continue
+        last_seen = time.monotonic()
+        
+        try:
+            data = json.loads(text)
+        except ValueError:
+            data = None
+        kind = data.get("type") if isinstance(data, dict) else None
+        if kind == "pong":
+            continue
+        if kind == "ping":
+            await _send(websocket, {"type": "pong"})
+            continue
+        message = data.get("message") if kind == "message" else None
+        if not isinstance(message, str) or not message.strip():
+            await _send(websocket, {"type": "error", "detail": 'Expected {"type": "message", "message": "..."}'})
+            continue
+        await _reply(websocket, chat, chat_service, message)
+
+@router.websocket("/chat/ws")
+async def chat_ws(websocket: WebSocket, chat_service: ChatService = Depends(get_chat_service)):
+    """
+    Chat over one authenticated connection.
+    
+    Authenticate with ?token=<access token> (or an Authorization header). Send
+    {"type": "message", "message": ...}; the reply arrives as "token" frames
+    followed by "done", or an "error" frame. The server sends "ping" when the
+    connection is quiet; clients answer with "pong" to stay connected.
+    """
+    global _connections
+    if _connections >= settings.CHAT_WS_MAX_CONNECTIONS:
+        # Closing before accept() fails the handshake with HTTP 403, so accept
+        # first: the client sees 1013 and should retry elsewhere or later
+        await websocket.accept()
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+        return
+    
+    _connections += 1
+    try:
+        token = websocket.query_params.get("token")
+        authorization = websocket.headers.get("authorization", "")
+        if not token and authorization.lower().startswith("bearer "):
+            token = authorization[7:]
+        try:
+            user = await user_from_token(token or "")
+        except HTTPException:
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+            return
+        
+        await websocket.accept()
+        chat = await chat_service.open_session(user)
+        await _serve(websocket, chat, chat_service)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        _connections -= 1
@@ -1,6 +1,7 @@
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, HTTPException, Query
 from typing import Optional, List
-from app.services.college import search_colleges, search_scholarships
+from app.core.responses import FastJSONResponse
+from app.services.college import search_colleges
 
 router = APIRouter()
 
@@ -12,7 +13,8 @@ async def colleges(
     country: Optional[str] = None
 ):
     results = await search_colleges(q, min_sat, max_tuition, country)
-    return {"colleges": results}
+    # Plain dicts: skip jsonable_encoder
+    return FastJSONResponse({"colleges": results})
 
 @router.get("/colleges/{college_id}")
 async def get_college(college_id: int):
@@ -21,14 +23,5 @@ async def get_college(college_id: int):
     from app.services.college import COLLEGES
     for college in COLLEGES:
         if college["id"] == college_id:
-            return college
-    return {"detail": "College not found"}, 404
-
-@router.get("/scholarships")
-async def scholarships(
-    q: Optional[str] = None,
-    min_amount: Optional[int] = None,
-    country: Optional[str] = None
-):
-    results = await search_scholarships(q, min_amount, country)
-    return {"scholarships": results}
\ No newline at end of file
+            return FastJSONResponse(college)
+    raise HTTPException(status_code=404, detail="College not found")
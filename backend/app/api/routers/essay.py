@@ -1,18 +1,97 @@
 
-from fastapi import APIRouter, Depends
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from app.services.gemini import generate_response
-from app.db.session import get_session
+from app.core.auth import get_current_user
+from app.core.config import settings
+from app.core.ratelimit import rate_limit
+from app.core.responses import dumps
 from app.db import models
+from app.services.essay_batch import SchedulerFull, submit_batch
+from app.services.jobs import job_queue
+# Importing the essay service registers its job handlers
+from app.services import essay as essay_service  # noqa: F401
 
 router = APIRouter()
 
 class EssayRequest(BaseModel):
     content: str
+    essay_type: str = "college_app"
 
-@router.post("/essay")
-async def essay_feedback(req: EssayRequest, session=Depends(get_session)):
-    prompt = f"Provide detailed feedback on the following SAT essay:\n{req.content}"
-    feedback = await generate_response(prompt)
-    # persist if needed
-    return {"feedback": feedback}
+class CVRequest(BaseModel):
+    content: str
+
+class BatchEssay(BaseModel):
+    id: Optional[str] = None  # Defaults to the essay's position in the batch
+    content: str
+
+class EssayBatchRequest(BaseModel):
+    essays: List[BatchEssay]
+    essay_type: str = "college_app"
+
+@router.post("/essay", status_code=status.HTTP_202_ACCEPTED, dependencies=[Depends(rate_limit("essay"))])
+async def essay_feedback(req: EssayRequest, current_user: models.User = Depends(get_current_user)):
+    job_id = await job_queue.submit(
+        "essay", {"content": req.content, "essay_type": req.essay_type}, current_user.id
+    )
+    return {"job_id": job_id, "status": "queued"}
+
+@router.post("/essay/cv", status_code=status.HTTP_202_ACCEPTED, dependencies=[Depends(rate_limit("essay"))])
+async def cv_feedback(req: CVRequest, current_user: models.User = Depends(get_current_user)):
+    job_id = await job_queue.submit("cv", {"content": req.content}, current_user.id)
+    return {"job_id": job_id, "status": "queued"}
+
+@router.get("/essay/jobs/{job_id}")
+async def essay_job(
+    job_id: str,
+    wait: float = Query(0, ge=0, le=30),
+    current_user: models.User = Depends(get_current_user)
+):
+    # Long-poll: with wait > 0 the response is held until the job finishes or wait expires
+    job = await job_queue.wait(job_id, wait)
+    if not job or job["user_id"] != current_user.id:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "result": job["result"],
+        "error": job["error"] if job["status"] == "failed" else None,
+    }
+
+@router.post("/essay/batch", dependencies=[Depends(rate_limit("essay_batch"))])
+async def essay_batch(req: EssayBatchRequest, current_user: models.User = Depends(get_current_user)):
+    """
+    Score a class set of essays, streaming one NDJSON line per essay as it completes.
+    
+    The first line describes the batch; identical essays are scored once and
+    reported with duplicate_of.
+    """
+    if current_user.role not in ("teacher", "admin"):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Teacher access required")
+    if not 0 < len(req.essays) <= settings.ESSAY_BATCH_MAX_ESSAYS:
+        raise HTTPException(status_code=400, detail=f"Submit 1 to {settings.ESSAY_BATCH_MAX_ESSAYS} essays")
+    essays = [(essay.id or str(i), essay.content) for i, essay in enumerate(req.essays)]
+    if len({essay_id for essay_id, _ in essays}) != len(essays):
+        raise HTTPException(status_code=400, detail="Essay ids must be unique")
+    
+    try:
+        batch = submit_batch(current_user.id, essays, req.essay_type)
+    except SchedulerFull:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many essays are waiting to be scored, please try again shortly",
+            headers={"Retry-After": "30"},
+        )
+    
+    async def lines():
+        try:
+            yield dumps({"type": "batch", "essays": batch.essays, "unique": len(batch.futures)}) + b"\n"
+            async for result in batch.results():
+                yield dumps({"type": "result", **result}) + b"\n"
+        finally:
+            # Client gone: drop the essays that have not started
+            batch.cancel()
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
@@ -0,0 +1,79 @@
+import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel, conint
+from typing import Optional
+from app.core.auth import get_current_user
+from app.core.ratelimit import rate_limit
+from app.db.models import User
+from app.db.session import get_session
+from app.services import flashcards
+from app.utils.generators import generate_flashcards
+
+router = APIRouter()
+
+class Review(BaseModel):
+    quality: conint(ge=0, le=5)  # 0 = forgot, 5 = perfect recall
+
+async def _generate_deck(topic: str, subtopic: Optional[str], num_cards: int):
+    # Shared decks are stored, so never persist placeholder cards
+    return await generate_flashcards(topic, subtopic, num_cards, fallback=False)
+
+@router.post("/flashcards/decks/{topic}", dependencies=[Depends(rate_limit("flashcards"))])
+async def study_deck(
+    topic: str,
+    subtopic: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+    session=Depends(get_session)
+):
+    """Add a topic's deck (generated once, shared by everyone) to the user's reviews."""
+    # Differently typed spellings of a topic share one deck
+    try:
+        topic, subtopic = flashcards.normalize_topic(topic), flashcards.normalize_topic(subtopic)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not topic:
+        raise HTTPException(status_code=400, detail="Topic is required")
+    
+    try:
+        deck = await flashcards.get_or_create_deck(session, topic, subtopic, _generate_deck)
+    except Exception as e:
+        print(f"Error generating flashcard deck: {e}")
+        raise HTTPException(status_code=503, detail="Flashcards are unavailable, please retry later")
+    
+    cards = await flashcards.deck_cards(session, deck.id)
+    added = await flashcards.enroll(session, current_user.id, cards, datetime.datetime.utcnow())
+    await session.commit()
+    return {
+        "id": deck.id,
+        "topic": deck.topic,
+        "subtopic": deck.subtopic or None,
+        "cards": [{"id": card.id, "front": card.front, "back": card.back} for card in cards],
+        "added": added,
+    }
+
+@router.get("/flashcards/due")
+async def due_flashcards(
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(get_current_user),
+    session=Depends(get_session)
+):
+    return await flashcards.due_cards(session, current_user.id, datetime.datetime.utcnow(), limit)
+
+@router.post("/flashcards/{card_id}/review")
+async def review_flashcard(
+    card_id: int,
+    review: Review,
+    current_user: User = Depends(get_current_user),
+    session=Depends(get_session)
+):
+    state = await flashcards.review_card(session, current_user.id, card_id, review.quality, datetime.datetime.utcnow())
+    if state is None:
+        raise HTTPException(status_code=404, detail="Card is not in your reviews")
+    await session.commit()
+    return {
+        "id": card_id,
+        "due_at": state.due_at.isoformat(),
+        "interval_days": state.interval_days,
+        "ease": round(state.ease, 2),
+        "repetitions": state.repetitions,
+    }
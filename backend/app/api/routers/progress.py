@@ -0,0 +1,11 @@
+from fastapi import APIRouter, Depends
+from app.core.auth import get_current_user
+from app.core.ratelimit import rate_limit
+from app.db.models import User
+from app.services.feedback import generate_progress_report
+
+router = APIRouter()
+
+@router.get("/progress", dependencies=[Depends(rate_limit("progress"))])
+async def progress_report(current_user: User = Depends(get_current_user)):
+    return await generate_progress_report(current_user.id)
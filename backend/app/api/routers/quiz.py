@@ -1,10 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from pydantic import BaseModel
 from typing import List, Dict, Optional
 from sqlalchemy.future import select
 from app.db.session import get_session
 from app.db import models
 from app.core.auth import get_current_user
+from app.core.cache import cached_response, catalog_version, quiz_body_cache
+from app.core.ratelimit import LLMOverloaded, rate_limit
+from app.core.resilience import CircuitOpen
+from app.core.responses import RawJSONResponse, dumps
+from app.core.tracing import tracer
+from app.services import adaptive
+from app.services.progress import record_quiz_result
+from app.utils.generators import generate_quiz_question
 import json
 
 router = APIRouter()
@@ -30,43 +38,86 @@ class QuizResult(BaseModel):
     correct_answers: Dict[int, int]
     feedback: Dict[int, str]
 
+class AdaptiveQuestion(BaseModel):
+    id: int
+    prompt: str
+    choices: List[str]
+    topic: str
+    ability: float
+    standard_error: Optional[float]
+    responses: int
+    complete: bool
+
+class AdaptiveAnswer(BaseModel):
+    question_id: int
+    answer: int  # selected_choice_index
+
+class AdaptiveResult(BaseModel):
+    correct: bool
+    correct_answer: int
+    topic: str
+    ability: float
+    standard_error: Optional[float]
+    responses: int
+    complete: bool
+
 @router.get("/quizzes", response_model=List[dict])
 async def list_quizzes(session=Depends(get_session)):
-    result = await session.execute(select(models.Quiz))
+    # Bank quizzes only hold generated adaptive questions
+    result = await session.execute(
+        select(models.Quiz).where(models.Quiz.difficulty.is_distinct_from(models.BANK_DIFFICULTY))
+    )
     quizzes = result.scalars().all()
     return [{"id": quiz.id, "topic": quiz.topic, "difficulty": quiz.difficulty} for quiz in quizzes]
 
 @router.get("/quiz/{quiz_id}", response_model=QuizResponse)
 async def get_quiz(
     quiz_id: int, 
+    request: Request,
     current_user: models.User = Depends(get_current_user),
     session=Depends(get_session)
 ):
-    # Get quiz
-    quiz = await session.get(models.Quiz, quiz_id)
-    if not quiz:
-        raise HTTPException(status_code=404, detail="Quiz not found")
+    # Quiz bodies only change with catalog writes, so serve them pre-serialized
+    # (and precompressed)
+    version = catalog_version.value
+    key = str(quiz_id)
+    accept_encoding = request.headers.get("accept-encoding")
+    cached = quiz_body_cache.get(key, version)
+    if cached is not None:
+        return cached_response(quiz_body_cache, key, cached[0], cached[1], accept_encoding)
     
-    # Get questions
-    result = await session.execute(
-        select(models.Question).where(models.Question.quiz_id == quiz_id)
-    )
-    questions = result.scalars().all()
+    with tracer.span("quiz.load"):
+        # Get quiz
+        quiz = await session.get(models.Quiz, quiz_id)
+        if not quiz or quiz.difficulty == models.BANK_DIFFICULTY:
+            raise HTTPException(status_code=404, detail="Quiz not found")
+        
+        # Get questions
+        result = await session.execute(
+            select(models.Question).where(models.Question.quiz_id == quiz_id)
+        )
+        questions = result.scalars().all()
     
     # Format response
-    formatted_questions = []
-    for q in questions:
-        choices = json.loads(q.choices) if isinstance(q.choices, str) else q.choices
-        formatted_questions.append(
-            QuizQuestion(id=q.id, prompt=q.prompt, choices=choices)
-        )
+    with tracer.span("quiz.format", questions=len(questions)):
+        formatted_questions = []
+        for q in questions:
+            choices = json.loads(q.choices) if isinstance(q.choices, str) else q.choices
+            formatted_questions.append(
+                QuizQuestion(id=q.id, prompt=q.prompt, choices=choices)
+            )
+        body = dumps(QuizResponse(
+            id=quiz.id,
+            topic=quiz.topic,
+            difficulty=quiz.difficulty,
+            questions=formatted_questions
+        ).dict())
     
-    return QuizResponse(
-        id=quiz.id,
-        topic=quiz.topic,
-        difficulty=quiz.difficulty,
-        questions=formatted_questions
-    )
+    # Only store if no catalog write happened while loading
+    if version == catalog_version.value:
+        quiz_body_cache.set(key, version, body, RawJSONResponse.media_type)
+        return cached_response(quiz_body_cache, key, body, RawJSONResponse.media_type, accept_encoding)
+    return RawJSONResponse(body)
 
 @router.post("/quiz/submit", response_model=QuizResult)
 async def submit_quiz(
@@ -74,53 +125,112 @@ async def submit_quiz(
     current_user: models.User = Depends(get_current_user),
     session=Depends(get_session)
 ):
-    # Get the quiz
-    quiz = await session.get(models.Quiz, submission.quiz_id)
-    if not quiz:
-        raise HTTPException(status_code=404, detail="Quiz not found")
-    
-    # Get the questions and answers
-    result = await session.execute(
-        select(models.Question).where(models.Question.quiz_id == submission.quiz_id)
-    )
-    questions = {q.id: q for q in result.scalars().all()}
+    with tracer.span("quiz.load"):
+        # Get the quiz
+        quiz = await session.get(models.Quiz, submission.quiz_id)
+        if not quiz or quiz.difficulty == models.BANK_DIFFICULTY:
+            raise HTTPException(status_code=404, detail="Quiz not found")
+        
+        # Get the questions and answers
+        result = await session.execute(
+            select(models.Question).where(models.Question.quiz_id == submission.quiz_id)
+        )
+        questions = {q.id: q for q in result.scalars().all()}
     
     # Calculate score
-    total = len(questions)
-    correct = 0
-    correct_answers = {}
-    feedback = {}
-    
-    for q_id, selected_idx in submission.answers.items():
-        if str(q_id) not in [str(id) for id in questions.keys()]:
-            continue
+    with tracer.span("quiz.grade", answers=len(submission.answers)):
+        total = len(questions)
+        correct = 0
+        correct_answers = {}
+        feedback = {}
+        outcomes = []
+        
+        for q_id, selected_idx in submission.answers.items():
+            if str(q_id) not in [str(id) for id in questions.keys()]:
+                continue
+                
+            question = questions[int(q_id)]
+            correct_idx = int(question.answer)
+            correct_answers[q_id] = correct_idx
+            outcomes.append((question.id, selected_idx == correct_idx))
             
-        question = questions[int(q_id)]
-        correct_idx = int(question.answer)
-        correct_answers[q_id] = correct_idx
+            if selected_idx == correct_idx:
+                correct += 1
+                feedback[q_id] = "Correct!"
+            else:
+                choices = json.loads(question.choices) if isinstance(question.choices, str) else question.choices
+                feedback[q_id] = f"Incorrect. The correct answer is: {choices[correct_idx]}"
         
-        if selected_idx == correct_idx:
-            correct += 1
-            feedback[q_id] = "Correct!"
-        else:
-            choices = json.loads(question.choices) if isinstance(question.choices, str) else question.choices
-            feedback[q_id] = f"Incorrect. The correct answer is: {choices[correct_idx]}"
-    
-    # Calculate percentage score (out of 800 for SAT-style scoring)
-    score = int(600 + (correct / total) * 200) if total > 0 else 600
+        # Calculate percentage score (out of 800 for SAT-style scoring)
+        score = int(600 + (correct / total) * 200) if total > 0 else 600
     
     # Save result to database
-    quiz_result = models.QuizResult(
-        user_id=current_user.id,
-        quiz_id=quiz.id,
-        score=score
-    )
-    session.add(quiz_result)
-    await session.commit()
+    with tracer.span("quiz.record"):
+        quiz_result = models.QuizResult(
+            user_id=current_user.id,
+            quiz_id=quiz.id,
+            score=score,
+            correct_count=correct,
+            total_questions=total
+        )
+        session.add(quiz_result)
+        await record_quiz_result(session, current_user.id, quiz.topic, score, correct, total)
+        await adaptive.record_answers(session, current_user.id, quiz.topic, outcomes)
+        await session.commit()
     
     return QuizResult(
         score=score,
         total=total,
         correct_answers=correct_answers,
         feedback=feedback
-    )
\ No newline at end of file
+    )
+
+async def _generate_bank_question(topic: str, difficulty: str):
+    # Bank questions are stored and served to every student, so never persist placeholders
+    return await generate_quiz_question(topic, difficulty, fallback=False)
+
+@router.get("/quiz/adaptive/next", response_model=AdaptiveQuestion, dependencies=[Depends(rate_limit("adaptive"))])
+async def next_adaptive_question(
+    topic: str,
+    current_user: models.User = Depends(get_current_user),
+    session=Depends(get_session)
+):
+    # Most informative unanswered question at the user's current ability, or the
+    # one already served; the bank is only extended by generation when nothing
+    # informative is left
+    try:
+        question = await adaptive.next_question(session, current_user.id, topic, generate=_generate_bank_question)
+    except (LLMOverloaded, CircuitOpen):
+        # Answered with Retry-After by the app's handlers
+        raise
+    except Exception as e:
+        print(f"Error generating adaptive question: {e}")
+        await session.rollback()
+        raise HTTPException(status_code=503, detail="No question available right now, please retry later")
+    await session.commit()
+    if question is None:
+        raise HTTPException(status_code=404, detail="No questions left for this topic")
+    return question
+
+@router.post("/quiz/adaptive/answer", response_model=AdaptiveResult)
+async def answer_adaptive_question(
+    submission: AdaptiveAnswer,
+    current_user: models.User = Depends(get_current_user),
+    session=Depends(get_session)
+):
+    question = await session.get(models.Question, submission.question_id)
+    if not question:
+        raise HTTPException(status_code=404, detail="Question not found")
+    quiz = await session.get(models.Quiz, question.quiz_id)
+    ability = await adaptive.get_ability(session, current_user.id, quiz.topic, for_update=True)
+    # Only the question served by /quiz/adaptive/next can be answered, once
+    if ability.served_question_id != question.id:
+        raise HTTPException(status_code=409, detail="Question was not served or was already answered")
+    
+    correct_idx = int(question.answer)
+    correct = submission.answer == correct_idx
+    with tracer.span("quiz.record"):
+        ability = await adaptive.record_answers(session, current_user.id, quiz.topic, [(question.id, correct)])
+        await session.commit()
+    
+    return AdaptiveResult(correct=correct, correct_answer=correct_idx, **adaptive.ability_summary(ability))
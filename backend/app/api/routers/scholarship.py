@@ -1,7 +1,24 @@
 
-from fastapi import APIRouter
+from datetime import date
+from typing import Optional
+from fastapi import APIRouter, Query
+from app.core.responses import FastJSONResponse
+from app.services.scholarship import search_scholarships
+
 router = APIRouter()
 
 @router.get("/scholarships")
-async def scholarships(q: str | None = None, country: str | None = None):
-    return {"scholarships": [{"name": "Fulbright", "amount": 20000}]}
+async def scholarships(
+    q: Optional[str] = None,
+    country: Optional[str] = None,
+    min_amount: Optional[int] = None,
+    max_amount: Optional[int] = None,
+    deadline_after: Optional[date] = None,
+    deadline_before: Optional[date] = None,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0)
+):
+    # Plain dicts: skip jsonable_encoder
+    return FastJSONResponse(await search_scholarships(
+        q, country, min_amount, max_amount, deadline_after, deadline_before, limit, offset
+    ))
@@ -4,7 +4,8 @@ from jose import jwt, JWTError
 from sqlalchemy.future import select
 from pydantic import BaseModel
 from app.core.config import settings
-from app.db.session import get_session
+from app.core.tracing import tracer
+from app.db.session import AsyncSessionLocal, get_session
 from app.db.models import User
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
@@ -13,6 +14,16 @@ class TokenData(BaseModel):
     email: str = None
 
 async def get_current_user(token: str = Depends(oauth2_scheme), session = Depends(get_session)):
+    with tracer.span("auth.get_current_user"):
+        return await _authenticate(token, session)
+
+async def user_from_token(token: str):
+    """Resolve an access token outside request dependencies (e.g. WebSocket handshakes)."""
+    with tracer.span("auth.get_current_user"):
+        async with AsyncSessionLocal() as session:
+            return await _authenticate(token, session)
+
+async def _authenticate(token: str, session):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -0,0 +1,294 @@
+"""
+Response caching for the read-mostly catalog endpoints.
+
+Catalog data (colleges, scholarships, the quiz list) changes rarely, so
+responses are cached per normalized path + query string and tagged with an
+ETag derived from the body. Any catalog write bumps the catalog version, which
+invalidates every cached entry (in every worker on the host, through shared
+memory; writers outside the server, such as bulk imports, publish a version in
+the database that servers poll); clients holding an ETag are answered with
+304 Not Modified only while a cached 200 for the same request still matches it.
+
+Entries keep compressed variants next to the raw body. Each variant is made
+on the first request that accepts its encoding, so later hits are served
+without recompressing.
+"""
+
+import asyncio
+import hashlib
+from datetime import date
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+from sqlalchemy import event
+from sqlalchemy.future import select
+from sqlalchemy.orm import Session
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.core.compression import Codec, negotiate
+from app.core.config import settings
+from app.core.metrics import registry
+from app.core.shared import SharedCounter, arena
+from app.db.models import BANK_DIFFICULTY, CatalogState, Quiz, Question
+from app.db.upsert import upsert
+
+# Path prefixes whose GET responses are safe to cache for every user
+CACHEABLE_PREFIXES = ("/colleges", "/scholarships", "/quizzes")
+
+# Prefixes whose responses depend on the current date (scholarships are
+# ordered by deadline proximity), so entries are also keyed by day
+DATED_PREFIXES = ("/scholarships",)
+
+# Models whose writes change the catalog
+CATALOG_MODELS = (Quiz, Question)
+
+CACHE_CONTROL = (
+    f"public, max-age={settings.CATALOG_CACHE_MAX_AGE}, "
+    f"stale-while-revalidate={settings.CATALOG_CACHE_MAX_AGE}"
+)
+
+
+class CatalogVersion:
+    """
+    Monotonic counter identifying the current state of the catalog.
+
+    Kept in shared memory so a write handled by one worker process
+    invalidates the cached responses of all of them.
+    """
+
+    def __init__(self, counter: Optional[SharedCounter] = None):
+        self._counter = counter or arena.counter("catalog_version", initial=1)
+
+    @property
+    def value(self) -> int:
+        return self._counter.value
+
+    def bump(self) -> int:
+        return self._counter.increment()
+
+
+catalog_version = CatalogVersion()
+
+
+class ResponseCache:
+    """Bounded LRU of serialized responses, keyed by normalized request."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[int, bytes, str, Dict[str, bytes]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str, version: int) -> Optional[Tuple[bytes, str]]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != version:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1], entry[2]
+
+    def encoded(self, key: str, codec: Codec) -> Optional[bytes]:
+        """Compressed body of a stored entry, compressing it on first use."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        variants = entry[3]
+        body = variants.get(codec.name)
+        if body is None:
+            body = variants[codec.name] = codec.compress(entry[1])
+        return body
+
+    def set(self, key: str, version: int, body: bytes, media_type: str):
+        self._entries[key] = (version, body, media_type, {})
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+response_cache = ResponseCache(settings.CATALOG_CACHE_MAX_ENTRIES)
+# Serialized quiz bodies; the quiz route needs auth, so it is not in response_cache
+quiz_body_cache = ResponseCache(settings.CATALOG_CACHE_MAX_ENTRIES)
+
+
+@registry.collector("cache_lookups_total", "counter", "Cache lookups by cache and result.")
+def _cache_samples():
+    yield "cache_lookups_total", {"cache": "catalog_response", "result": "hit"}, response_cache.hits
+    yield "cache_lookups_total", {"cache": "catalog_response", "result": "miss"}, response_cache.misses
+    yield "cache_lookups_total", {"cache": "quiz_body", "result": "hit"}, quiz_body_cache.hits
+    yield "cache_lookups_total", {"cache": "quiz_body", "result": "miss"}, quiz_body_cache.misses
+
+
+def invalidate_catalog() -> int:
+    """
+    Invalidate all cached catalog responses.
+
+    Returns:
+        The new catalog version
+    """
+    response_cache.clear()
+    quiz_body_cache.clear()
+    return catalog_version.bump()
+
+
+async def publish_catalog_change(session):
+    """
+    Bump the catalog version stored in the database, in the caller's
+    transaction, so servers not sharing memory with the writer invalidate
+    their caches (see watch_catalog_version). The caller commits.
+    """
+    await upsert(
+        session, CatalogState, [{"id": 1, "version": 1}],
+        set_={"version": CatalogState.__table__.c.version + 1},
+    )
+
+
+async def watch_catalog_version(session_factory, interval: float):
+    """
+    Poll the database catalog version and invalidate local caches when it
+    changes. Runs until cancelled.
+    """
+    seen = None
+    while True:
+        try:
+            async with session_factory() as session:
+                version = (await session.execute(
+                    select(CatalogState.version).where(CatalogState.id == 1)
+                )).scalar() or 0
+            if seen is not None and version != seen:
+                invalidate_catalog()
+            seen = version
+        except Exception as e:
+            print(f"Catalog version check failed: {e}")
+        await asyncio.sleep(interval)
+
+
+def cache_key(path: str, query_string: str) -> str:
+    """
+    Build a cache key that ignores parameter order, blank parameters
+    and trailing slashes.
+    """
+    params = sorted(
+        (name, value)
+        for name, value in parse_qsl(query_string, keep_blank_values=True)
+        if value != ""
+    )
+    path = path.rstrip("/") or "/"
+    return f"{path}?{urlencode(params)}" if params else path
+
+
+def make_etag(body: bytes) -> str:
+    # Weak: the same body is served in several encodings
+    return f'W/"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+
+
+def cached_response(
+    cache: ResponseCache,
+    key: str,
+    body: bytes,
+    media_type: str,
+    accept_encoding: Optional[str],
+    headers: Optional[Dict[str, str]] = None
+) -> Response:
+    """
+    Build a response for a cached body, using a precompressed variant when
+    the client accepts one and the body is worth compressing.
+    """
+    headers = dict(headers or {})
+    headers["Vary"] = "Accept-Encoding"
+    codec = negotiate(accept_encoding) if len(body) >= settings.COMPRESSION_MIN_SIZE else None
+    if codec is not None:
+        encoded = cache.encoded(key, codec)
+        if encoded is not None:
+            body = encoded
+            headers["Content-Encoding"] = codec.name
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    # "*" is not honoured: it would answer 304 for resources that do not exist
+    if not if_none_match:
+        return False
+    return etag in [tag.strip() for tag in if_none_match.split(",")]
+
+
+class ResponseCacheMiddleware(BaseHTTPMiddleware):
+    """
+    Serve catalog GETs from the response cache and answer conditional
+    requests for cached bodies with 304 Not Modified without touching the
+    route handler.
+    """
+
+    async def dispatch(self, request: Request, call_next):
+        path = request.url.path
+        if request.method != "GET" or not path.startswith(CACHEABLE_PREFIXES):
+            return await call_next(request)
+
+        version = catalog_version.value
+        key = cache_key(path, request.url.query)
+        if path.startswith(DATED_PREFIXES):
+            key = f"{key}@{date.today().isoformat()}"
+        if_none_match = request.headers.get("if-none-match")
+        accept_encoding = request.headers.get("accept-encoding")
+
+        cached = response_cache.get(key, version)
+        if cached is not None:
+            body, media_type = cached
+            headers = {"ETag": make_etag(body), "Cache-Control": CACHE_CONTROL}
+            if _etag_matches(if_none_match, headers["ETag"]):
+                return Response(status_code=304, headers=headers)
+            return cached_response(response_cache, key, body, media_type, accept_encoding, headers)
+
+        response = await call_next(request)
+        if response.status_code != 200:
+            return response
+
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        media_type = response.headers.get("content-type", "application/json")
+        headers = {"ETag": make_etag(body), "Cache-Control": CACHE_CONTROL}
+        if _etag_matches(if_none_match, headers["ETag"]):
+            # Content unchanged since the client's copy, even if the catalog moved on
+            return Response(status_code=304, headers=headers)
+        # Only store if no catalog write happened while the handler ran
+        if version == catalog_version.value:
+            response_cache.set(key, version, body, media_type)
+            return cached_response(response_cache, key, body, media_type, accept_encoding, headers)
+        return Response(content=body, media_type=media_type, headers=headers)
+
+
+def _changes_catalog(session, obj) -> bool:
+    """Whether a written object is part of the catalog (bank quizzes are not)."""
+    if isinstance(obj, Quiz):
+        return obj.difficulty != BANK_DIFFICULTY
+    if isinstance(obj, Question):
+        # The quiz is in the session whenever a question is added to a bank
+        quiz = session.identity_map.get(Session.identity_key(Quiz, obj.quiz_id))
+        return quiz is None or quiz.difficulty != BANK_DIFFICULTY
+    return False
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_catalog_writes(session, flush_context):
+    changed = (*session.new, *session.dirty, *session.deleted)
+    if any(_changes_catalog(session, obj) for obj in changed if isinstance(obj, CATALOG_MODELS)):
+        session.info["catalog_dirty"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session):
+    if session.info.pop("catalog_dirty", False):
+        invalidate_catalog()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session):
+    session.info.pop("catalog_dirty", None)
@@ -0,0 +1,221 @@
+"""
+HTTP response compression.
+
+gzip is always available; brotli and zstd are used when the `brotli` and
+`zstandard` packages are installed. The encoding is negotiated from
+Accept-Encoding (honouring q-values) in server preference order br > zstd >
+gzip. Bodies below COMPRESSION_MIN_SIZE are sent as is, since headers and
+CPU cost outweigh the savings. Streamed responses are compressed chunk by
+chunk and flushed after every chunk, so clients still see progress.
+
+Responses that already carry a Content-Encoding are passed through; the
+response caches use this to serve variants that were compressed once.
+"""
+
+import zlib
+from typing import Callable, Dict, List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "text/",
+)
+
+
+class Codec:
+    """
+    One content coding.
+
+    Args:
+        name: Content-Encoding token
+        compress: One-shot compression of a full body
+        streamer: Factory for an object with chunk(bytes) and finish() methods
+    """
+
+    def __init__(self, name: str, compress: Callable[[bytes], bytes], streamer: Callable[[], "object"]):
+        self.name = name
+        self.compress = compress
+        self.streamer = streamer
+
+
+class _GzipStream:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+def _gzip_compress(data: bytes, level: int) -> bytes:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _available_codecs() -> Dict[str, Codec]:
+    level = settings.COMPRESSION_GZIP_LEVEL
+    codecs = {"gzip": Codec("gzip", lambda data: _gzip_compress(data, level), lambda: _GzipStream(level))}
+
+    try:
+        import brotli
+    except ImportError:
+        pass
+    else:
+        class _BrotliStream:
+            def __init__(self):
+                self._compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+
+            def chunk(self, data: bytes) -> bytes:
+                return self._compressor.process(data) + self._compressor.flush()
+
+            def finish(self) -> bytes:
+                return self._compressor.finish()
+
+        codecs["br"] = Codec(
+            "br", lambda data: brotli.compress(data, quality=settings.COMPRESSION_BROTLI_QUALITY), _BrotliStream
+        )
+
+    try:
+        import zstandard
+    except ImportError:
+        pass
+    else:
+        class _ZstdStream:
+            def __init__(self):
+                self._compressor = zstandard.ZstdCompressor().compressobj()
+
+            def chunk(self, data: bytes) -> bytes:
+                return self._compressor.compress(data) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+            def finish(self) -> bytes:
+                return self._compressor.flush()
+
+        codecs["zstd"] = Codec("zstd", zstandard.ZstdCompressor().compress, _ZstdStream)
+
+    return codecs
+
+
+codecs = _available_codecs()
+
+# Server preference when the client accepts several encodings equally
+PREFERENCE: List[str] = [name for name in ("br", "zstd", "gzip") if name in codecs]
+
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[Codec]:
+    """Pick the best available codec for an Accept-Encoding header, or None."""
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                continue
+        weights[name.strip()] = weight
+
+    best, best_weight = None, 0.0
+    for name in PREFERENCE:
+        weight = weights.get(name, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = codecs[name], weight
+    return best
+
+
+def is_compressible(content_type: Optional[str]) -> bool:
+    return bool(content_type) and content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def _add_vary(headers: MutableHeaders):
+    if "accept-encoding" not in headers.get("vary", "").lower():
+        headers.add_vary_header("Accept-Encoding")
+
+
+class CompressionMiddleware:
+    """
+    Pure ASGI middleware compressing response bodies.
+
+    Complete bodies are compressed in one call if they reach minimum_size;
+    streamed bodies are compressed incrementally regardless of size.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: Optional[int] = None):
+        self.app = app
+        self.minimum_size = settings.COMPRESSION_MIN_SIZE if minimum_size is None else minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        codec = negotiate(Headers(scope=scope).get("accept-encoding"))
+        if codec is None:
+            return await self.app(scope, receive, send)
+
+        start_message: Optional[Message] = None
+        stream = None
+        passthrough = False
+
+        async def send_wrapper(message: Message):
+            nonlocal start_message, stream, passthrough
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                passthrough = (
+                    "content-encoding" in headers
+                    or message["status"] in (204, 304)
+                    or not is_compressible(headers.get("content-type"))
+                )
+                if passthrough:
+                    await send(message)
+                else:
+                    # Held back until the first body chunk shows whether the response streams
+                    start_message = message
+                return
+
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if start_message is not None and not more_body:
+                # The whole body is in one message
+                headers = MutableHeaders(scope=start_message)
+                _add_vary(headers)
+                if len(body) >= self.minimum_size:
+                    body = codec.compress(body)
+                    headers["Content-Encoding"] = codec.name
+                    headers["Content-Length"] = str(len(body))
+                await send(start_message)
+                start_message = None
+                await send({"type": "http.response.body", "body": body})
+                return
+
+            if start_message is not None:
+                headers = MutableHeaders(scope=start_message)
+                _add_vary(headers)
+                headers["Content-Encoding"] = codec.name
+                del headers["Content-Length"]
+                await send(start_message)
+                start_message = None
+                stream = codec.streamer()
+
+            data = stream.chunk(body) if body else b""
+            if not more_body:
+                data += stream.finish()
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -10,5 +10,77 @@ class Settings(BaseSettings):
     PINECONE_API_KEY: str = os.getenv("PINECONE_API_KEY", "")
     GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY", "")
     ALGORITHM: str = "HS256"
+    CATALOG_CACHE_MAX_AGE: int = int(os.getenv("CATALOG_CACHE_MAX_AGE", "300"))
+    CATALOG_CACHE_MAX_ENTRIES: int = int(os.getenv("CATALOG_CACHE_MAX_ENTRIES", "1024"))
+    # Seconds between checks for catalog changes made outside the server (bulk imports)
+    CATALOG_VERSION_POLL_INTERVAL: float = float(os.getenv("CATALOG_VERSION_POLL_INTERVAL", "5.0"))
+    JOB_STORE: str = os.getenv("JOB_STORE", "sql")
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "2"))
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+    JOB_POLL_INTERVAL: float = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+    ESSAY_REUSE_THRESHOLD: float = float(os.getenv("ESSAY_REUSE_THRESHOLD", "0.9"))
+    ESSAY_INCREMENTAL_THRESHOLD: float = float(os.getenv("ESSAY_INCREMENTAL_THRESHOLD", "0.5"))
+    CHAT_LOG_BATCH_SIZE: int = int(os.getenv("CHAT_LOG_BATCH_SIZE", "100"))
+    CHAT_LOG_FLUSH_INTERVAL: float = float(os.getenv("CHAT_LOG_FLUSH_INTERVAL", "1.0"))
+    CHAT_LOG_MAX_PENDING: int = int(os.getenv("CHAT_LOG_MAX_PENDING", "10000"))
+    CHAT_LOG_SPILL_PATH: str = os.getenv("CHAT_LOG_SPILL_PATH", "data/chat_log_spill.jsonl")
+    EMBEDDING_SPILL_MAX_ENTRIES: int = int(os.getenv("EMBEDDING_SPILL_MAX_ENTRIES", "1000"))
+    EMBEDDING_SPILL_PATH: str = os.getenv("EMBEDDING_SPILL_PATH", "data/embedding_spill.jsonl")
+    CHAT_CONTEXT_TOKEN_BUDGET: int = int(os.getenv("CHAT_CONTEXT_TOKEN_BUDGET", "1500"))
+    CHAT_RECENT_TURNS: int = int(os.getenv("CHAT_RECENT_TURNS", "4"))
+    CHAT_HISTORY_TURNS: int = int(os.getenv("CHAT_HISTORY_TURNS", "12"))
+    RATE_LIMIT_BACKEND: str = os.getenv("RATE_LIMIT_BACKEND", "memory")
+    REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    RATE_LIMIT_CHAT: str = os.getenv("RATE_LIMIT_CHAT", "20/minute")
+    RATE_LIMIT_ESSAY: str = os.getenv("RATE_LIMIT_ESSAY", "10/hour")
+    RATE_LIMIT_PROGRESS: str = os.getenv("RATE_LIMIT_PROGRESS", "30/hour")
+    RATE_LIMIT_ESSAY_BATCH: str = os.getenv("RATE_LIMIT_ESSAY_BATCH", "20/hour")
+    RATE_LIMIT_ADAPTIVE: str = os.getenv("RATE_LIMIT_ADAPTIVE", "60/minute")
+    RATE_LIMIT_FLASHCARDS: str = os.getenv("RATE_LIMIT_FLASHCARDS", "30/hour")
+    # Concurrent LLM calls across all worker processes of a host
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+    LLM_MAX_WAITING: int = int(os.getenv("LLM_MAX_WAITING", "32"))
+    LLM_QUEUE_TIMEOUT: float = float(os.getenv("LLM_QUEUE_TIMEOUT", "5.0"))
+    LLM_BACKEND: str = os.getenv("LLM_BACKEND", "gemini")
+    VECTOR_BACKEND: str = os.getenv("VECTOR_BACKEND", "pinecone")
+    FAKE_LLM_LATENCY: float = float(os.getenv("FAKE_LLM_LATENCY", "0"))
+    FAKE_LLM_TOKENS_PER_SECOND: float = float(os.getenv("FAKE_LLM_TOKENS_PER_SECOND", "0"))
+    LLM_TIMEOUT: float = float(os.getenv("LLM_TIMEOUT", "30"))
+    LLM_ATTEMPTS: int = int(os.getenv("LLM_ATTEMPTS", "2"))
+    LLM_HEDGE_AFTER: float = float(os.getenv("LLM_HEDGE_AFTER", "0"))
+    VECTOR_TIMEOUT: float = float(os.getenv("VECTOR_TIMEOUT", "2.0"))
+    VECTOR_HEDGE_AFTER: float = float(os.getenv("VECTOR_HEDGE_AFTER", "0.3"))
+    BREAKER_FAILURE_THRESHOLD: int = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+    BREAKER_RECOVERY_TIMEOUT: float = float(os.getenv("BREAKER_RECOVERY_TIMEOUT", "30"))
+    DEBUG: bool = os.getenv("DEBUG", "false").lower() in ("1", "true", "yes")
+    TRACE_SAMPLE_RATE: float = float(os.getenv("TRACE_SAMPLE_RATE", "0.01"))
+    TRACE_EXPORTER: str = os.getenv("TRACE_EXPORTER", "none")
+    COMPRESSION_MIN_SIZE: int = int(os.getenv("COMPRESSION_MIN_SIZE", "500"))
+    COMPRESSION_GZIP_LEVEL: int = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+    COMPRESSION_BROTLI_QUALITY: int = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "5"))
+    # Seconds shutdown waits for running jobs and background writes
+    SHUTDOWN_DRAIN_TIMEOUT: float = float(os.getenv("SHUTDOWN_DRAIN_TIMEOUT", "20"))
+    # Adaptive sessions end once the ability standard error reaches this
+    ADAPTIVE_TARGET_SE: float = float(os.getenv("ADAPTIVE_TARGET_SE", "0.5"))
+    # Below this information the bank is extended with a generated question
+    ADAPTIVE_MIN_INFORMATION: float = float(os.getenv("ADAPTIVE_MIN_INFORMATION", "0.1"))
+    # Cards generated per shared flashcard deck
+    FLASHCARD_DECK_SIZE: int = int(os.getenv("FLASHCARD_DECK_SIZE", "20"))
+    # WebSocket chat: connections per worker, heartbeat, and how long a frame
+    # may wait on a client that stopped reading
+    CHAT_WS_MAX_CONNECTIONS: int = int(os.getenv("CHAT_WS_MAX_CONNECTIONS", "1000"))
+    CHAT_WS_PING_INTERVAL: float = float(os.getenv("CHAT_WS_PING_INTERVAL", "20"))
+    CHAT_WS_IDLE_TIMEOUT: float = float(os.getenv("CHAT_WS_IDLE_TIMEOUT", "60"))
+    CHAT_WS_SEND_TIMEOUT: float = float(os.getenv("CHAT_WS_SEND_TIMEOUT", "10"))
+    # Batch essay scoring: worker pool per process (keep the pool times the number
+    # of processes below LLM_MAX_CONCURRENCY),
+    # essays per request and essays queued across all teachers
+    ESSAY_BATCH_WORKERS: int = int(os.getenv("ESSAY_BATCH_WORKERS", "4"))
+    ESSAY_BATCH_MAX_ESSAYS: int = int(os.getenv("ESSAY_BATCH_MAX_ESSAYS", "200"))
+    ESSAY_BATCH_MAX_PENDING: int = int(os.getenv("ESSAY_BATCH_MAX_PENDING", "2000"))
+    # Students per cohort analytics request
+    ANALYTICS_MAX_USERS: int = int(os.getenv("ANALYTICS_MAX_USERS", "500"))
+    # Directory where worker processes exchange metrics (set by gunicorn.conf.py)
+    METRICS_DIR: str = os.getenv("METRICS_DIR", "")
 
 settings = Settings()
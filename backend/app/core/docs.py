@@ -0,0 +1,184 @@
+"""
+Cached OpenAPI schema and locally served Swagger UI.
+
+The schema only depends on the registered routes, so it is generated once,
+serialized once and served with a weak ETag (the same schema is sent gzip
+and identity encoded); pollers that send If-None-Match get a 304 without any
+work. Gzip and other variants come from the same precompressed cache as the
+catalog.
+
+Swagger UI assets are committed under app/static/swagger-ui/<version> and
+served from there, falling back to unpkg if they are missing. Their SHA-256
+digests are pinned in app/static/swagger-ui/SHA256SUMS and
+`python -m app.core.docs`, run by the Docker build, fails unless every asset
+matches, downloading any that are missing first. After bumping
+SWAGGER_UI_VERSION, run `python -m app.core.docs --pin` from a trusted
+network, review the digests against the published package and commit the
+file along with the vendored assets.
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import urllib.request
+from typing import Callable, Dict, Optional
+
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+
+from app.core.cache import ResponseCache, cached_response
+from app.core.responses import MEDIA_TYPE, dumps
+
+SWAGGER_UI_VERSION = "4.15.5"
+SWAGGER_UI_ASSETS = ("swagger-ui-bundle.js", "swagger-ui.css", "favicon-32x32.png")
+SWAGGER_UI_CDN = f"https://unpkg.com/swagger-ui-dist@{SWAGGER_UI_VERSION}"
+SWAGGER_UI_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static", "swagger-ui")
+SWAGGER_UI_DIR = os.path.join(SWAGGER_UI_ROOT, SWAGGER_UI_VERSION)
+SWAGGER_UI_SUMS = os.path.join(SWAGGER_UI_ROOT, "SHA256SUMS")
+SWAGGER_UI_PATH = f"/static/swagger-ui/{SWAGGER_UI_VERSION}"
+
+
+class OpenAPIDocument:
+    """
+    OpenAPI schema built on first use and kept as serialized bytes.
+
+    Args:
+        build: Function generating the schema dictionary
+    """
+
+    KEY = "openapi"
+
+    def __init__(self, build: Callable[[], Dict]):
+        self.build = build
+        self._cache = ResponseCache(1)
+        self._schema: Optional[Dict] = None
+        self._body = b""
+        self.etag = ""
+
+    def schema(self) -> Dict:
+        if self._schema is None:
+            self._schema = self.build()
+            self._body = dumps(self._schema)
+            self.etag = f'W/"{hashlib.blake2b(self._body, digest_size=8).hexdigest()}"'
+            self._cache.set(self.KEY, 1, self._body, MEDIA_TYPE)
+        return self._schema
+
+    def response(self, if_none_match: Optional[str], accept_encoding: Optional[str]) -> Response:
+        self.schema()
+        headers = {"ETag": self.etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        if if_none_match and self.etag in [tag.strip() for tag in if_none_match.split(",")]:
+            return Response(status_code=304, headers=headers)
+        return cached_response(self._cache, self.KEY, self._body, MEDIA_TYPE, accept_encoding, headers)
+
+
+def swagger_ui_vendored() -> bool:
+    return all(os.path.isfile(os.path.join(SWAGGER_UI_DIR, name)) for name in SWAGGER_UI_ASSETS)
+
+
+def swagger_asset_url(name: str) -> str:
+    """Local URL of a Swagger UI asset if vendored, else its CDN URL."""
+    if swagger_ui_vendored():
+        return f"{SWAGGER_UI_PATH}/{name}"
+    return f"{SWAGGER_UI_CDN}/{name}"
+
+
+class VersionedStaticFiles(StaticFiles):
+    """Static files under a versioned path, cacheable by browsers indefinitely."""
+
+    def file_response(self, *args, **kwargs) -> Response:
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
+
+
+class AssetIntegrityError(Exception):
+    """Raised when a downloaded asset is unpinned or does not match its pinned digest."""
+
+
+def read_pinned_digests(path: str = SWAGGER_UI_SUMS) -> Dict[str, str]:
+    """Pinned digests from a sha256sum-format file, keyed by "<version>/<name>"."""
+    if not os.path.isfile(path):
+        return {}
+    with open(path) as f:
+        return {name.strip(): digest for digest, name in (line.split(None, 1) for line in f if line.strip())}
+
+
+def _download(name: str) -> bytes:
+    with urllib.request.urlopen(f"{SWAGGER_UI_CDN}/{name}", timeout=30) as response:
+        return response.read()
+
+
+def _verify(name: str, data: bytes, pinned: Dict[str, str]):
+    key = f"{SWAGGER_UI_VERSION}/{name}"
+    if key not in pinned:
+        raise AssetIntegrityError(f"No pinned digest for {key}; run `python -m app.core.docs --pin`")
+    digest = hashlib.sha256(data).hexdigest()
+    if digest != pinned[key]:
+        raise AssetIntegrityError(f"{key} has SHA-256 {digest}, expected {pinned[key]}")
+
+
+def verify_swagger_ui(target: str = SWAGGER_UI_DIR, pinned: Optional[Dict[str, str]] = None):
+    """
+    Check the vendored Swagger UI assets against their pinned SHA-256.
+
+    Raises:
+        AssetIntegrityError: If an asset has no pinned digest or does not match it
+        OSError: If an asset is missing
+    """
+    pinned = read_pinned_digests() if pinned is None else pinned
+    for name in SWAGGER_UI_ASSETS:
+        with open(os.path.join(target, name), "rb") as f:
+            _verify(name, f.read(), pinned)
+    print(f"Verified {len(SWAGGER_UI_ASSETS)} Swagger UI assets in {target}")
+
+
+def vendor_swagger_ui(target: str = SWAGGER_UI_DIR, pinned: Optional[Dict[str, str]] = None, download=_download):
+    """
+    Download the pinned Swagger UI assets into the static directory.
+
+    Every asset is checked against its pinned SHA-256 before anything is
+    written, so a failed check leaves the directory as it was.
+
+    Raises:
+        AssetIntegrityError: If an asset has no pinned digest or does not match it
+    """
+    pinned = read_pinned_digests() if pinned is None else pinned
+    assets = {}
+    for name in SWAGGER_UI_ASSETS:
+        data = download(name)
+        _verify(name, data, pinned)
+        assets[name] = data
+
+    os.makedirs(target, exist_ok=True)
+    for name, data in assets.items():
+        with open(os.path.join(target, name), "wb") as f:
+            f.write(data)
+        print(f"Vendored {name} ({len(data):,} bytes)")
+
+
+def pin_swagger_ui(path: str = SWAGGER_UI_SUMS, download=_download):
+    """Record the digests of the current CDN assets; review them before committing."""
+    pinned = read_pinned_digests(path)
+    for name in SWAGGER_UI_ASSETS:
+        pinned[f"{SWAGGER_UI_VERSION}/{name}"] = hashlib.sha256(download(name)).hexdigest()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.writelines(f"{digest}  {key}\n" for key, digest in sorted(pinned.items()))
+    print(f"Pinned {len(SWAGGER_UI_ASSETS)} assets in {path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Vendor Swagger UI assets")
+    parser.add_argument("--pin", action="store_true", help="Record digests of the CDN assets instead")
+    args = parser.parse_args()
+    if args.pin:
+        pin_swagger_ui()
+    else:
+        try:
+            if not swagger_ui_vendored():
+                vendor_swagger_ui()
+            verify_swagger_ui()
+        except (AssetIntegrityError, OSError) as e:
+            print(f"Swagger UI assets failed verification: {e}", file=sys.stderr)
+            sys.exit(1)
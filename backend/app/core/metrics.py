@@ -0,0 +1,439 @@
+"""
+In-process metrics in the Prometheus text exposition format.
+
+Metrics are plain counters and fixed-bucket histograms. The app runs on one
+event loop per process, so updates are simple integer and float additions
+without locks. Labelled children are created once and cached, so a
+request allocates nothing beyond the label tuple used for lookup. Values
+owned by other modules (cache hits, pool usage, breaker state) are read by
+collectors only when /metrics is scraped.
+
+Under gunicorn each worker process has its own registry; with METRICS_DIR
+set, workers exchange snapshots through that directory and /metrics reports
+the sum over all of them.
+"""
+
+import asyncio
+import fcntl
+import glob
+import json
+import os
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Sequence, Set, Tuple
+
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.shared import process_alive
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+LLM_LATENCY_BUCKETS = (0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0)
+
+Sample = Tuple[str, Dict[str, str], float]
+# name, kind, documentation, samples
+Family = Tuple[str, str, str, List[Sample]]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def dec(self, amount: float = 1):
+        self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._new_child()
+        return child
+
+    def samples(self) -> Iterable[Sample]:
+        for values, child in list(self._children.items()):
+            yield from self._child_samples(values, child)
+
+    def _child_samples(self, values, child) -> Iterable[Sample]:
+        yield self.name, dict(zip(self.labelnames, values)), child.value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1):
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def _child_samples(self, values, child) -> Iterable[Sample]:
+        labels = dict(zip(self.labelnames, values))
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+            cumulative += count
+            yield f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative
+        yield f"{self.name}_sum", labels, child.sum
+        yield f"{self.name}_count", labels, cumulative
+
+
+def format_families(families: Iterable[Family]) -> str:
+    """Render metric families in the text exposition format."""
+    lines: List[str] = []
+    for name, kind, documentation, samples in families:
+        lines.append(f"# HELP {name} {documentation}")
+        lines.append(f"# TYPE {name} {kind}")
+        for sample_name, labels, value in samples:
+            lines.append(f"{sample_name}{_format_labels(list(labels), list(labels.values()))} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+class Registry:
+    """Holds metrics and scrape-time collectors."""
+
+    def __init__(self):
+        self._metrics: "OrderedDict[str, _Metric]" = OrderedDict()
+        self._collectors: List[Tuple[str, str, str, Callable[[], Iterable[Sample]]]] = []
+        # Gauges combined across processes by max instead of sum
+        self.max_gauges: Set[str] = set()
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def collector(self, name: str, kind: str, documentation: str, combine: str = "sum"):
+        """
+        Register a function yielding (sample_name, labels, value) at scrape time.
+
+        Used as a decorator for values other modules already keep. combine
+        says how a gauge is aggregated across worker processes: "sum" for
+        amounts, "max" for flags.
+        """
+        def decorator(fn: Callable[[], Iterable[Sample]]):
+            self._collectors.append((name, kind, documentation, fn))
+            if combine == "max":
+                self.max_gauges.add(name)
+            return fn
+        return decorator
+
+    def families(self) -> List[Family]:
+        """Current samples of every metric and collector."""
+        families: List[Family] = [
+            (metric.name, metric.kind, metric.documentation, list(metric.samples()))
+            for metric in self._metrics.values()
+        ]
+        for name, kind, documentation, fn in self._collectors:
+            try:
+                samples = list(fn())
+            except Exception as e:
+                print(f"Metrics collector {name} failed: {e}")
+                continue
+            families.append((name, kind, documentation, samples))
+        return families
+
+    def render(self) -> str:
+        return format_families(self.families())
+
+
+class MultiprocessMetrics:
+    """
+    Metrics of every worker process on a host, exchanged through a directory.
+
+    Each worker writes a snapshot of its registry to <pid>.json periodically,
+    when it answers a scrape and on shutdown; a scrape adds up the snapshots,
+    so /metrics reports the host whichever worker answers. Counters and
+    histograms of workers that have exited are folded into archive.json
+    under a file lock, so totals never go backwards when a worker is
+    recycled; their gauges are dropped.
+
+    Args:
+        directory: Directory shared by the workers, emptied when the server starts
+        registry: This process's metrics
+        interval: Seconds between snapshots
+    """
+
+    def __init__(self, directory: str, registry: "Registry", interval: float = 5.0):
+        self.directory = directory
+        self.registry = registry
+        self.interval = interval
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.json")
+
+    @staticmethod
+    def _read(path: str) -> List[Family]:
+        try:
+            with open(path) as f:
+                return [tuple(family) for family in json.load(f)]
+        except (OSError, ValueError):
+            return []
+
+    def _write(self, path: str, families: List[Family]):
+        with open(path + ".tmp", "w") as f:
+            json.dump(families, f)
+        os.replace(path + ".tmp", path)
+
+    def write(self):
+        """Snapshot this process's metrics."""
+        os.makedirs(self.directory, exist_ok=True)
+        self._write(self._path(str(os.getpid())), self.registry.families())
+
+    def _archive_exited(self):
+        with open(os.path.join(self.directory, ".lock"), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                exited = [
+                    path for path in glob.glob(self._path("[0-9]*"))
+                    if not process_alive(int(os.path.basename(path)[:-len(".json")]))
+                ]
+                if not exited:
+                    return
+                families = self._read(self._path("archive"))
+                for path in exited:
+                    families += [family for family in self._read(path) if family[1] != "gauge"]
+                self._write(self._path("archive"), self.combine(families))
+                for path in exited:
+                    os.remove(path)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def combine(self, families: Iterable[Family]) -> List[Family]:
+        """Add up samples with the same name and labels, keeping first-seen order."""
+        merged: "OrderedDict[str, Tuple[str, str, Dict[tuple, float]]]" = OrderedDict()
+        for name, kind, documentation, samples in families:
+            _, _, values = merged.setdefault(name, (kind, documentation, OrderedDict()))
+            use_max = name in self.registry.max_gauges
+            for sample_name, labels, value in samples:
+                key = (sample_name, tuple(labels.items()))
+                previous = values.get(key)
+                if previous is None:
+                    values[key] = value
+                else:
+                    values[key] = max(previous, value) if use_max else previous + value
+        return [
+            (name, kind, documentation, [(sample_name, dict(labels), value) for (sample_name, labels), value in values.items()])
+            for name, (kind, documentation, values) in merged.items()
+        ]
+
+    def families(self) -> List[Family]:
+        self.write()
+        self._archive_exited()
+        families: List[Family] = []
+        for path in sorted(glob.glob(self._path("*"))):
+            families += self._read(path)
+        return self.combine(families)
+
+    def render(self) -> str:
+        return format_families(self.families())
+
+    async def run(self):
+        """Snapshot periodically until cancelled."""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.write()
+            except OSError as e:
+                print(f"Metrics snapshot failed: {e}")
+
+
+registry = Registry()
+
+http_requests = registry.counter(
+    "http_requests_total", "HTTP requests by route, method and status.", ("route", "method", "status")
+)
+http_latency = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route.", ("route", "method")
+)
+http_in_flight = registry.gauge(
+    "http_requests_in_flight", "HTTP requests currently being served.", ("route", "method")
+)
+llm_calls = registry.counter("llm_calls_total", "LLM calls by call site and outcome.", ("call_site", "outcome"))
+llm_latency = registry.histogram(
+    "llm_call_duration_seconds", "LLM call latency by call site.", ("call_site",), LLM_LATENCY_BUCKETS
+)
+llm_tokens = registry.counter("llm_tokens_total", "LLM tokens by call site and direction.", ("call_site", "direction"))
+vector_latency = registry.histogram(
+    "vector_query_duration_seconds", "Vector store query latency.", ("operation",)
+)
+errors = registry.counter("app_errors_total", "Handled errors by component.", ("component",))
+
+
+class timed:
+    """Context manager observing elapsed seconds into a histogram child."""
+
+    __slots__ = ("child", "start")
+
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.child.observe(time.perf_counter() - self.start)
+        return False
+
+
+def record_llm_call(call_site: str, seconds: float, outcome: str, prompt_tokens: int = 0, output_tokens: int = 0):
+    llm_calls.labels(call_site, outcome).inc()
+    llm_latency.labels(call_site).observe(seconds)
+    if prompt_tokens:
+        llm_tokens.labels(call_site, "prompt").inc(prompt_tokens)
+    if output_tokens:
+        llm_tokens.labels(call_site, "output").inc(output_tokens)
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording per-route latency, status and in-flight counts.
+
+    Routes are labelled by their path template (/quiz/{quiz_id}) so label
+    cardinality stays bounded; the template for each concrete path is found
+    once and kept in a bounded LRU.
+    """
+
+    def __init__(self, app: ASGIApp, max_paths: int = 10000):
+        self.app = app
+        self.max_paths = max_paths
+        self._templates: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+        self._routes = None
+
+    def _route_template(self, scope: Scope) -> str:
+        key = (scope["method"], scope["path"])
+        template = self._templates.get(key)
+        if template is not None:
+            self._templates.move_to_end(key)
+            return template
+
+        template = "unmatched"
+        for route in scope["app"].router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                template = getattr(route, "path", template)
+                break
+        self._templates[key] = template
+        if len(self._templates) > self.max_paths:
+            self._templates.popitem(last=False)
+        return template
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        method = scope["method"]
+        route = self._route_template(scope)
+        in_flight = http_in_flight.labels(route, method)
+        status_code = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_latency.labels(route, method).observe(time.perf_counter() - start)
+            http_requests.labels(route, method, str(status_code)).inc()
+            in_flight.dec()
+
+
+# Set under gunicorn, so every worker's metrics are reported together
+multiprocess = MultiprocessMetrics(settings.METRICS_DIR, registry) if settings.METRICS_DIR else None
+
+
+def render_metrics() -> str:
+    if multiprocess is not None:
+        return multiprocess.render()
+    return registry.render()
@@ -0,0 +1,285 @@
+"""
+Rate limiting and LLM concurrency quotas.
+
+Each user gets a token bucket per limited route: requests spend one token,
+tokens refill at the configured rate, and an empty bucket answers 429 with
+Retry-After. Buckets live in process memory by default, in shared memory so
+the worker processes of one host share them, or in Redis so all workers of a
+deployment share them.
+
+Independently, LLM calls are capped by a count of slots in shared memory, so
+the limit holds for the whole host however many workers it runs. Callers wait
+briefly for a slot; when the queue is full or the wait times out they get
+LLMOverloaded, which the API turns into 503 with Retry-After.
+"""
+
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from fastapi import Depends, HTTPException, status
+
+from app.core.auth import get_current_user
+from app.core.config import settings
+from app.core.metrics import registry
+from app.core.shared import SharedSlots, SharedTokenBuckets
+from app.db.models import User
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+# Seconds between checks for a shared LLM slot freed by another process
+SHARED_POLL_MIN = 0.005
+SHARED_POLL_MAX = 0.1
+
+rate_limited = registry.counter("rate_limited_total", "Requests rejected by a rate limit.", ("limit",))
+
+
+def parse_rate(rate: str) -> Tuple[int, float]:
+    """
+    Parse a rate such as "20/minute".
+
+    Returns:
+        Tuple of (bucket capacity, refill rate in tokens per second)
+    """
+    count, _, period = rate.partition("/")
+    capacity = int(count)
+    return capacity, capacity / PERIODS[period.strip().rstrip("s")]
+
+
+class RateLimitBackend:
+    """Interface for token bucket storage."""
+
+    async def take(self, key: str, capacity: int, rate: float, cost: int = 1) -> float:
+        """
+        Spend cost tokens from a bucket.
+
+        Returns:
+            0 if the tokens were spent, otherwise seconds until enough have refilled
+        """
+        raise NotImplementedError
+
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    """Per-process buckets, least recently used evicted beyond max_keys."""
+
+    def __init__(self, max_keys: int = 100000, clock: Callable[[], float] = time.monotonic):
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def take(self, key: str, capacity: int, rate: float, cost: int = 1) -> float:
+        now = self.clock()
+        tokens, updated = self._buckets.pop(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * rate)
+
+        if tokens >= cost:
+            tokens -= cost
+            wait = 0.0
+        else:
+            wait = (cost - tokens) / rate
+
+        self._buckets[key] = (tokens, now)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+class SharedMemoryRateLimitBackend(RateLimitBackend):
+    """Buckets shared by the worker processes of one host (see app.core.shared)."""
+
+    def __init__(self, slots: int = 65536):
+        self.buckets = SharedTokenBuckets(slots)
+
+    async def take(self, key: str, capacity: int, rate: float, cost: int = 1) -> float:
+        return self.buckets.take(key, capacity, rate, cost)
+
+
+# Refill and spend atomically; time comes from Redis so workers agree on it
+_TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or capacity
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + (now - updated) * rate)
+
+local wait = 0
+if tokens >= cost then
+    tokens = tokens - cost
+else
+    wait = (cost - tokens) / rate
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return tostring(wait)
+"""
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """Buckets shared by every worker through Redis."""
+
+    def __init__(self, url: str, prefix: str = "ratelimit:"):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires the 'redis' package")
+        self.client = redis.from_url(url)
+        self.prefix = prefix
+        self._script = self.client.register_script(_TOKEN_BUCKET_SCRIPT)
+
+    async def take(self, key: str, capacity: int, rate: float, cost: int = 1) -> float:
+        return float(await self._script(keys=[self.prefix + key], args=[capacity, rate, cost]))
+
+
+class RateLimiter:
+    """Applies named per-user limits against a backend."""
+
+    def __init__(self, backend: RateLimitBackend, limits: Dict[str, str]):
+        self.backend = backend
+        self.limits = {name: parse_rate(rate) for name, rate in limits.items()}
+
+    async def check(self, name: str, user_id: int, cost: int = 1):
+        """
+        Raises:
+            HTTPException: 429 with Retry-After when the user's bucket is empty
+        """
+        capacity, rate = self.limits[name]
+        try:
+            wait = await self.backend.take(f"{name}:{user_id}", capacity, rate, cost)
+        except Exception as e:
+            # A broken limiter store must not take the API down with it
+            print(f"Rate limiter unavailable: {e}")
+            return
+        if wait > 0:
+            rate_limited.labels(name).inc()
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=f"Rate limit exceeded for {name}",
+                headers={"Retry-After": str(math.ceil(wait))},
+            )
+
+
+class LLMOverloaded(Exception):
+    """Raised when no LLM slot became free in time."""
+
+    def __init__(self, retry_after: float):
+        super().__init__("LLM capacity exhausted")
+        self.retry_after = retry_after
+
+
+class LLMConcurrencyLimiter:
+    """
+    Caps concurrent LLM calls with a bounded wait queue.
+
+    With shared slots the cap holds across every worker process on the host
+    rather than per process; waiters queue locally and poll for a free slot.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 8,
+        max_waiting: int = 32,
+        timeout: float = 5.0,
+        slots: Optional[SharedSlots] = None
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self.timeout = timeout
+        self.slots = slots
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.active = 0
+        self.waiting = 0
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        return self._semaphore
+
+    def _take_shared(self) -> bool:
+        return self.slots is None or self.slots.try_acquire(self.max_concurrent)
+
+    async def _acquire(self):
+        await self.semaphore.acquire()
+        try:
+            delay = SHARED_POLL_MIN
+            while not self._take_shared():
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, SHARED_POLL_MAX)
+        except BaseException:
+            self.semaphore.release()
+            raise
+
+    async def __aenter__(self):
+        # Acquiring an unlocked semaphore does not suspend, so the fast path is atomic
+        if not self.semaphore.locked() and self._take_shared():
+            await self.semaphore.acquire()
+        else:
+            if self.waiting >= self.max_waiting:
+                raise LLMOverloaded(self.timeout)
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._acquire(), self.timeout)
+            except asyncio.TimeoutError:
+                raise LLMOverloaded(self.timeout)
+            finally:
+                self.waiting -= 1
+        self.active += 1
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.active -= 1
+        if self.slots is not None:
+            self.slots.release()
+        self.semaphore.release()
+        return False
+
+
+def _create_backend() -> RateLimitBackend:
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        return RedisRateLimitBackend(settings.REDIS_URL)
+    if settings.RATE_LIMIT_BACKEND == "shared":
+        return SharedMemoryRateLimitBackend()
+    return InMemoryRateLimitBackend()
+
+
+rate_limiter = RateLimiter(
+    _create_backend(),
+    {
+        "chat": settings.RATE_LIMIT_CHAT,
+        "essay": settings.RATE_LIMIT_ESSAY,
+        "progress": settings.RATE_LIMIT_PROGRESS,
+        "essay_batch": settings.RATE_LIMIT_ESSAY_BATCH,
+        "adaptive": settings.RATE_LIMIT_ADAPTIVE,
+        "flashcards": settings.RATE_LIMIT_FLASHCARDS,
+    },
+)
+
+llm_limiter = LLMConcurrencyLimiter(
+    max_concurrent=settings.LLM_MAX_CONCURRENCY,
+    max_waiting=settings.LLM_MAX_WAITING,
+    timeout=settings.LLM_QUEUE_TIMEOUT,
+    # Created before workers fork, so the cap is host-wide
+    slots=SharedSlots(),
+)
+
+
+@registry.collector("llm_slots", "gauge", "LLM concurrency slots in use and requests waiting for one.")
+def _llm_slot_samples():
+    yield "llm_slots", {"state": "active"}, llm_limiter.active
+    yield "llm_slots", {"state": "waiting"}, llm_limiter.waiting
+
+
+def rate_limit(name: str):
+    """Route dependency enforcing the named limit for the current user."""
+    async def dependency(current_user: User = Depends(get_current_user)):
+        await rate_limiter.check(name, current_user.id)
+    return dependency
@@ -0,0 +1,222 @@
+"""
+Resilience policies for calls to external services.
+
+Each dependency (Gemini, Pinecone) gets a circuit breaker: after a run of
+consecutive failures it opens and rejects calls immediately with CircuitOpen,
+so callers can fall back at once instead of waiting on a timeout. After a
+cool-down a single trial call is let through to decide whether to close it
+again. Calls are also bounded by a timeout, retried with capped exponential
+backoff and jitter, and can optionally be hedged: if the first attempt is
+slow, a second one is started and whichever finishes first wins.
+"""
+
+import asyncio
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Type
+
+from app.core.metrics import registry
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling a dependency whose breaker is open."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} is unavailable (circuit open)")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a half-open trial call."""
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.clock = clock
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        # Counters for metrics
+        self.calls = 0
+        self.failures = 0
+        self.rejections = 0
+        self.opened = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and self.clock() - self._opened_at >= self.recovery_timeout:
+            return HALF_OPEN
+        return self._state
+
+    def before_call(self):
+        """
+        Raises:
+            CircuitOpen: If the call must not be attempted
+        """
+        state = self.state
+        if state == OPEN or (state == HALF_OPEN and self._trial_in_flight):
+            self.rejections += 1
+            retry_after = max(0.0, self.recovery_timeout - (self.clock() - self._opened_at))
+            raise CircuitOpen(self.name, retry_after)
+        if state == HALF_OPEN:
+            self._trial_in_flight = True
+        self.calls += 1
+
+    def record_success(self):
+        self._trial_in_flight = False
+        self._failures = 0
+        self._state = CLOSED
+
+    def abandon(self):
+        """The call ended without saying anything about the dependency's health."""
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        was_trial = self._trial_in_flight
+        self._trial_in_flight = False
+        self._failures += 1
+        if was_trial or (self._state == CLOSED and self._failures >= self.failure_threshold):
+            self._state = OPEN
+            self._opened_at = self.clock()
+            self.opened += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "calls": self.calls,
+            "failures": self.failures,
+            "rejections": self.rejections,
+            "opened": self.opened,
+        }
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Full-jitter exponential backoff for the given 1-based attempt."""
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+async def hedged(call: Callable[[], Awaitable[Any]], hedge_after: float) -> Any:
+    """
+    Run call, starting a second copy if the first has not finished after hedge_after.
+
+    Returns the first successful result; the other attempt is cancelled. If both
+    fail, the first failure is raised.
+    """
+    first = asyncio.ensure_future(call())
+    pending = {first}
+    error: Optional[BaseException] = None
+    # Cancelling the caller at any await below cancels every attempt still running
+    try:
+        done, _ = await asyncio.wait(pending, timeout=hedge_after)
+        if done:
+            pending = set()
+            return first.result()
+
+        pending.add(asyncio.ensure_future(call()))
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = error or task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+class ResiliencePolicy:
+    """Breaker, timeout, retries and optional hedging for one dependency."""
+
+    def __init__(
+        self,
+        breaker: CircuitBreaker,
+        timeout: float = 30.0,
+        attempts: int = 3,
+        backoff_base: float = 0.2,
+        backoff_cap: float = 2.0,
+        hedge_after: Optional[float] = None,
+        passthrough: Tuple[Type[BaseException], ...] = ()
+    ):
+        self.breaker = breaker
+        self.timeout = timeout
+        self.attempts = attempts
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.hedge_after = hedge_after
+        # Errors that say nothing about the dependency's health (e.g. local overload)
+        self.passthrough = passthrough
+
+    async def _attempt(self, call: Callable[[], Awaitable[Any]]) -> Any:
+        async def bounded():
+            return await asyncio.wait_for(call(), self.timeout)
+
+        if self.hedge_after:
+            return await hedged(bounded, self.hedge_after)
+        return await bounded()
+
+    async def call(self, call: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run call under the policy.
+
+        Raises:
+            CircuitOpen: If the breaker is open (immediately, without calling)
+            Exception: The last failure once attempts are exhausted
+        """
+        for attempt in range(1, self.attempts + 1):
+            self.breaker.before_call()
+            try:
+                result = await self._attempt(call)
+            except (asyncio.CancelledError, *self.passthrough):
+                self.breaker.abandon()
+                raise
+            except Exception:
+                self.breaker.record_failure()
+                if attempt == self.attempts:
+                    raise
+                await asyncio.sleep(backoff_delay(attempt, self.backoff_base, self.backoff_cap))
+            else:
+                self.breaker.record_success()
+                return result
+
+
+breakers: Dict[str, CircuitBreaker] = {}
+
+
+def circuit_breaker(name: str, **kwargs) -> CircuitBreaker:
+    """Get or create the named breaker (registered for health and metrics)."""
+    if name not in breakers:
+        breakers[name] = CircuitBreaker(name, **kwargs)
+    return breakers[name]
+
+
+def breaker_states() -> Dict[str, Dict[str, Any]]:
+    return {name: breaker.snapshot() for name, breaker in breakers.items()}
+
+
+@registry.collector("circuit_breaker_open", "gauge", "1 if the dependency's breaker is open or half-open.", combine="max")
+def _state_samples():
+    for name, breaker in list(breakers.items()):
+        yield "circuit_breaker_open", {"dependency": name}, int(breaker.state != CLOSED)
+
+
+@registry.collector("circuit_breaker_events_total", "counter", "Breaker calls, failures, rejections and openings.")
+def _event_samples():
+    for name, breaker in list(breakers.items()):
+        for event in ("calls", "failures", "rejections", "opened"):
+            yield "circuit_breaker_events_total", {"dependency": name, "event": event}, getattr(breaker, event)
@@ -0,0 +1,63 @@
+"""
+Fast JSON responses.
+
+FastJSONResponse is the app's default response class. It serializes with
+orjson when it is installed, which is several times faster than the standard
+library and writes bytes directly, and falls back to compact `json.dumps`
+otherwise. Both paths produce the same JSON for the types our endpoints
+return, including dates and non-string dict keys.
+
+Handlers with large, plain payloads can return a FastJSONResponse themselves
+to skip FastAPI's `jsonable_encoder` pass. Payloads that never change between
+catalog writes are serialized once and served as RawJSONResponse.
+"""
+
+import datetime
+import json
+from typing import Any
+
+from starlette.responses import JSONResponse, Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson
+    orjson = None
+
+MEDIA_TYPE = "application/json"
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps(content: Any) -> bytes:
+        """Serialize content to compact JSON bytes."""
+        return orjson.dumps(content, default=_default, option=_OPTIONS)
+else:
+    def dumps(content: Any) -> bytes:
+        """Serialize content to compact JSON bytes."""
+        return json.dumps(
+            content, default=_default, ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (datetime.date, datetime.datetime, datetime.time)):
+        return value.isoformat()
+    if hasattr(value, "dict"):
+        # Pydantic models nested in otherwise plain payloads
+        return value.dict()
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class FastJSONResponse(JSONResponse):
+    media_type = MEDIA_TYPE
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class RawJSONResponse(Response):
+    """Response for a body that is already serialized JSON."""
+
+    media_type = MEDIA_TYPE
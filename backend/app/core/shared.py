@@ -0,0 +1,211 @@
+"""
+State shared by the worker processes of one server.
+
+Under gunicorn with preload_app, the app is imported once in the master
+process and workers are forked from it. Anonymous shared memory mapped at
+import time is therefore visible to every worker, which gives a cheap local
+tier for state that must agree across workers on one host: counters such as
+the catalog version, rate-limit token buckets and the host-wide cap on
+concurrent LLM calls. Anything that must agree
+across hosts belongs in Redis or the database instead.
+
+Under a single uvicorn process the same code simply works on private memory.
+"""
+
+import hashlib
+import mmap
+import multiprocessing
+import os
+import struct
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+_COUNTER = struct.Struct("q")
+# key hash, tokens, last update
+_BUCKET = struct.Struct("Qdd")
+_PROBES = 8
+# holder pid, slots held
+_HOLDING = struct.Struct("qq")
+
+
+def process_alive(pid: int) -> bool:
+    """Whether a process with this pid exists on this host."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class SharedCounter:
+    """64-bit integer in shared memory."""
+
+    def __init__(self, arena: "SharedArena", offset: int):
+        self._arena = arena
+        self._offset = offset
+
+    @property
+    def value(self) -> int:
+        return _COUNTER.unpack_from(self._arena.buffer, self._offset)[0]
+
+    @value.setter
+    def value(self, value: int):
+        with self._arena.lock:
+            _COUNTER.pack_into(self._arena.buffer, self._offset, value)
+
+    def increment(self, amount: int = 1) -> int:
+        with self._arena.lock:
+            value = _COUNTER.unpack_from(self._arena.buffer, self._offset)[0] + amount
+            _COUNTER.pack_into(self._arena.buffer, self._offset, value)
+        return value
+
+
+class SharedArena:
+    """
+    Fixed block of anonymous shared memory with named counters.
+
+    Counters must be created at import time, before workers are forked, so
+    every process sees the same layout.
+
+    Args:
+        counters: Number of counter slots
+    """
+
+    def __init__(self, counters: int = 64):
+        self.capacity = counters
+        self.buffer = mmap.mmap(-1, counters * _COUNTER.size)
+        self.lock = multiprocessing.Lock()
+        self._counters: Dict[str, SharedCounter] = {}
+
+    def counter(self, name: str, initial: int = 0) -> SharedCounter:
+        counter = self._counters.get(name)
+        if counter is None:
+            if len(self._counters) == self.capacity:
+                raise RuntimeError("Shared arena is full")
+            counter = SharedCounter(self, len(self._counters) * _COUNTER.size)
+            counter.value = initial
+            self._counters[name] = counter
+        return counter
+
+
+class SharedTokenBuckets:
+    """
+    Token buckets in a fixed-size shared hash table.
+
+    Keys are hashed to 64 bits and placed by open addressing over a short
+    probe window; when the window is full, the least recently updated bucket
+    in it is replaced. Memory stays bounded at slots * 24 bytes.
+
+    Args:
+        slots: Table size
+        clock: Time source shared by all processes
+    """
+
+    def __init__(self, slots: int = 65536, clock: Callable[[], float] = time.monotonic):
+        self.slots = slots
+        self.clock = clock
+        self.buffer = mmap.mmap(-1, slots * _BUCKET.size)
+        self.lock = multiprocessing.Lock()
+
+    def _locate(self, key_hash: int) -> Tuple[int, bool]:
+        """Offset of the key's bucket and whether it already exists."""
+        start = key_hash % self.slots
+        victim, victim_updated = None, float("inf")
+        for probe in range(_PROBES):
+            offset = (start + probe) % self.slots * _BUCKET.size
+            stored_hash, _, updated = _BUCKET.unpack_from(self.buffer, offset)
+            if stored_hash == key_hash:
+                return offset, True
+            if stored_hash == 0:
+                return offset, False
+            if updated < victim_updated:
+                victim, victim_updated = offset, updated
+        return victim, False
+
+    def take(self, key: str, capacity: int, rate: float, cost: int = 1) -> float:
+        """Spend cost tokens; returns 0 or the seconds until enough refill."""
+        # 0 marks an empty slot
+        key_hash = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little") or 1
+        now = self.clock()
+        with self.lock:
+            offset, found = self._locate(key_hash)
+            if found:
+                _, tokens, updated = _BUCKET.unpack_from(self.buffer, offset)
+                tokens = min(capacity, tokens + (now - updated) * rate)
+            else:
+                tokens = capacity
+
+            if tokens >= cost:
+                tokens -= cost
+                wait = 0.0
+            else:
+                wait = (cost - tokens) / rate
+            _BUCKET.pack_into(self.buffer, offset, key_hash, tokens, now)
+        return wait
+
+
+class SharedSlots:
+    """
+    Counting semaphore shared by the worker processes.
+
+    Holdings are recorded per process, so slots held by a worker that was
+    killed mid-call are reclaimed once the limit is reached instead of
+    shrinking the pool until the next restart. Acquiring never blocks;
+    callers poll.
+
+    Args:
+        processes: Most processes that can hold slots at once
+    """
+
+    def __init__(self, processes: int = 256):
+        self.processes = processes
+        self.buffer = mmap.mmap(-1, processes * _HOLDING.size)
+        self.lock = multiprocessing.Lock()
+
+    def _holdings(self):
+        for index in range(self.processes):
+            pid, held = _HOLDING.unpack_from(self.buffer, index * _HOLDING.size)
+            yield index, pid, held
+
+    def _set(self, index: int, pid: int, held: int):
+        _HOLDING.pack_into(self.buffer, index * _HOLDING.size, pid if held else 0, held)
+
+    def try_acquire(self, limit: int, pid: Optional[int] = None) -> bool:
+        """Take a slot if fewer than limit are held across all processes."""
+        pid = pid or os.getpid()
+        with self.lock:
+            holdings = list(self._holdings())
+            in_use = sum(held for _, _, held in holdings)
+            if in_use >= limit:
+                for index, holder, held in holdings:
+                    if held and holder != pid and not process_alive(holder):
+                        self._set(index, 0, 0)
+                        in_use -= held
+                if in_use >= limit:
+                    return False
+                holdings = list(self._holdings())
+            own = next((h for h in holdings if h[1] == pid and h[2]), None)
+            if own is None:
+                own = next((h for h in holdings if not h[2]), None)
+                if own is None:
+                    raise RuntimeError("Shared slot table is full")
+            index, _, held = own
+            self._set(index, pid, held + 1)
+        return True
+
+    def release(self, pid: Optional[int] = None):
+        pid = pid or os.getpid()
+        with self.lock:
+            for index, holder, held in self._holdings():
+                if holder == pid and held:
+                    self._set(index, pid, held - 1)
+                    return
+
+    @property
+    def in_use(self) -> int:
+        return sum(held for _, _, held in self._holdings())
+
+
+arena = SharedArena()
@@ -0,0 +1,288 @@
+"""
+Lightweight request tracing with an OpenTelemetry-compatible span model.
+
+A trace is started per HTTP request (continuing an incoming W3C
+traceparent) and per background job; code marks pipeline stages with
+`tracer.span("chat.context")`. Spans carry 128-bit trace IDs, 64-bit span
+IDs, parent links, attributes and status, and are exported as OTLP-style
+dictionaries. Unsampled requests get a shared no-op span, so tracing costs
+almost nothing when it is off.
+
+With DEBUG enabled every request is recorded and the stage timings are
+returned in a Server-Timing header, which browser dev tools display directly.
+"""
+
+import contextlib
+import json
+import random
+import re
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+_TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+# Server-Timing entries per response, to keep headers small
+MAX_TIMING_ENTRIES = 20
+
+
+class Span:
+    """A timed operation within a trace."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "status", "error")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.status = "unset"
+        self.error: Optional[str] = None
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def record_exception(self, exc: BaseException):
+        self.status = "error"
+        self.error = f"{type(exc).__name__}: {exc}"
+        self.attributes["exception.type"] = type(exc).__name__
+
+    def end(self):
+        self.end_ns = time.time_ns()
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def to_dict(self) -> Dict[str, Any]:
+        """OTLP/JSON-style representation."""
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns,
+            "attributes": dict(self.attributes),
+            "status": {"code": self.status, "message": self.error or ""},
+        }
+
+
+class _NoopSpan:
+    """Stand-in for spans of unrecorded traces."""
+
+    __slots__ = ()
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def record_exception(self, exc: BaseException):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class TraceContext:
+    """State of one trace within the current task."""
+
+    __slots__ = ("trace_id", "parent_id", "sampled", "recording", "spans")
+
+    def __init__(self, trace_id: str, parent_id: Optional[str], sampled: bool, recording: bool):
+        self.trace_id = trace_id
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.recording = recording
+        self.spans: List[Span] = []
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.parent_id or '0' * 16}-{'01' if self.sampled else '00'}"
+
+
+_trace: ContextVar[Optional[TraceContext]] = ContextVar("trace", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class RatioSampler:
+    """
+    Samples a fixed fraction of traces, consistently by trace ID.
+
+    Incoming traceparent sampling decisions are respected so a trace is either
+    complete across services or absent.
+    """
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self._bound = int(rate * (1 << 64))
+
+    def should_sample(self, trace_id: str, parent_sampled: Optional[bool] = None) -> bool:
+        if parent_sampled is not None:
+            return parent_sampled
+        return int(trace_id[16:], 16) < self._bound
+
+
+class SpanExporter:
+    def export(self, span: Span):
+        raise NotImplementedError
+
+
+class InMemorySpanExporter(SpanExporter):
+    """Keeps the most recent finished spans (for tests and debugging)."""
+
+    def __init__(self, max_spans: int = 10000):
+        self.spans: deque = deque(maxlen=max_spans)
+
+    def export(self, span: Span):
+        self.spans.append(span)
+
+    def clear(self):
+        self.spans.clear()
+
+    def by_name(self, name: str) -> List[Span]:
+        return [span for span in self.spans if span.name == name]
+
+
+class ConsoleSpanExporter(SpanExporter):
+    """Prints one JSON line per finished span."""
+
+    def export(self, span: Span):
+        print(json.dumps(span.to_dict()))
+
+
+class Tracer:
+    def __init__(self, sampler: RatioSampler, exporter: Optional[SpanExporter] = None, debug: bool = False):
+        self.sampler = sampler
+        self.exporter = exporter
+        self.debug = debug
+
+    def start_trace(self, traceparent: Optional[str] = None) -> TraceContext:
+        """Create a trace context, continuing traceparent if it is valid."""
+        match = _TRACEPARENT_RE.match(traceparent or "")
+        if match and match.group(1) != "0" * 32:
+            trace_id, parent_id = match.group(1), match.group(2)
+            sampled = self.sampler.should_sample(trace_id, bool(int(match.group(3), 16) & 1))
+        else:
+            trace_id, parent_id = f"{random.getrandbits(128):032x}", None
+            sampled = self.sampler.should_sample(trace_id)
+        return TraceContext(trace_id, parent_id, sampled, recording=sampled or self.debug)
+
+    @contextlib.contextmanager
+    def trace(self, name: str, traceparent: Optional[str] = None, **attributes) -> Iterator[Any]:
+        """Start a new trace with a root span (for requests and background jobs)."""
+        context = self.start_trace(traceparent)
+        token = _trace.set(context)
+        try:
+            with self.span(name, **attributes) as span:
+                yield span
+        finally:
+            _trace.reset(token)
+
+    @contextlib.contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Any]:
+        """Time a stage of the current trace; a no-op outside recorded traces."""
+        context = _trace.get()
+        if context is None or not context.recording:
+            yield NOOP_SPAN
+            return
+
+        parent = _current_span.get()
+        span = Span(name, context.trace_id, parent.span_id if parent else context.parent_id, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            span.end()
+            _current_span.reset(token)
+            context.spans.append(span)
+            if context.sampled and self.exporter is not None:
+                self.exporter.export(span)
+
+
+def current_trace() -> Optional[TraceContext]:
+    return _trace.get()
+
+
+def server_timing(spans: List[Span]) -> str:
+    """Format finished spans as a Server-Timing header value."""
+    entries = []
+    for span in spans[:MAX_TIMING_ENTRIES]:
+        entries.append(f"{re.sub(r'[^A-Za-z0-9_.-]', '_', span.name)};dur={span.duration_ms:.1f}")
+    return ", ".join(entries)
+
+
+class TracingMiddleware:
+    """
+    Pure ASGI middleware starting a trace per request.
+
+    The root span is named after the matched route template once routing has
+    happened. In debug mode, finished stage spans are added to the response
+    as Server-Timing.
+    """
+
+    def __init__(self, app: ASGIApp, tracer: Optional[Tracer] = None):
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        tracer = self.tracer if self.tracer is not None else get_tracer()
+        traceparent = None
+        for key, value in scope["headers"]:
+            if key == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+
+        with tracer.trace(f"{scope['method']} {scope['path']}", traceparent) as root:
+            context = current_trace()
+            start = time.perf_counter()
+
+            async def send_wrapper(message: Message):
+                if message["type"] == "http.response.start":
+                    root.set_attribute("http.status_code", message["status"])
+                    if tracer.debug and context.recording:
+                        headers = MutableHeaders(scope=message)
+                        timings = server_timing(context.spans)
+                        total = f"total;dur={(time.perf_counter() - start) * 1000:.1f}"
+                        headers.append("Server-Timing", f"{timings}, {total}" if timings else total)
+                        headers.append("Timing-Allow-Origin", "*")
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = scope.get("route")
+                if context.recording:
+                    root.set_attribute("http.method", scope["method"])
+                    if route is not None and hasattr(route, "path"):
+                        root.set_attribute("http.route", route.path)
+                        root.name = f"{scope['method']} {route.path}"
+
+
+def _create_exporter() -> Optional[SpanExporter]:
+    if settings.TRACE_EXPORTER == "console":
+        return ConsoleSpanExporter()
+    if settings.TRACE_EXPORTER == "memory":
+        return InMemorySpanExporter()
+    return None
+
+
+tracer = Tracer(RatioSampler(settings.TRACE_SAMPLE_RATE), _create_exporter(), debug=settings.DEBUG)
+
+
+def get_tracer() -> Tracer:
+    return tracer
@@ -0,0 +1,347 @@
+"""
+Bulk import and export of quizzes and questions.
+
+    python -m app.db.bulk import questions.jsonl [--job NAME] [--rejects rejects.jsonl]
+    python -m app.db.bulk export questions.csv [--topic algebra]
+
+Files hold one question per row, as JSONL or CSV (chosen by extension or
+--format):
+
+    {"quiz": "alg-1", "topic": "algebra", "difficulty": "medium",
+     "prompt": "...", "choices": ["...", "..."], "answer": 1}
+
+In CSV, choices is a JSON array. Rows sharing a quiz key become one quiz;
+without a key, each (topic, difficulty) becomes one quiz.
+
+Imports read the file as a stream and validate, insert and commit it in
+batches. Questions are written with COPY on Postgres and with executemany
+elsewhere. Each commit also records how many input rows are done, so an
+interrupted import rerun with the same job name resumes after the last
+committed batch without duplicating rows. Invalid rows are counted and
+written to the rejects file instead of stopping the import.
+
+Exports stream rows through a server-side cursor, so memory stays flat
+however large the bank is.
+
+Each committed batch also bumps the catalog version stored in the database.
+Running servers do not share memory with this command; they poll that
+version and drop their catalog caches within CATALOG_VERSION_POLL_INTERVAL
+seconds. Exports include the bank quizzes of generated adaptive questions,
+and imports accept their "bank" difficulty, so an export imports back
+unchanged.
+"""
+
+import argparse
+import asyncio
+import csv
+import datetime
+import hashlib
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Tuple
+
+from pydantic import BaseModel, ValidationError, validator
+from sqlalchemy import insert
+from sqlalchemy.future import select
+
+from app.core.cache import invalidate_catalog, publish_catalog_change
+from app.db.models import BANK_DIFFICULTY, ImportJob, ImportQuizKey, Question, Quiz
+
+DIFFICULTIES = ("easy", "medium", "hard", BANK_DIFFICULTY)
+FIELDS = ["quiz", "topic", "difficulty", "prompt", "choices", "answer"]
+BATCH_SIZE = 5000
+
+
+class QuestionRow(BaseModel):
+    quiz: Optional[str] = None
+    topic: str
+    difficulty: str = "medium"
+    prompt: str
+    choices: List[str]
+    answer: int
+
+    @validator("topic", "prompt")
+    def not_blank(cls, value):
+        if not value.strip():
+            raise ValueError("must not be blank")
+        return value
+
+    @validator("difficulty")
+    def known_difficulty(cls, value):
+        if value not in DIFFICULTIES:
+            raise ValueError(f"must be one of {', '.join(DIFFICULTIES)}")
+        return value
+
+    @validator("choices", pre=True)
+    def decode_choices(cls, value):
+        # CSV cells carry the list as JSON
+        return json.loads(value) if isinstance(value, str) else value
+
+    @validator("answer")
+    def answer_in_choices(cls, value, values):
+        choices = values.get("choices")
+        if choices is not None and not 0 <= value < len(choices):
+            raise ValueError("must index into choices")
+        return value
+
+    @property
+    def quiz_key(self) -> str:
+        return self.quiz or f"{self.topic}/{self.difficulty}"
+
+
+def detect_format(path: str, fmt: Optional[str] = None) -> str:
+    if fmt:
+        return fmt
+    return "csv" if path.lower().endswith(".csv") else "jsonl"
+
+
+def read_rows(f: TextIO, fmt: str, skip: int = 0) -> Iterator[Tuple[int, Any]]:
+    """
+    Yield (row number, raw row) from a JSONL or CSV stream, skipping the
+    first skip rows. Lines that cannot be decoded are yielded as ValueError.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(f)
+        for number, row in enumerate(reader, 1):
+            if number > skip:
+                yield number, {key: value for key, value in row.items() if value != ""}
+        return
+
+    number = 0
+    for line in f:
+        if not line.strip():
+            continue
+        number += 1
+        if number <= skip:
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError as e:
+            yield number, e
+
+
+def validate(batch: List[Tuple[int, Any]]) -> Tuple[List[QuestionRow], List[Dict[str, Any]]]:
+    """Split a chunk of raw rows into valid rows and rejects."""
+    valid, rejects = [], []
+    for number, raw in batch:
+        try:
+            if isinstance(raw, Exception):
+                raise raw
+            valid.append(QuestionRow.parse_obj(raw))
+        except (ValidationError, ValueError, TypeError) as e:
+            rejects.append({"row": number, "error": str(e), "data": raw if isinstance(raw, dict) else None})
+    return valid, rejects
+
+
+def default_job_id(path: str) -> str:
+    """Job name derived from the file's path, size and modification time."""
+    stat = os.stat(path)
+    basis = f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+    return f"{os.path.basename(path)}-{hashlib.blake2b(basis.encode(), digest_size=6).hexdigest()}"
+
+
+async def _quiz_ids(session, job_id: str, rows: List[QuestionRow]) -> Dict[str, int]:
+    """Quiz ID for every key in the batch, creating quizzes for new keys."""
+    keys = {row.quiz_key: row for row in rows}
+    known = dict((await session.execute(
+        select(ImportQuizKey.key, ImportQuizKey.quiz_id)
+        .where(ImportQuizKey.job_id == job_id, ImportQuizKey.key.in_(list(keys)))
+    )).all())
+
+    new_keys = [key for key in keys if key not in known]
+    if new_keys:
+        result = await session.execute(
+            insert(Quiz).returning(Quiz.id, sort_by_parameter_order=True),
+            [{"topic": keys[key].topic, "difficulty": keys[key].difficulty} for key in new_keys],
+        )
+        created = dict(zip(new_keys, result.scalars()))
+        await session.execute(
+            insert(ImportQuizKey),
+            [{"job_id": job_id, "key": key, "quiz_id": quiz_id} for key, quiz_id in created.items()],
+        )
+        known.update(created)
+    return known
+
+
+async def _insert_questions(session, records: List[Dict[str, Any]]):
+    connection = await session.connection()
+    if connection.dialect.driver == "asyncpg":
+        # COPY streams the batch in one round trip, several times faster than INSERT
+        raw = await connection.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            Question.__tablename__,
+            records=[(r["quiz_id"], r["prompt"], r["choices"], r["answer"]) for r in records],
+            columns=["quiz_id", "prompt", "choices", "answer"],
+        )
+    else:
+        await session.execute(insert(Question), records)
+
+
+async def import_questions(
+    session,
+    f: TextIO,
+    fmt: str = "jsonl",
+    job_id: str = "import",
+    source: Optional[str] = None,
+    batch_size: int = BATCH_SIZE,
+    rejects: Optional[TextIO] = None,
+) -> ImportJob:
+    """
+    Import questions from a stream, committing after every batch.
+
+    Args:
+        session: Database session, committed once per batch
+        f: Text stream of JSONL or CSV rows
+        fmt: "jsonl" or "csv"
+        job_id: Name under which progress is recorded; reuse it to resume
+        source: Description of the input, stored with the job
+        batch_size: Rows per transaction
+        rejects: Optional stream receiving invalid rows as JSONL
+
+    Returns:
+        The job with final counts
+    """
+    job = await session.get(ImportJob, job_id)
+    if job is None:
+        job = ImportJob(
+            id=job_id, source=source, rows_done=0, rows_imported=0, rows_rejected=0, status="running"
+        )
+        session.add(job)
+        await session.commit()
+    if job.status == "done":
+        return job
+
+    started, skipped = time.perf_counter(), job.rows_done
+    batch: List[Tuple[int, Any]] = []
+    rows = read_rows(f, fmt, skip=job.rows_done)
+    while True:
+        batch.clear()
+        for item in rows:
+            batch.append(item)
+            if len(batch) == batch_size:
+                break
+        if not batch:
+            break
+
+        valid, invalid = validate(batch)
+        if valid:
+            quiz_ids = await _quiz_ids(session, job_id, valid)
+            await _insert_questions(session, [
+                {
+                    "quiz_id": quiz_ids[row.quiz_key],
+                    "prompt": row.prompt,
+                    "choices": json.dumps(row.choices),
+                    "answer": str(row.answer),
+                }
+                for row in valid
+            ])
+        job.rows_done = batch[-1][0]
+        job.rows_imported += len(valid)
+        job.rows_rejected += len(invalid)
+        job.updated_at = datetime.datetime.utcnow()
+        if valid:
+            await publish_catalog_change(session)
+        # Progress and rows land in the same transaction, so a resume never duplicates
+        await session.commit()
+        if valid:
+            # Core inserts bypass the ORM hooks that normally do this
+            invalidate_catalog()
+
+        if rejects is not None:
+            for reject in invalid:
+                rejects.write(json.dumps(reject) + "\n")
+        elapsed = time.perf_counter() - started
+        print(f"{job_id}: {job.rows_done:,} rows ({(job.rows_done - skipped) / elapsed:,.0f}/s), "
+              f"{job.rows_rejected:,} rejected", file=sys.stderr)
+
+    job.status = "done"
+    job.updated_at = datetime.datetime.utcnow()
+    await session.commit()
+    return job
+
+
+async def export_questions(
+    session,
+    out: TextIO,
+    fmt: str = "jsonl",
+    topic: Optional[str] = None,
+    batch_size: int = BATCH_SIZE,
+) -> int:
+    """
+    Stream questions to a file in the import format, using a server-side cursor.
+
+    Returns:
+        Number of rows written
+    """
+    query = (
+        select(Quiz.id, Quiz.topic, Quiz.difficulty, Question.prompt, Question.choices, Question.answer)
+        .join(Quiz, Question.quiz_id == Quiz.id)
+        .order_by(Question.id)
+        .execution_options(yield_per=batch_size)
+    )
+    if topic:
+        query = query.where(Quiz.topic == topic)
+
+    writer = None
+    if fmt == "csv":
+        writer = csv.writer(out)
+        writer.writerow(FIELDS)
+
+    count = 0
+    result = await session.stream(query)
+    async for partition in result.partitions():
+        for quiz_id, quiz_topic, difficulty, prompt, choices, answer in partition:
+            choices = choices if isinstance(choices, str) else json.dumps(choices)
+            if writer is not None:
+                writer.writerow([quiz_id, quiz_topic, difficulty, prompt, choices, answer])
+            else:
+                out.write(json.dumps({
+                    "quiz": str(quiz_id),
+                    "topic": quiz_topic,
+                    "difficulty": difficulty,
+                    "prompt": prompt,
+                    "choices": json.loads(choices),
+                    "answer": int(answer),
+                }) + "\n")
+        count += len(partition)
+    return count
+
+
+async def _main(args):
+    from app.db.session import AsyncSessionLocal
+
+    fmt = detect_format(args.path, args.format)
+    async with AsyncSessionLocal() as session:
+        if args.command == "import":
+            rejects = open(args.rejects, "a") if args.rejects else None
+            try:
+                with open(args.path, newline="") as f:
+                    job = await import_questions(
+                        session, f, fmt, args.job or default_job_id(args.path), args.path, args.batch_size, rejects
+                    )
+            finally:
+                if rejects is not None:
+                    rejects.close()
+            print(f"Imported {job.rows_imported:,} questions, rejected {job.rows_rejected:,} (job {job.id})")
+        else:
+            with open(args.path, "w", newline="") as out:
+                count = await export_questions(session, out, fmt, args.topic, args.batch_size)
+            print(f"Exported {count:,} questions to {args.path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="Defaults to the file extension")
+    parser.add_argument("--job", help="Import job name; rerun with the same name to resume")
+    parser.add_argument("--rejects", help="File receiving invalid rows (JSONL)")
+    parser.add_argument("--topic", help="Export only this topic")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 
 import datetime
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Index, Float, UniqueConstraint
 from sqlalchemy.orm import relationship
 from app.db.base import Base
 
@@ -18,13 +18,20 @@ class User(Base):
 class Essay(Base):
     __tablename__ = "essays"
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
     content = Column(Text)
     feedback = Column(Text)
+    analysis = Column(Text)  # JSON encoded scores and improvements
+    minhash = Column(Text)  # JSON encoded MinHash signature
+    essay_type = Column(String, default="general")
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
 
     user = relationship("User", back_populates="essays")
 
+# Difficulty of the per-topic quizzes holding questions generated for adaptive
+# sessions; they are not part of the quiz catalog
+BANK_DIFFICULTY = "bank"
+
 class Quiz(Base):
     __tablename__ = "quizzes"
     id = Column(Integer, primary_key=True, index=True)
@@ -49,7 +56,135 @@ class QuizResult(Base):
     user_id = Column(Integer, ForeignKey("users.id"))
     quiz_id = Column(Integer, ForeignKey("quizzes.id"))
     score = Column(Integer)
+    correct_count = Column(Integer)
+    total_questions = Column(Integer)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
 
     user = relationship("User", back_populates="quizzes")
     quiz = relationship("Quiz")
+
+class AnalysisJob(Base):
+    __tablename__ = "analysis_jobs"
+    id = Column(String, primary_key=True)
+    kind = Column(String, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    payload = Column(Text)  # JSON encoded
+    status = Column(String, default="queued")
+    attempts = Column(Integer, default=0)
+    result = Column(Text)  # JSON encoded
+    checkpoints = Column(Text)  # JSON encoded results of completed steps, kept across retries
+    error = Column(Text)
+    run_after = Column(DateTime, default=datetime.datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+    __table_args__ = (Index("ix_analysis_jobs_status_run_after", "status", "run_after"),)
+
+class ChatInteraction(Base):
+    __tablename__ = "chat_interactions"
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    message = Column(Text)
+    response = Column(Text)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+
+    __table_args__ = (Index("ix_chat_interactions_user_created", "user_id", "created_at"),)
+
+class UserProgress(Base):
+    __tablename__ = "user_progress"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    quiz_attempts = Column(Integer, default=0, nullable=False)
+    score_total = Column(Integer, default=0, nullable=False)
+    score_ema = Column(Float)
+    first_score = Column(Integer)
+    last_score = Column(Integer)
+    essay_submissions = Column(Integer, default=0, nullable=False)
+    chat_interactions = Column(Integer, default=0, nullable=False)
+    topic_stats = Column(Text)  # JSON encoded {topic: {correct, total, accuracy_ema}}
+    narrative = Column(Text)  # JSON encoded cached LLM insights
+    narrative_basis = Column(Text)  # JSON encoded rollup snapshot the narrative was written for
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+class QuestionStats(Base):
+    __tablename__ = "question_stats"
+    question_id = Column(Integer, ForeignKey("questions.id"), primary_key=True)
+    difficulty = Column(Float, nullable=False)  # IRT b, on the ability scale
+    discrimination = Column(Float, default=1.0, nullable=False)  # IRT a
+    responses = Column(Integer, default=0, nullable=False)
+
+class QuestionResponse(Base):
+    __tablename__ = "question_responses"
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    question_id = Column(Integer, ForeignKey("questions.id"), nullable=False)
+    correct = Column(Boolean, nullable=False)
+    ability = Column(Float)  # Estimate before this answer
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+
+    __table_args__ = (Index("ix_question_responses_user_question", "user_id", "question_id"),)
+
+class UserAbility(Base):
+    __tablename__ = "user_abilities"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    topic = Column(String, primary_key=True)
+    theta = Column(Float, nullable=False)
+    information = Column(Float, default=0.0, nullable=False)  # Decayed Fisher information of recent answers
+    responses = Column(Integer, default=0, nullable=False)
+    served_question_id = Column(Integer, ForeignKey("questions.id"))  # Served and not yet answered
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+class FlashcardDeck(Base):
+    __tablename__ = "flashcard_decks"
+    id = Column(Integer, primary_key=True)
+    topic = Column(String, nullable=False)
+    subtopic = Column(String, default="", nullable=False)  # "" for the whole topic
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+    cards = relationship("Flashcard", back_populates="deck")
+
+    __table_args__ = (UniqueConstraint("topic", "subtopic", name="uq_flashcard_decks_topic_subtopic"),)
+
+class Flashcard(Base):
+    __tablename__ = "flashcards"
+    id = Column(Integer, primary_key=True)
+    deck_id = Column(Integer, ForeignKey("flashcard_decks.id"), index=True, nullable=False)
+    front = Column(Text, nullable=False)
+    back = Column(Text, nullable=False)
+
+    deck = relationship("FlashcardDeck", back_populates="cards")
+
+class FlashcardReview(Base):
+    __tablename__ = "flashcard_reviews"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    card_id = Column(Integer, ForeignKey("flashcards.id"), primary_key=True)
+    ease = Column(Float, default=2.5, nullable=False)
+    interval_days = Column(Float, default=0.0, nullable=False)
+    repetitions = Column(Integer, default=0, nullable=False)  # Consecutive successful reviews
+    lapses = Column(Integer, default=0, nullable=False)
+    due_at = Column(DateTime, nullable=False)
+    reviewed_at = Column(DateTime)
+
+    __table_args__ = (Index("ix_flashcard_reviews_user_due", "user_id", "due_at"),)
+
+class ImportJob(Base):
+    __tablename__ = "import_jobs"
+    id = Column(String, primary_key=True)
+    source = Column(String)
+    rows_done = Column(Integer, default=0, nullable=False)  # Input rows committed, valid or not
+    rows_imported = Column(Integer, default=0, nullable=False)
+    rows_rejected = Column(Integer, default=0, nullable=False)
+    status = Column(String, default="running")
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+class CatalogState(Base):
+    """Catalog version in the database, for writers outside the server processes."""
+    __tablename__ = "catalog_state"
+    id = Column(Integer, primary_key=True)  # Single row, id 1
+    version = Column(Integer, default=0, nullable=False)
+
+class ImportQuizKey(Base):
+    __tablename__ = "import_quiz_keys"
+    job_id = Column(String, ForeignKey("import_jobs.id"), primary_key=True)
+    key = Column(String, primary_key=True)  # Quiz key used in the import file
+    quiz_id = Column(Integer, ForeignKey("quizzes.id"), nullable=False)
@@ -3,10 +3,18 @@ from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 
 from app.core.config import settings
+from app.core.metrics import registry
 
 engine = create_async_engine(settings.DATABASE_URL, echo=False, future=True)
 AsyncSessionLocal = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
 
+@registry.collector("db_pool_connections", "gauge", "Database pool connections by state.")
+def _pool_samples():
+    pool = engine.pool
+    for state, reader in (("size", "size"), ("checked_out", "checkedout"), ("overflow", "overflow")):
+        if hasattr(pool, reader):
+            yield "db_pool_connections", {"state": state}, getattr(pool, reader)()
+
 async def get_session():
     async with AsyncSessionLocal() as session:
         yield session
@@ -0,0 +1,43 @@
+"""
+INSERT ... ON CONFLICT for the databases the app runs on (Postgres, SQLite).
+
+Per-key rows (rollups, abilities, question statistics) are created on first
+use by whichever request gets there first. Checking for the row and then
+inserting it races with concurrent requests for the same key, and the loser's
+IntegrityError would roll back its whole transaction; an ON CONFLICT insert
+lets the database settle it.
+"""
+
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.dialects import postgresql, sqlite
+
+_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+async def upsert(
+    session,
+    model,
+    rows: List[Dict[str, Any]],
+    set_: Optional[Dict[str, Any]] = None,
+):
+    """
+    Insert rows, resolving primary-key conflicts in the database.
+
+    Args:
+        session: Active database session; the caller commits
+        model: Mapped class to insert into
+        rows: Column values of each row
+        set_: Values applied to an existing row on conflict; by default
+            existing rows are left untouched
+    """
+    if not rows:
+        return
+    connection = await session.connection()
+    statement = _INSERTS[connection.dialect.name](model).values(rows)
+    keys = [column.name for column in model.__table__.primary_key]
+    if set_:
+        statement = statement.on_conflict_do_update(index_elements=keys, set_=set_)
+    else:
+        statement = statement.on_conflict_do_nothing(index_elements=keys)
+    await session.execute(statement)
@@ -1,10 +1,37 @@
-from fastapi import FastAPI
+import asyncio
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
-from app.api.routers import auth, chat, essay, quiz, college, scholarship
+from app.api.routers import auth, chat, essay, quiz, flashcards, college, scholarship, progress, analytics
+from app.core.cache import ResponseCacheMiddleware, watch_catalog_version
+from app.core.compression import CompressionMiddleware
+from app.core.config import settings
+from app.core.docs import (
+    SWAGGER_UI_DIR,
+    SWAGGER_UI_PATH,
+    OpenAPIDocument,
+    VersionedStaticFiles,
+    swagger_asset_url,
+    swagger_ui_vendored,
+)
+from app.core.metrics import CONTENT_TYPE, MetricsMiddleware, multiprocess, render_metrics
+from app.core.ratelimit import LLMOverloaded
+from app.core.responses import FastJSONResponse
+from app.core.resilience import CircuitOpen, OPEN, breaker_states
+from app.core.tracing import TracingMiddleware
+from app.db.session import AsyncSessionLocal
+from app.services.essay_batch import batch_scheduler
+from app.services.jobs import job_queue
+from app.services.chat import chat_service
+from app.services.chat_log import chat_log
 from fastapi.openapi.docs import get_swagger_ui_html
 from fastapi.openapi.utils import get_openapi
 
-app = FastAPI(title="SATHELP24x7 API")
+# The built-in docs routes are replaced by the cached ones below
+app = FastAPI(title="SATHELP24x7 API", default_response_class=FastJSONResponse, openapi_url=None)
+
+# Registered first so CORS headers are also applied to cached responses
+app.add_middleware(ResponseCacheMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -14,32 +41,141 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outside the cache, whose hits already carry a precompressed body
+app.add_middleware(CompressionMiddleware)
+
+# Inside metrics, so a request's trace covers CORS, the cache and the route
+app.add_middleware(TracingMiddleware)
+
+# Outermost, so latency includes every other middleware and cached responses
+app.add_middleware(MetricsMiddleware)
+
 app.include_router(auth.router, prefix="/auth", tags=["auth"])
 app.include_router(chat.router, tags=["chat"])
 app.include_router(essay.router, tags=["essay"])
 app.include_router(quiz.router, tags=["quiz"])
+app.include_router(flashcards.router, tags=["flashcards"])
 app.include_router(college.router, tags=["college"])
 app.include_router(scholarship.router, tags=["scholarship"])
+app.include_router(progress.router, tags=["progress"])
+app.include_router(analytics.router, tags=["analytics"])
+
+@app.exception_handler(LLMOverloaded)
+async def llm_overloaded_handler(request: Request, exc: LLMOverloaded):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "The tutor is busy right now, please try again shortly"},
+        headers={"Retry-After": str(round(exc.retry_after))},
+    )
+
+@app.exception_handler(CircuitOpen)
+async def circuit_open_handler(request: Request, exc: CircuitOpen):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "The tutor is temporarily unavailable, please try again shortly"},
+        headers={"Retry-After": str(max(1, round(exc.retry_after)))},
+    )
+
+@app.on_event("startup")
+async def start_job_workers():
+    await job_queue.start()
+
+@app.on_event("startup")
+async def start_chat_log():
+    await chat_log.start()
+    await chat_service.replay_pending()
+
+@app.on_event("shutdown")
+async def stop_job_workers():
+    await asyncio.gather(
+        job_queue.stop(timeout=settings.SHUTDOWN_DRAIN_TIMEOUT),
+        batch_scheduler.stop(timeout=settings.SHUTDOWN_DRAIN_TIMEOUT),
+    )
+
+@app.on_event("shutdown")
+async def stop_chat_log():
+    # Pending summaries and replays may still append to the log; flush last
+    try:
+        await asyncio.wait_for(chat_service.drain(), settings.SHUTDOWN_DRAIN_TIMEOUT)
+    except asyncio.TimeoutError:
+        print("Chat background work did not finish before shutdown")
+    # Vector writes still held in memory survive the restart on disk
+    await chat_service.spill.persist()
+    await chat_log.stop()
+
+_catalog_watch = None
+
+@app.on_event("startup")
+async def start_catalog_watch():
+    # Bulk imports run in another process and publish their changes in the database
+    global _catalog_watch
+    _catalog_watch = asyncio.create_task(
+        watch_catalog_version(AsyncSessionLocal, settings.CATALOG_VERSION_POLL_INTERVAL)
+    )
+
+@app.on_event("shutdown")
+async def stop_catalog_watch():
+    if _catalog_watch is not None:
+        _catalog_watch.cancel()
+
+_metrics_snapshots = None
+
+@app.on_event("startup")
+async def start_metrics_snapshots():
+    global _metrics_snapshots
+    if multiprocess is not None:
+        _metrics_snapshots = asyncio.create_task(multiprocess.run())
+
+@app.on_event("shutdown")
+async def stop_metrics_snapshots():
+    # Registered last, so the final snapshot includes the other shutdown handlers' work
+    if _metrics_snapshots is not None:
+        _metrics_snapshots.cancel()
+        multiprocess.write()
 
 @app.get("/")
 def read_root():
     return {"status": "running", "app": "SATHELP24x7", "version": "0.1.0"}
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
+
+@app.get("/health")
+def health():
+    dependencies = breaker_states()
+    degraded = any(state["state"] == OPEN for state in dependencies.values())
+    return {"status": "degraded" if degraded else "ok", "dependencies": dependencies}
+
 # Custom OpenAPI documentation
+openapi_document = OpenAPIDocument(lambda: get_openapi(
+    title="SATHELP24x7 API",
+    version="0.1.0",
+    description="API documentation for the SATHELP24x7 platform",
+    routes=app.routes,
+))
+app.openapi = openapi_document.schema
+
+if swagger_ui_vendored():
+    app.mount(SWAGGER_UI_PATH, VersionedStaticFiles(directory=SWAGGER_UI_DIR), name="swagger-ui")
+
+@app.on_event("startup")
+async def build_openapi_schema():
+    # All routes are registered by now; build before the first poll arrives
+    openapi_document.schema()
+
 @app.get("/docs", include_in_schema=False)
 async def custom_swagger_ui_html():
     return get_swagger_ui_html(
         openapi_url="/openapi.json",
         title="SATHELP24x7 API Documentation",
-        swagger_js_url="https://unpkg.com/swagger-ui-dist@4.5.0/swagger-ui-bundle.js",
-        swagger_css_url="https://unpkg.com/swagger-ui-dist@4.5.0/swagger-ui.css",
+        swagger_js_url=swagger_asset_url("swagger-ui-bundle.js"),
+        swagger_css_url=swagger_asset_url("swagger-ui.css"),
+        swagger_favicon_url=swagger_asset_url("favicon-32x32.png"),
     )
 
 @app.get("/openapi.json", include_in_schema=False)
-async def get_open_api_endpoint():
-    return get_openapi(
-        title="SATHELP24x7 API",
-        version="0.1.0",
-        description="API documentation for the SATHELP24x7 platform",
-        routes=app.routes,
+async def get_open_api_endpoint(request: Request):
+    return openapi_document.response(
+        request.headers.get("if-none-match"), request.headers.get("accept-encoding")
     )
\ No newline at end of file
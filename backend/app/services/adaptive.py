@@ -0,0 +1,362 @@
+"""
+Adaptive question selection with item response theory.
+
+Questions carry a difficulty b and a discrimination a (the 2PL model): a
+student of ability theta answers correctly with probability
+1 / (1 + exp(-a * (theta - b))). Abilities (per user and topic) and question
+difficulties are updated online, Elo style, after every answer, and the next
+question is the unanswered one that carries the most information
+a^2 * p * (1 - p) at the student's current ability.
+
+Item banks are kept per topic as numpy arrays sorted by difficulty, so
+selection is a binary search plus a vectorized argmax over a small window
+around the student's ability. A student's first ability estimate comes from
+their quiz accuracy on the topic, so quiz history counts before any
+per-question answers exist.
+"""
+
+import bisect
+import datetime
+import json
+import math
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy.future import select
+
+from app.core.cache import catalog_version
+from app.core.config import settings
+from app.db.models import (
+    BANK_DIFFICULTY,
+    Question,
+    QuestionResponse,
+    QuestionStats,
+    Quiz,
+    UserAbility,
+    UserProgress,
+)
+from app.db.upsert import upsert
+
+# Starting difficulty of questions without calibrated parameters
+DIFFICULTY_PRIORS = {"easy": -1.0, "medium": 0.0, "hard": 1.0}
+
+# Step sizes of the online updates; ability steps shrink as evidence accumulates
+ABILITY_K = 0.6
+MIN_ABILITY_K = 0.15
+ITEM_K = 0.05
+
+# Older answers count less, so the estimate follows a student who is learning
+INFORMATION_DECAY = 0.95
+
+THETA_BOUND = 4.0
+
+# Candidates scored around the binary-search position
+SELECTION_WINDOW = 32
+
+
+def p_correct(theta, a, b):
+    """Probability of a correct answer under the 2PL model (numpy-friendly)."""
+    return 1.0 / (1.0 + np.exp(-a * (theta - b)))
+
+
+def information(theta, a, b):
+    """Fisher information of a question at ability theta."""
+    p = p_correct(theta, a, b)
+    return a * a * p * (1.0 - p)
+
+
+def standard_error(total_information: float) -> float:
+    return 1.0 / math.sqrt(total_information) if total_information > 0 else float("inf")
+
+
+def initial_ability(accuracy: Optional[float]) -> float:
+    """Ability implied by a past accuracy on medium questions (0 without history)."""
+    if accuracy is None:
+        return 0.0
+    accuracy = min(max(accuracy, 0.05), 0.95)
+    return math.log(accuracy / (1.0 - accuracy))
+
+
+def difficulty_label(theta: float) -> str:
+    """Difficulty label whose prior is closest to theta (for question generation)."""
+    return min(DIFFICULTY_PRIORS, key=lambda label: abs(DIFFICULTY_PRIORS[label] - theta))
+
+
+def _clip(theta: float) -> float:
+    return min(max(theta, -THETA_BOUND), THETA_BOUND)
+
+
+class ItemBank:
+    """
+    Question parameters for one topic, sorted by difficulty.
+
+    Args:
+        ids: Question IDs
+        discrimination: IRT a per question
+        difficulty: IRT b per question
+    """
+
+    def __init__(self, ids: Iterable[int], discrimination: Iterable[float], difficulty: Iterable[float]):
+        ids = np.asarray(list(ids), dtype=np.int64)
+        a = np.asarray(list(discrimination), dtype=np.float64)
+        b = np.asarray(list(difficulty), dtype=np.float64)
+        order = np.argsort(b, kind="stable")
+        self.ids, self.a, self.b = ids[order], a[order], b[order]
+        self._sorted_b: List[float] = self.b.tolist()
+        self._index: Dict[int, int] = {int(qid): i for i, qid in enumerate(self.ids)}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def params(self, question_id: int) -> Tuple[float, float]:
+        """(discrimination, difficulty) of a question, or the medium prior if unknown."""
+        i = self._index.get(question_id)
+        if i is None:
+            return 1.0, DIFFICULTY_PRIORS["medium"]
+        return float(self.a[i]), float(self.b[i])
+
+    def update(self, question_id: int, difficulty: float):
+        """
+        Apply a new difficulty in place. The sort order is left as is; the
+        drift per answer is small and the bank is rebuilt periodically.
+        """
+        i = self._index.get(question_id)
+        if i is not None:
+            self.b[i] = difficulty
+
+    def select(self, theta: float, exclude: Set[int]) -> Optional[Tuple[int, float]]:
+        """
+        Most informative question at theta that is not excluded.
+
+        Returns:
+            (question_id, information), or None if every question is excluded
+        """
+        if not len(self):
+            return None
+        center = bisect.bisect_left(self._sorted_b, theta)
+        lo, hi = max(0, center - SELECTION_WINDOW), min(len(self), center + SELECTION_WINDOW)
+        found = self._best(theta, exclude, lo, hi)
+        if found is None and (lo > 0 or hi < len(self)):
+            # Everything near theta has been answered: score the whole pool
+            found = self._best(theta, exclude, 0, len(self))
+        return found
+
+    def _best(self, theta: float, exclude: Set[int], lo: int, hi: int) -> Optional[Tuple[int, float]]:
+        info = information(theta, self.a[lo:hi], self.b[lo:hi])
+        if exclude:
+            info = np.where(np.isin(self.ids[lo:hi], list(exclude)), -1.0, info)
+        best = int(np.argmax(info))
+        if info[best] < 0:
+            return None
+        return int(self.ids[lo + best]), float(info[best])
+
+
+class ItemBanks:
+    """Per-topic item banks, rebuilt after catalog changes or max_age seconds."""
+
+    def __init__(self, max_age: float = 60.0):
+        self.max_age = max_age
+        self._banks: Dict[str, Tuple[int, float, ItemBank]] = {}
+
+    async def get(self, session, topic: str) -> ItemBank:
+        version = catalog_version.value
+        entry = self._banks.get(topic)
+        if entry is not None and entry[0] == version and time.monotonic() - entry[1] < self.max_age:
+            return entry[2]
+
+        rows = (await session.execute(
+            select(Question.id, Quiz.difficulty, QuestionStats.discrimination, QuestionStats.difficulty)
+            .join(Quiz, Question.quiz_id == Quiz.id)
+            .outerjoin(QuestionStats, QuestionStats.question_id == Question.id)
+            .where(Quiz.topic == topic)
+        )).all()
+        bank = ItemBank(
+            (row[0] for row in rows),
+            (row[2] if row[2] is not None else 1.0 for row in rows),
+            (row[3] if row[3] is not None else DIFFICULTY_PRIORS.get(row[1], 0.0) for row in rows),
+        )
+        self._banks[topic] = (version, time.monotonic(), bank)
+        return bank
+
+    def discard(self, topic: str):
+        self._banks.pop(topic, None)
+
+    def clear(self):
+        self._banks.clear()
+
+
+item_banks = ItemBanks()
+
+
+async def get_ability(session, user_id: int, topic: str, for_update: bool = False) -> UserAbility:
+    """
+    Load the user's ability for a topic, seeding it from quiz accuracy on first use.
+    The caller commits.
+    """
+    query = select(UserAbility).where(UserAbility.user_id == user_id, UserAbility.topic == topic)
+    if for_update:
+        query = query.with_for_update()
+    ability = (await session.execute(query)).scalar_one_or_none()
+    if ability is None:
+        progress = await session.get(UserProgress, user_id)
+        topics = json.loads(progress.topic_stats or "{}") if progress else {}
+        accuracy = topics.get(topic, {}).get("accuracy_ema")
+        # A concurrent first request may create the row first; theirs wins
+        await upsert(session, UserAbility, [{
+            "user_id": user_id, "topic": topic, "theta": initial_ability(accuracy), "information": 0.0, "responses": 0,
+        }])
+        ability = (await session.execute(query)).scalar_one()
+    return ability
+
+
+async def record_answers(session, user_id: int, topic: str, outcomes: List[Tuple[int, bool]]) -> UserAbility:
+    """
+    Record per-question outcomes and update the user's ability and the
+    questions' difficulties. The caller commits.
+
+    Args:
+        session: Active database session
+        user_id: User ID
+        topic: Topic of the questions
+        outcomes: (question_id, correct) pairs in answer order
+
+    Returns:
+        The updated ability row
+    """
+    ability = await get_ability(session, user_id, topic, for_update=True)
+    if not outcomes:
+        return ability
+
+    bank = await item_banks.get(session, topic)
+    question_ids = list(dict.fromkeys(question_id for question_id, _ in outcomes))
+    # Uncalibrated questions start from the bank's parameters
+    params = {question_id: bank.params(question_id) for question_id in question_ids}
+    await upsert(session, QuestionStats, [
+        {"question_id": question_id, "discrimination": a, "difficulty": b, "responses": 0}
+        for question_id, (a, b) in params.items()
+    ])
+    stats = {
+        row.question_id: row
+        for row in (await session.execute(
+            select(QuestionStats).where(QuestionStats.question_id.in_(question_ids)).with_for_update()
+        )).scalars()
+    }
+
+    theta, total_information = ability.theta, ability.information
+    for question_id, correct in outcomes:
+        a, _ = bank.params(question_id)
+        item = stats[question_id]
+        b = item.difficulty
+
+        p = float(p_correct(theta, a, b))
+        residual = (1.0 if correct else 0.0) - p
+        session.add(QuestionResponse(user_id=user_id, question_id=question_id, correct=correct, ability=theta))
+
+        k = max(MIN_ABILITY_K, ABILITY_K / math.sqrt(1.0 + total_information))
+        theta = _clip(theta + k * residual)
+        total_information = total_information * INFORMATION_DECAY + a * a * p * (1.0 - p)
+
+        item.difficulty = _clip(b - ITEM_K * residual)
+        item.responses += 1
+        bank.update(question_id, item.difficulty)
+
+    ability.theta = theta
+    ability.information = total_information
+    ability.responses += len(outcomes)
+    if ability.served_question_id in params:
+        ability.served_question_id = None
+    ability.updated_at = datetime.datetime.utcnow()
+    return ability
+
+
+async def answered_questions(session, user_id: int) -> Set[int]:
+    rows = await session.execute(
+        select(QuestionResponse.question_id).where(QuestionResponse.user_id == user_id).distinct()
+    )
+    return set(rows.scalars())
+
+
+def ability_summary(ability: UserAbility) -> Dict:
+    error = standard_error(ability.information)
+    return {
+        "topic": ability.topic,
+        "ability": round(ability.theta, 3),
+        "standard_error": round(error, 3) if math.isfinite(error) else None,
+        "responses": ability.responses,
+        "complete": error <= settings.ADAPTIVE_TARGET_SE,
+    }
+
+
+async def next_question(session, user_id: int, topic: str, generate=None) -> Optional[Dict]:
+    """
+    Pick the most informative unanswered question for the user.
+
+    When the bank has nothing informative left (below
+    ADAPTIVE_MIN_INFORMATION), one question is generated at the user's level
+    and added to the topic's bank. The question is recorded as served and
+    returned again until it is answered, so repeated requests neither skip
+    questions nor generate new ones. The caller commits.
+
+    Args:
+        session: Active database session
+        user_id: User ID
+        topic: Quiz topic
+        generate: Optional async (topic, difficulty) -> question dict used to extend the bank
+
+    Returns:
+        Question with id, prompt, choices and the user's ability summary, or
+        None if the bank is exhausted and nothing could be generated
+    """
+    # Locked, so concurrent requests for the same user serve one question
+    ability = await get_ability(session, user_id, topic, for_update=True)
+    answered = await answered_questions(session, user_id)
+    question = None
+    if ability.served_question_id is not None and ability.served_question_id not in answered:
+        question = await session.get(Question, ability.served_question_id)
+
+    if question is None:
+        bank = await item_banks.get(session, topic)
+        found = bank.select(ability.theta, answered)
+        if (found is None or found[1] < settings.ADAPTIVE_MIN_INFORMATION) and generate is not None:
+            question = await _add_generated_question(session, topic, ability.theta, generate)
+        elif found is not None:
+            question = await session.get(Question, found[0])
+        else:
+            return None
+        ability.served_question_id = question.id
+
+    choices = json.loads(question.choices) if isinstance(question.choices, str) else question.choices
+    return {
+        "id": question.id,
+        "prompt": question.prompt,
+        "choices": choices,
+        **ability_summary(ability),
+    }
+
+
+async def _add_generated_question(session, topic: str, theta: float, generate) -> Question:
+    generated = await generate(topic, difficulty_label(theta))
+
+    bank_quiz = (await session.execute(
+        select(Quiz).where(Quiz.topic == topic, Quiz.difficulty == BANK_DIFFICULTY).limit(1)
+    )).scalar_one_or_none()
+    if bank_quiz is None:
+        bank_quiz = Quiz(topic=topic, difficulty=BANK_DIFFICULTY)
+        session.add(bank_quiz)
+        await session.flush()
+
+    question = Question(
+        quiz_id=bank_quiz.id,
+        prompt=generated["prompt"],
+        choices=json.dumps(generated["choices"]),
+        answer=str(generated["answer"]),
+    )
+    session.add(question)
+    await session.flush()
+    # Generated at the user's level, so it starts there rather than at the label's prior
+    session.add(QuestionStats(question_id=question.id, difficulty=theta, discrimination=1.0, responses=0))
+    # Bank writes leave the catalog version alone; other workers see the
+    # question when their bank for the topic expires
+    item_banks.discard(topic)
+    return question
@@ -0,0 +1,226 @@
+"""
+Quiz performance analytics for single users and whole cohorts.
+
+summarize_quiz_results is the per-user reference implementation used by the
+feedback service. cohort_topic_stats computes the same figures for many users
+at once with grouped NumPy reductions over columns loaded straight from the
+database, for teacher dashboards.
+"""
+
+from operator import itemgetter
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy.future import select
+
+from app.db.models import Quiz, QuizResult
+
+# Topic accuracy thresholds for strengths and weaknesses
+STRENGTH_ACCURACY = 0.7
+WEAKNESS_ACCURACY = 0.5
+
+
+def summarize_quiz_results(quiz_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Compute average score, strengths and weaknesses for one user.
+
+    Args:
+        quiz_results: List of quiz attempt dictionaries
+
+    Returns:
+        Dictionary with average_score, strengths and weaknesses
+    """
+    if not quiz_results:
+        return {"average_score": 0, "strengths": [], "weaknesses": []}
+
+    # Calculate basic statistics
+    total_score = 0
+    correct_by_topic = {}
+    total_by_topic = {}
+
+    for result in quiz_results:
+        total_score += result.get("score", 0)
+
+        # Track performance by topic
+        topic = result.get("topic", "unknown")
+        if topic not in correct_by_topic:
+            correct_by_topic[topic] = 0
+            total_by_topic[topic] = 0
+
+        correct_by_topic[topic] += result.get("correct_count", 0)
+        total_by_topic[topic] += result.get("total_questions", 0)
+
+    average_score = total_score / len(quiz_results)
+
+    # Identify strengths and weaknesses
+    strengths = []
+    weaknesses = []
+
+    for topic, correct in correct_by_topic.items():
+        total = total_by_topic[topic]
+        if total > 0:
+            accuracy = correct / total
+            if accuracy >= STRENGTH_ACCURACY:
+                strengths.append(topic)
+            elif accuracy <= WEAKNESS_ACCURACY:
+                weaknesses.append(topic)
+
+    return {"average_score": average_score, "strengths": strengths, "weaknesses": weaknesses}
+
+
+def _numeric(values: Sequence[Any]) -> np.ndarray:
+    """Float column with NULLs as 0."""
+    return np.nan_to_num(np.array(values, dtype=np.float64), nan=0.0)
+
+
+class QuizColumns:
+    """Columnar view of quiz results, one array entry per attempt."""
+
+    def __init__(
+        self,
+        user_ids: np.ndarray,
+        topic_codes: np.ndarray,
+        topics: List[str],
+        scores: np.ndarray,
+        correct: np.ndarray,
+        totals: np.ndarray
+    ):
+        self.user_ids = user_ids
+        self.topic_codes = topic_codes
+        self.topics = topics
+        self.scores = scores
+        self.correct = correct
+        self.totals = totals
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Sequence[Any]]) -> "QuizColumns":
+        """
+        Build columns from (user_id, topic, score, correct_count, total_questions)
+        rows as the database returns them (attempt order is kept).
+        """
+        # One pass per column; zip(*rows) is several times slower on large results
+        user_ids, topic_names, scores, correct, totals = (list(map(itemgetter(i), rows)) for i in range(5))
+        # Factorize topics in first-seen order; there are only a handful
+        codes: Dict[str, int] = {}
+        topic_codes = [codes.setdefault(topic or "unknown", len(codes)) for topic in topic_names]
+        return cls(
+            user_ids=np.array(user_ids, dtype=np.int64),
+            topic_codes=np.array(topic_codes, dtype=np.int64),
+            topics=list(codes),
+            scores=_numeric(scores),
+            correct=_numeric(correct),
+            totals=_numeric(totals),
+        )
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]]) -> "QuizColumns":
+        """Build columns from quiz attempt dictionaries (attempt order is kept)."""
+        return cls.from_rows([
+            (r["user_id"], r.get("topic"), r.get("score"), r.get("correct_count"), r.get("total_questions"))
+            for r in records
+        ])
+
+    def __len__(self) -> int:
+        return len(self.user_ids)
+
+
+async def load_quiz_columns(session, user_ids: Optional[List[int]] = None) -> QuizColumns:
+    """
+    Load quiz results for many users as columns.
+
+    Args:
+        session: Active database session
+        user_ids: Users to load; all users if omitted
+
+    Returns:
+        QuizColumns in attempt order
+    """
+    query = (
+        select(
+            QuizResult.user_id,
+            Quiz.topic,
+            QuizResult.score,
+            QuizResult.correct_count,
+            QuizResult.total_questions,
+        )
+        .join(Quiz, Quiz.id == QuizResult.quiz_id)
+        .order_by(QuizResult.id)
+    )
+    if user_ids is not None:
+        query = query.where(QuizResult.user_id.in_(user_ids))
+
+    return QuizColumns.from_rows((await session.execute(query)).all())
+
+
+def cohort_topic_stats(columns: QuizColumns) -> Dict[int, Dict[str, Any]]:
+    """
+    Compute summarize_quiz_results for every user in the columns at once.
+
+    Args:
+        columns: Quiz results for the cohort
+
+    Returns:
+        {user_id: {"average_score", "strengths", "weaknesses", "topic_accuracy"}}
+    """
+    if not len(columns):
+        return {}
+
+    users, user_index = np.unique(columns.user_ids, return_inverse=True)
+    n_users, n_topics = len(users), len(columns.topics)
+
+    attempts = np.bincount(user_index, minlength=n_users)
+    average_scores = np.bincount(user_index, weights=columns.scores, minlength=n_users) / attempts
+
+    cell = user_index * n_topics + columns.topic_codes
+    n_cells = n_users * n_topics
+    correct = np.bincount(cell, weights=columns.correct, minlength=n_cells)
+    totals = np.bincount(cell, weights=columns.totals, minlength=n_cells)
+    accuracy = np.divide(correct, totals, out=np.full(n_cells, np.nan), where=totals > 0)
+
+    # Topics are reported in the order each user first attempted them
+    cells, first_seen = np.unique(cell, return_index=True)
+    cells = cells[np.lexsort((first_seen, cells // n_topics))]
+    topic_names = np.array(columns.topics, dtype=object)
+
+    def cells_where(mask: np.ndarray):
+        """Selected cells in report order, with per-user slice bounds."""
+        keep = cells[mask[cells]]
+        bounds = [0] + np.searchsorted(keep // n_topics, np.arange(1, n_users + 1)).tolist()
+        return keep, bounds
+
+    def per_user(values: list, bounds: List[int]) -> List[list]:
+        return [values[start:end] for start, end in zip(bounds, bounds[1:])]
+
+    with np.errstate(invalid="ignore"):
+        strong, strong_bounds = cells_where(accuracy >= STRENGTH_ACCURACY)
+        weak, weak_bounds = cells_where(accuracy <= WEAKNESS_ACCURACY)
+    studied, studied_bounds = cells_where(totals > 0)
+
+    strengths = per_user(topic_names[strong % n_topics].tolist(), strong_bounds)
+    weaknesses = per_user(topic_names[weak % n_topics].tolist(), weak_bounds)
+    studied_topics = per_user(topic_names[studied % n_topics].tolist(), studied_bounds)
+    studied_accuracy = per_user(np.round(accuracy[studied], 3).tolist(), studied_bounds)
+
+    return {
+        user_id: {
+            "average_score": score,
+            "strengths": strengths[u],
+            "weaknesses": weaknesses[u],
+            "topic_accuracy": dict(zip(studied_topics[u], studied_accuracy[u])),
+        }
+        for u, (user_id, score) in enumerate(zip(users.tolist(), average_scores.tolist()))
+    }
+
+
+async def analyze_cohort(session, user_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """
+    Per-user, per-topic performance for a cohort of students.
+
+    Args:
+        session: Active database session
+        user_ids: Students in the cohort
+
+    Returns:
+        Mapping of user ID to performance summary
+    """
+    return cohort_topic_stats(await load_quiz_columns(session, user_ids))
@@ -1,59 +1,153 @@
 from fastapi import Depends
-from app.services.gemini import generate_response
+from app.services.gemini import generate_response, stream_response
 from app.services.pinecone import upsert_embedding, query_embedding
 from app.core.auth import get_current_user
 from app.db.models import User
+from app.core.config import settings
+from app.core.metrics import errors
+from app.core.resilience import CircuitOpen
+from app.core.tracing import tracer
+from app.db.session import AsyncSessionLocal
+from app.services.chat_log import chat_log, embedding_spill, get_chat_history
+from app.services.context import ContextBuilder, select_template
+import asyncio
+import contextlib
+import datetime
 import json
 import uuid
 import time
+from typing import AsyncIterator
+
+class ChatSession:
+    """
+    Conversation state held in memory for one long-lived connection.
+    
+    History is loaded once when the session opens and then extended with each
+    reply, so messages skip both re-authentication and the history query.
+    """
+    
+    def __init__(self, user: User, turns: list):
+        self.user = user
+        self.turns = turns  # Newest first
+    
+    def add_turn(self, message: str, response: str):
+        self.turns.insert(0, {
+            # Stable key for the context builder's summary cache; loaded turns carry their row id
+            "id": uuid.uuid4().hex,
+            "message": message,
+            "response": response,
+            "created_at": datetime.datetime.utcnow(),
+        })
+        del self.turns[settings.CHAT_HISTORY_TURNS:]
 
 class ChatService:
-    def __init__(self):
-        self.embedding_cache = {}  # Cache for temporary storage
+    def __init__(self, log=chat_log, spill=embedding_spill, context_builder=None):
+        self.log = log
+        self.spill = spill  # Vector writes pending until the store recovers
+        self._replay_task = None
+        self.context_builder = context_builder or ContextBuilder(
+            token_budget=settings.CHAT_CONTEXT_TOKEN_BUDGET,
+            recent_turns=settings.CHAT_RECENT_TURNS,
+        )
     
     async def get_chat_response(self, user: User, message: str):
         # 1. Create context from previous interactions
-        context = await self._get_context(user.id, message)
+        with tracer.span("chat.context"):
+            context = await self._get_context(user.id, message)
         
-        # 2. Generate complete prompt with context
-        prompt = f"""As an SAT tutor helping a student prepare for their exam. 
-        
-Previous context: {context}
-
-Student question: {message}
-
-Please provide a helpful, educational response that will help the student understand the concept and improve their SAT preparation.
-"""
+        # 2. Fill the subject-specific template
+        prompt = self._prompt(message, context)
         
         # 3. Get response from Gemini
-        response = await generate_response(prompt)
+        response = await generate_response(prompt, call_site="chat")
         
         # 4. Store the interaction
-        await self._store_interaction(user.id, message, response)
+        with tracer.span("chat.store"):
+            await self._store_interaction(user.id, message, response)
         
         return response
     
+    async def open_session(self, user: User) -> ChatSession:
+        """Start a conversation session, loading the user's recent turns once."""
+        with tracer.span("chat.history"):
+            turns = await self._recent_turns(user.id)
+        return ChatSession(user, turns)
+    
+    async def stream_chat_response(self, chat: ChatSession, message: str) -> AsyncIterator[str]:
+        """
+        Stream a reply within a session, taking history from the session.
+        
+        The interaction is stored once the reply is complete; a reply cut off
+        by a disconnect is not stored.
+        """
+        with tracer.span("chat.context"):
+            with tracer.span("chat.retrieval"):
+                memories = await self._retrieve_memories(chat.user.id)
+            with tracer.span("chat.context_build"):
+                context = self.context_builder.build(chat.user.id, chat.turns, memories)
+        prompt = self._prompt(message, context)
+        
+        parts = []
+        async with contextlib.aclosing(stream_response(prompt, call_site="chat")) as chunks:
+            async for chunk in chunks:
+                parts.append(chunk)
+                yield chunk
+        response = "".join(parts)
+        
+        with tracer.span("chat.store"):
+            await self._store_interaction(chat.user.id, message, response)
+        chat.add_turn(message, response)
+    
+    def _prompt(self, message: str, context: str) -> str:
+        with tracer.span("chat.prompt") as span:
+            subject, template = select_template(message)
+            span.set_attribute("chat.subject", subject)
+            return template.format(question=message, context=context or "None")
+    
     async def _get_context(self, user_id: int, current_message: str):
+        with tracer.span("chat.history"):
+            turns = await self._recent_turns(user_id)
+        with tracer.span("chat.retrieval"):
+            memories = await self._retrieve_memories(user_id)
+        with tracer.span("chat.context_build"):
+            return self.context_builder.build(user_id, turns, memories)
+    
+    async def _recent_turns(self, user_id: int):
+        """Most recent turns, newest first, including ones not yet flushed to the log."""
+        turns = self.log.pending_for(user_id)[:settings.CHAT_HISTORY_TURNS]
+        if len(turns) == settings.CHAT_HISTORY_TURNS:
+            return turns
+        try:
+            async with AsyncSessionLocal() as session:
+                page = await get_chat_history(session, user_id, settings.CHAT_HISTORY_TURNS - len(turns))
+            turns.extend(page["history"])
+        except Exception as e:
+            print(f"Error loading chat history: {e}")
+            errors.labels("chat_history").inc()
+        return turns
+    
+    async def _retrieve_memories(self, user_id: int):
         # This would normally use embeddings to retrieve similar context
-        # For now, simplified to just return the last few interactions
         try:
-            results = query_embedding(
+            results = await query_embedding(
                 vector=[0] * 1536,  # Placeholder for actual embedding
                 top_k=3
             )
             
-            # Format previous interactions
-            context = []
+            memories = []
             for match in results.get("matches", []):
                 metadata = match.get("metadata", {})
                 if metadata.get("user_id") == str(user_id):
-                    context.append(f"Q: {metadata.get('message', '')}")
-                    context.append(f"A: {metadata.get('response', '')}")
+                    memories.append(metadata)
             
-            return "\n".join(context)
+            return memories
+        except CircuitOpen:
+            # Vector store is down: answer without retrieved memories right away
+            return []
         except Exception as e:
             print(f"Error retrieving context: {e}")
-            return ""
+            errors.labels("chat_retrieval").inc()
+            return []
     
     async def _store_interaction(self, user_id: int, message: str, response: str):
         # In production, this would actually compute embeddings and store in Pinecone
@@ -66,15 +160,38 @@ Please provide a helpful, educational response that will help the student unders
             "timestamp": time.time()
         }
         
+        self.log.append(user_id, message, response)
+        
         # Placeholder for actual embedding
         vector = [0] * 1536  
         
         try:
-            upsert_embedding(str(user_id), vector, metadata)
+            await upsert_embedding(str(user_id), vector, metadata)
         except Exception as e:
             print(f"Error storing interaction: {e}")
-            # Cache locally if Pinecone fails
-            self.embedding_cache[interaction_id] = (vector, metadata)
+            errors.labels("vector_upsert").inc()
+            # Hold the write until the vector store recovers
+            self.spill.put({"user_id": str(user_id), "vector": vector, "metadata": metadata})
+            return
+        
+        if len(self.spill) and (self._replay_task is None or self._replay_task.done()):
+            # The store is reachable again; drain held writes off the request path
+            self._replay_task = asyncio.create_task(self.replay_pending())
+    
+    async def drain(self):
+        """Finish background work (spill replay, history summaries) before shutdown."""
+        if self._replay_task is not None:
+            await asyncio.gather(self._replay_task, return_exceptions=True)
+        await self.context_builder.drain()
+    
+    async def replay_pending(self) -> int:
+        """Write held interactions to the vector store, oldest first."""
+        replayed = await self.spill.replay(
+            lambda record: upsert_embedding(record["user_id"], record["vector"], record["metadata"])
+        )
+        if replayed:
+            print(f"Replayed {replayed} interactions into the vector store")
+        return replayed
 
 chat_service = ChatService()
 
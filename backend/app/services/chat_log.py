@@ -0,0 +1,403 @@
+"""
+Write-optimized chat interaction log.
+
+Chat replies append to an in-process buffer that a background task flushes
+to the chat_interactions table in batches, one multi-row insert and one
+rollup update per user per flush. Vector store writes that fail are held in
+a bounded buffer that overflows to a JSONL file on disk and is replayed once
+the store is reachable again. Interactions the database cannot take during an
+outage are capped in memory and overflow to a spill file the same way; both
+are written out on shutdown and picked up again on start.
+"""
+
+import asyncio
+import base64
+import datetime
+import fcntl
+import glob
+import json
+import os
+from collections import Counter, deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert, tuple_
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.core.metrics import errors, registry
+from app.core.shared import process_alive
+from app.db.models import ChatInteraction
+from app.db.session import AsyncSessionLocal
+from app.services.progress import record_chat_interactions
+
+
+class ChatLogWriter:
+    """
+    Buffers chat interactions and inserts them in batches.
+
+    Args:
+        session_factory: Creates database sessions
+        batch_size: Buffered rows that trigger an early flush
+        flush_interval: Seconds between flushes
+        max_pending: Rows kept in memory while the database is unavailable;
+            older rows move to spill
+        spill: Where rows that could not be written go, or None to drop them
+    """
+
+    def __init__(
+        self,
+        session_factory=AsyncSessionLocal,
+        batch_size: int = 100,
+        flush_interval: float = 1.0,
+        max_pending: int = 10000,
+        spill: Optional["SpillBuffer"] = None
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.spill = spill
+        self._pending: List[Dict[str, Any]] = []
+        self._lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def append(self, user_id: int, message: str, response: str):
+        """Queue an interaction for the next flush."""
+        self._pending.append({
+            "user_id": user_id,
+            "message": message,
+            "response": response,
+            "created_at": datetime.datetime.utcnow(),
+        })
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def pending_for(self, user_id: int) -> List[Dict[str, Any]]:
+        """Buffered interactions for a user that are not yet in the table, newest first."""
+        return [row for row in reversed(self._pending) if row["user_id"] == user_id]
+
+    async def flush(self) -> int:
+        """
+        Insert all buffered interactions in one transaction.
+
+        Returns:
+            Number of interactions written
+        """
+        async with self._lock:
+            batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+            try:
+                async with self.session_factory() as session:
+                    await session.execute(insert(ChatInteraction), batch)
+                    for user_id, count in Counter(row["user_id"] for row in batch).items():
+                        await record_chat_interactions(session, user_id, count)
+                    await session.commit()
+            except Exception as e:
+                print(f"Error writing chat log: {e}")
+                errors.labels("chat_log").inc()
+                # Keep arrival order so the next flush retries the same rows first
+                self._pending = batch + self._pending
+                self._shed(self.max_pending)
+                return 0
+            return len(batch)
+
+    def _shed(self, keep: int):
+        """Move the oldest buffered rows beyond keep to the spill file."""
+        excess = len(self._pending) - keep
+        if excess <= 0:
+            return
+        overflow, self._pending = self._pending[:excess], self._pending[excess:]
+        if self.spill is None:
+            print(f"Dropping {excess} chat log rows")
+            errors.labels("chat_log_dropped").inc(excess)
+            return
+        for row in overflow:
+            self.spill.put({**row, "created_at": row["created_at"].isoformat()})
+
+    async def restore(self) -> int:
+        """
+        Queue spilled rows for the next flush, as many as fit under max_pending.
+
+        Returns:
+            Number of rows restored
+        """
+        if self.spill is None or not len(self.spill):
+            return 0
+
+        async def requeue(row: Dict[str, Any]):
+            self._pending.append({**row, "created_at": datetime.datetime.fromisoformat(row["created_at"])})
+
+        return await self.spill.replay(requeue, limit=self.max_pending - len(self._pending))
+
+    async def start(self):
+        await self.restore()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Flush what is buffered; rows the database does not take are spilled to disk."""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+        self._shed(0)
+        if self.spill is not None:
+            await self.spill.persist()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if await self.flush() and self.spill is not None and len(self.spill):
+                # The database is back; bring in rows spilled during the outage
+                await self.restore()
+
+
+def encode_cursor(created_at: datetime.datetime, interaction_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{interaction_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime.datetime, int]:
+    """Raises ValueError for malformed cursors."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, interaction_id = raw.split("|")
+        return datetime.datetime.fromisoformat(created_at), int(interaction_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+async def get_chat_history(
+    session,
+    user_id: int,
+    limit: int = 20,
+    before: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Page through a user's chat history, newest first.
+
+    Uses keyset pagination on (created_at, id) so every page is an index range
+    scan on (user_id, created_at) regardless of how deep the client pages.
+
+    Args:
+        session: Active database session
+        user_id: User ID
+        limit: Page size
+        before: Cursor returned as next_cursor by the previous page
+
+    Returns:
+        Dictionary with history and next_cursor (None on the last page)
+    """
+    query = select(ChatInteraction).where(ChatInteraction.user_id == user_id)
+    if before:
+        query = query.where(
+            tuple_(ChatInteraction.created_at, ChatInteraction.id) < tuple_(*decode_cursor(before))
+        )
+    query = query.order_by(ChatInteraction.created_at.desc(), ChatInteraction.id.desc()).limit(limit + 1)
+
+    rows = (await session.execute(query)).scalars().all()
+    page = rows[:limit]
+    next_cursor = encode_cursor(page[-1].created_at, page[-1].id) if len(rows) > limit else None
+    return {
+        "history": [
+            {
+                "id": row.id,
+                "message": row.message,
+                "response": row.response,
+                "created_at": row.created_at.isoformat(),
+            }
+            for row in page
+        ],
+        "next_cursor": next_cursor,
+    }
+
+
+class SpillBuffer:
+    """
+    Bounded FIFO of pending records that overflows to a JSONL file.
+
+    The first max_entries records are held in memory; later ones are appended
+    to the spill file, so memory use stays bounded and nothing is dropped
+    during a long outage. The file survives restarts, and persist() writes the
+    records held in memory to it on shutdown.
+
+    Each process spills to its own file (path with the pid before the
+    extension), since worker processes share the configured path but not the
+    lock guarding replay. On first use a process adopts, under a file lock,
+    the files of processes that are no longer running, so records spilled by
+    a stopped or crashed worker are replayed by its successor.
+    """
+
+    def __init__(self, path: str, max_entries: int = 1000):
+        self.base_path = path
+        self.max_entries = max_entries
+        self._memory: deque = deque()
+        self._owner: Optional[int] = None
+        self._spilled = 0
+        self._lock = asyncio.Lock()
+
+    @property
+    def path(self) -> str:
+        """This process's spill file."""
+        return self._claim()
+
+    def _claim(self) -> str:
+        pid = os.getpid()
+        if self._owner != pid:
+            # First use in this process (the buffer may have been created before a fork)
+            self._owner = pid
+            self._spilled = self._adopt_orphans(pid)
+        return self._path_for(pid)
+
+    def _path_for(self, pid: int) -> str:
+        root, ext = os.path.splitext(self.base_path)
+        return f"{root}.{pid}{ext}"
+
+    def _orphans(self, pid: int) -> List[str]:
+        """Spill files of processes that have exited, oldest first."""
+        root, ext = os.path.splitext(self.base_path)
+        paths = [self.base_path] if os.path.exists(self.base_path) else []
+        for path in glob.glob(f"{glob.escape(root)}.*{ext}"):
+            owner = path[len(root) + 1:len(path) - len(ext)]
+            if owner.isdigit() and int(owner) != pid and not process_alive(int(owner)):
+                paths.append(path)
+        return sorted(paths, key=os.path.getmtime)
+
+    def _adopt_orphans(self, pid: int) -> int:
+        """Append orphaned spill files to this process's file; returns its record count."""
+        own = self._path_for(pid)
+        if self._orphans(pid):
+            os.makedirs(os.path.dirname(own) or ".", exist_ok=True)
+            self._adopt_locked(pid, own)
+        if not os.path.exists(own):
+            return 0
+        with open(own) as f:
+            return sum(1 for line in f if line.strip())
+
+    def _adopt_locked(self, pid: int, own: str):
+        # Listed again under the lock: another process may have adopted them first
+        with open(self.base_path + ".lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                for orphan in self._orphans(pid):
+                    with open(orphan) as f:
+                        lines = [line for line in f if line.strip()]
+                    with open(own, "a") as f:
+                        f.writelines(lines)
+                    os.remove(orphan)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def put(self, record: Dict[str, Any]):
+        path = self._claim()
+        if len(self._memory) < self.max_entries and not self._spilled:
+            self._memory.append(record)
+            return
+        # Once anything is on disk, keep appending there to preserve order
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+        self._spilled += 1
+
+    def __len__(self) -> int:
+        self._claim()
+        return len(self._memory) + self._spilled
+
+    async def persist(self):
+        """Move the records held in memory to the spill file, ahead of those already there."""
+        async with self._lock:
+            if not self._memory:
+                return
+            path = self._claim()
+            lines = [json.dumps(record) + "\n" for record in self._memory]
+            if self._spilled:
+                with open(path) as f:
+                    lines += [line for line in f if line.strip()]
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path + ".tmp", "w") as f:
+                f.writelines(lines)
+            os.replace(path + ".tmp", path)
+            self._memory.clear()
+            self._spilled = len(lines)
+
+    async def replay(
+        self,
+        handler: Callable[[Dict[str, Any]], Awaitable[Any]],
+        limit: Optional[int] = None
+    ) -> int:
+        """
+        Pass pending records to handler in arrival order, stopping at the first failure.
+
+        Args:
+            handler: Awaited with each record; raising leaves it (and later records) pending
+            limit: Most records to replay in this call
+
+        Returns:
+            Number of records replayed
+        """
+        limit = len(self) if limit is None else limit
+        path = self._claim()
+        async with self._lock:
+            replayed = 0
+            while self._memory and replayed < limit:
+                try:
+                    await handler(self._memory[0])
+                except Exception as e:
+                    print(f"Replay stopped: {e}")
+                    return replayed
+                self._memory.popleft()
+                replayed += 1
+
+            if not self._spilled or replayed >= limit:
+                return replayed
+
+            with open(path) as f:
+                lines = [line for line in f if line.strip()][:limit - replayed]
+            done = 0
+            try:
+                for line in lines:
+                    await handler(json.loads(line))
+                    done += 1
+            except Exception as e:
+                print(f"Replay stopped: {e}")
+
+            # Records may have been appended while we were replaying
+            with open(path) as f:
+                remaining = [line for line in f if line.strip()][done:]
+            if remaining:
+                with open(path, "w") as f:
+                    f.writelines(remaining)
+            else:
+                os.remove(path)
+            self._spilled = len(remaining)
+            return replayed + done
+
+
+chat_log = ChatLogWriter(
+    batch_size=settings.CHAT_LOG_BATCH_SIZE,
+    flush_interval=settings.CHAT_LOG_FLUSH_INTERVAL,
+    max_pending=settings.CHAT_LOG_MAX_PENDING,
+    # Only reached during a database outage, so every record goes straight to disk
+    spill=SpillBuffer(settings.CHAT_LOG_SPILL_PATH, max_entries=0),
+)
+
+embedding_spill = SpillBuffer(
+    settings.EMBEDDING_SPILL_PATH,
+    max_entries=settings.EMBEDDING_SPILL_MAX_ENTRIES,
+)
+
+
+@registry.collector("chat_log_pending", "gauge", "Chat writes waiting in memory or on disk.")
+def _pending_samples():
+    yield "chat_log_pending", {"queue": "interactions"}, len(chat_log)
+    yield "chat_log_pending", {"queue": "interactions_spill"}, len(chat_log.spill)
+    yield "chat_log_pending", {"queue": "vector_spill"}, len(embedding_spill)
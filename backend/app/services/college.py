@@ -36,30 +36,6 @@ COLLEGES = [
     }
 ]
 
-SCHOLARSHIPS = [
-    {
-        "id": 1,
-        "name": "Fulbright Scholarship",
-        "amount": 20000,
-        "deadline": "2025-11-15",
-        "countries": ["USA"],
-    },
-    {
-        "id": 2,
-        "name": "UAE Government Scholarship",
-        "amount": 30000,
-        "deadline": "2025-10-30",
-        "countries": ["UAE"],
-    },
-    {
-        "id": 3,
-        "name": "Global Excellence Award",
-        "amount": 15000,
-        "deadline": "2025-12-01",
-        "countries": ["USA", "UK", "UAE", "Canada"],
-    }
-]
-
 async def search_colleges(
     query: Optional[str] = None, 
     min_sat: Optional[int] = None,
@@ -97,36 +73,3 @@ async def search_colleges(
         results.append(college)
         
     return results
-
-async def search_scholarships(
-    query: Optional[str] = None,
-    min_amount: Optional[int] = None,
-    country: Optional[str] = None
-) -> List[Dict]:
-    """
-    Search scholarships based on various criteria
-    
-    Args:
-        query: Search term for name
-        min_amount: Minimum scholarship amount
-        country: Country eligibility filter
-        
-    Returns:
-        List of matching scholarships
-    """
-    results = []
-    
-    for scholarship in SCHOLARSHIPS:
-        # Apply filters
-        if query and query.lower() not in scholarship["name"].lower():
-            continue
-            
-        if min_amount and scholarship["amount"] < min_amount:
-            continue
-            
-        if country and country not in scholarship["countries"]:
-            continue
-            
-        results.append(scholarship)
-        
-    return results
\ No newline at end of file
@@ -0,0 +1,218 @@
+"""
+Token-budgeted conversation context for the tutor chat.
+
+The builder fills a fixed token budget in priority order: the most recent
+turns verbatim, a cached summary of older turns, then memories retrieved from
+the vector store. Every piece is truncated to what is left of the budget, so
+prompt size is bounded no matter how long earlier answers were. Older turns
+are summarized in the background, so no request waits on the extra call.
+"""
+
+import asyncio
+import functools
+import re
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from app.core.metrics import errors
+from app.services.gemini import generate_response
+from app.utils.prompts import ChatPrompts
+
+# Gemini's documented rule of thumb for English text
+CHARS_PER_TOKEN = 4
+
+# Pieces smaller than this are not worth adding to the context
+MIN_SECTION_TOKENS = 16
+
+SUBJECT_PATTERNS = {
+    "math": re.compile(
+        r"\b(math|algebra|geometry|equation|solve|slope|function|graph|triangle|circle|angle|"
+        r"percent|ratio|probability|statistics|mean|median|quadratic|linear|exponent|"
+        r"polynomial|integer|fraction|trigonometry|sine|cosine|area|volume|calculator)\b"
+        r"|\d\s*[-+*/^=<>]\s*\d|[a-z]\s*=\s*\d",
+        re.IGNORECASE,
+    ),
+    "writing": re.compile(
+        r"\b(writing|grammar|punctuation|comma|semicolon|colon|apostrophe|sentence|paragraph|"
+        r"essay|verb|noun|pronoun|modifier|tense|agreement|transition|rhetoric|style|"
+        r"reading|passage|author|evidence|vocabulary|word choice|concise)\b",
+        re.IGNORECASE,
+    ),
+}
+
+TEMPLATES = {
+    "math": ChatPrompts.MATH_TUTOR,
+    "writing": ChatPrompts.WRITING_TUTOR,
+    "general": ChatPrompts.GENERAL_TUTOR,
+}
+
+
+def count_tokens(text: str) -> int:
+    """Estimate the number of model tokens in text."""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to at most max_tokens, marking the cut with an ellipsis."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    if max_tokens <= 0:
+        return ""
+    return text[:max_tokens * CHARS_PER_TOKEN - 1].rstrip() + "…"
+
+
+def detect_subject(message: str) -> str:
+    """
+    Classify a student message as math, writing or general.
+
+    Returns:
+        The subject with the most keyword hits, or "general" if none or tied
+    """
+    hits = {subject: len(pattern.findall(message)) for subject, pattern in SUBJECT_PATTERNS.items()}
+    best = max(hits, key=hits.get)
+    if hits[best] == 0 or list(hits.values()).count(hits[best]) > 1:
+        return "general"
+    return best
+
+
+def select_template(message: str) -> Tuple[str, str]:
+    """Return (subject, ChatPrompts template) for a message."""
+    subject = detect_subject(message)
+    return subject, TEMPLATES[subject]
+
+
+def _format_turn(turn: Dict[str, Any], max_tokens: int) -> str:
+    question = truncate_tokens(f"Q: {turn.get('message', '')}", max_tokens // 3)
+    answer = truncate_tokens(f"A: {turn.get('response', '')}", max_tokens - count_tokens(question) - 1)
+    return f"{question}\n{answer}"
+
+
+class ContextBuilder:
+    """Assembles chat context within a token budget."""
+
+    def __init__(
+        self,
+        token_budget: int = 1500,
+        recent_turns: int = 4,
+        turn_max_tokens: int = 300,
+        summary_max_tokens: int = 200,
+        summary_refresh_turns: int = 4,
+        cache_size: int = 1024,
+        summarize: Callable[[str], Awaitable[str]] = functools.partial(generate_response, call_site="chat_summary")
+    ):
+        self.token_budget = token_budget
+        self.recent_turns = recent_turns
+        self.turn_max_tokens = turn_max_tokens
+        self.summary_max_tokens = summary_max_tokens
+        self.summary_refresh_turns = summary_refresh_turns
+        self.cache_size = cache_size
+        self.summarize = summarize
+        # user_id -> (id of the newest summarized turn, summary)
+        self._summaries: "OrderedDict[int, Tuple[Any, str]]" = OrderedDict()
+        self._in_flight: Set[int] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    def build(
+        self,
+        user_id: int,
+        turns: List[Dict[str, Any]],
+        memories: Optional[List[Dict[str, Any]]] = None,
+        budget: Optional[int] = None
+    ) -> str:
+        """
+        Build the context string for one request.
+
+        Args:
+            user_id: User ID
+            turns: Previous turns, newest first ({"id", "message", "response"})
+            memories: Retrieved interactions ({"message", "response"}), best match first
+            budget: Token budget override
+
+        Returns:
+            Context text of at most the budget's size in tokens
+        """
+        remaining = self.token_budget if budget is None else budget
+        recent, older = turns[:self.recent_turns], turns[self.recent_turns:]
+
+        recent_parts = []
+        for turn in recent:
+            if remaining < MIN_SECTION_TOKENS:
+                break
+            part = _format_turn(turn, min(self.turn_max_tokens, remaining))
+            recent_parts.append(part)
+            remaining -= count_tokens(part) + 1
+
+        sections = []
+        summary = self._summary_for(user_id, older)
+        if summary and remaining >= MIN_SECTION_TOKENS:
+            part = truncate_tokens(f"Earlier in this conversation: {summary}", remaining)
+            sections.append(part)
+            remaining -= count_tokens(part) + 1
+
+        if recent_parts:
+            sections.append("\n".join(reversed(recent_parts)))
+
+        seen = {turn.get("message") for turn in turns}
+        memory_parts = []
+        memory_header = "Related past questions:"
+        if memories:
+            remaining -= count_tokens(memory_header) + 1
+        for memory in memories or []:
+            if remaining < MIN_SECTION_TOKENS:
+                break
+            if memory.get("message") in seen:
+                continue
+            seen.add(memory.get("message"))
+            part = _format_turn(memory, min(self.turn_max_tokens, remaining))
+            memory_parts.append(part)
+            remaining -= count_tokens(part) + 1
+        if memory_parts:
+            sections.insert(0, memory_header + "\n" + "\n".join(memory_parts))
+
+        return "\n\n".join(sections)
+
+    def _summary_for(self, user_id: int, older: List[Dict[str, Any]]) -> Optional[str]:
+        """Return the cached summary, scheduling a refresh if enough turns have aged out."""
+        if not older:
+            return None
+
+        cached = self._summaries.get(user_id)
+        if cached is not None:
+            self._summaries.move_to_end(user_id)
+        newest_ids = [turn.get("id") for turn in older[:self.summary_refresh_turns]]
+        if cached is None or cached[0] not in newest_ids:
+            self._schedule_summary(user_id, older)
+        return cached[1] if cached else None
+
+    def _schedule_summary(self, user_id: int, older: List[Dict[str, Any]]):
+        if user_id in self._in_flight:
+            return
+        self._in_flight.add(user_id)
+        task = asyncio.create_task(self._summarize(user_id, older))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _summarize(self, user_id: int, older: List[Dict[str, Any]]):
+        try:
+            conversation = "\n".join(
+                _format_turn(turn, self.turn_max_tokens) for turn in reversed(older)
+            )
+            prompt = ChatPrompts.SUMMARIZE_HISTORY.format(
+                max_words=self.summary_max_tokens * 3 // 4,
+                conversation=conversation,
+            )
+            summary = truncate_tokens((await self.summarize(prompt)).strip(), self.summary_max_tokens)
+            self._summaries[user_id] = (older[0].get("id"), summary)
+            self._summaries.move_to_end(user_id)
+            while len(self._summaries) > self.cache_size:
+                self._summaries.popitem(last=False)
+        except Exception as e:
+            print(f"Error summarizing chat history: {e}")
+            errors.labels("chat_summary").inc()
+        finally:
+            self._in_flight.discard(user_id)
+
+    async def drain(self):
+        """Wait for background summaries (used on shutdown and in tests)."""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
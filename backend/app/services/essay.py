@@ -2,13 +2,196 @@
 Essay writing and analysis service.
 """
 
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Tuple
 import asyncio
+import difflib
+import json
+import re
 from app.db.models import Essay, User
-from app.db.session import get_session
+from app.core.config import settings
+from app.core.metrics import errors
+from app.core.tracing import tracer
+from app.db.session import AsyncSessionLocal
 from sqlalchemy.future import select
+from pydantic import BaseModel
+from app.services.feedback import RUBRICS, CriterionScore
 from app.services.gemini import generate_response
+from app.services.jobs import checkpoint, job_queue
+from app.services.progress import record_essay
+from app.services.similarity import minhash_signature, most_similar
 from app.utils.prompts import EssayPrompts
+from app.utils.structured import generate_structured, StructuredOutputError
+
+# How many of the user's most recent essays are checked for near-duplicates
+SIMILARITY_CANDIDATES = 50
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+class Improvement(BaseModel):
+    suggestion: str
+    example: str = ""
+
+class EssayAnalysis(BaseModel):
+    feedback: str
+    overall_score: Optional[float] = None
+    detailed_scores: Dict[str, CriterionScore] = {}
+    summary: str = ""
+    improvements: List[Improvement] = []
+
+async def _store_essay(
+    user_id: int,
+    content: str,
+    feedback: str,
+    essay_type: str,
+    analysis: Optional[Dict] = None,
+    signature: Optional[List[int]] = None
+) -> int:
+    """
+    Persist an essay with its feedback and structured analysis.
+    
+    Returns:
+        ID of the stored essay
+    """
+    async with AsyncSessionLocal() as session:
+        essay = Essay(
+            user_id=user_id,
+            content=content,
+            feedback=feedback,
+            analysis=json.dumps(analysis) if analysis is not None else None,
+            minhash=json.dumps(signature) if signature is not None else None,
+            essay_type=essay_type
+        )
+        session.add(essay)
+        await record_essay(session, user_id)
+        await session.commit()
+        return essay.id
+
+async def _generate_analysis(prompt: str, rubric: Dict) -> Dict:
+    """
+    Run a combined analysis prompt, keeping the raw text as feedback
+    if the model did not return valid structured output.
+    """
+    try:
+        analysis = await generate_structured(prompt, EssayAnalysis, "essay_analysis")
+        return analysis.dict()
+    except StructuredOutputError as e:
+        print(f"Error parsing essay analysis: {e}")
+        errors.labels("essay_analysis").inc()
+        return {
+            "feedback": e.raw,
+            "overall_score": None,
+            "detailed_scores": {},
+            "summary": "",
+            "improvements": [],
+            "max_score": rubric["max_score"],
+        }
+
+async def _find_previous_submission(
+    user_id: int,
+    essay_type: str,
+    signature: List[int]
+) -> Tuple[Optional[Essay], float]:
+    """
+    Find the user's most similar previous essay of the same type.
+    
+    Returns:
+        Tuple of (essay or None, estimated similarity)
+    """
+    async with AsyncSessionLocal() as session:
+        rows = (await session.execute(
+            select(Essay.id, Essay.minhash)
+            .where(
+                Essay.user_id == user_id,
+                Essay.essay_type == essay_type,
+                Essay.minhash.isnot(None)
+            )
+            .order_by(Essay.created_at.desc())
+            .limit(SIMILARITY_CANDIDATES)
+        )).all()
+        
+        essay_id, similarity = most_similar(
+            signature, ((row.id, json.loads(row.minhash)) for row in rows)
+        )
+        if essay_id is None:
+            return None, 0.0
+        return await session.get(Essay, essay_id), similarity
+
+def _sentence_diff(previous: str, current: str) -> str:
+    return "\n".join(difflib.unified_diff(
+        _SENTENCE_RE.split(previous.strip()),
+        _SENTENCE_RE.split(current.strip()),
+        lineterm="",
+        n=1
+    ))
+
+async def analyze_essay_full(
+    content: str,
+    user_id: Optional[int] = None,
+    essay_type: str = "college_app"
+) -> Dict:
+    """
+    Obtain feedback, rubric scores and improvement suggestions in one LLM call.
+    
+    Resubmissions are compared against the user's previous essays: a
+    near-identical essay reuses the stored analysis without an LLM call, and a
+    lightly revised one only sends the diff to update the previous analysis.
+    
+    Args:
+        content: The essay content to analyze
+        user_id: Optional user ID to save the essay for
+        essay_type: Type of essay (college_app, sat, personal_statement)
+        
+    Returns:
+        Structured analysis with feedback, overall_score, detailed_scores,
+        summary, improvements, the stored essay_id, and the similarity to the
+        closest previous submission
+    """
+    rubric = RUBRICS.get(essay_type, RUBRICS["college_app"])
+    signature = minhash_signature(content)
+    
+    previous, similarity = None, 0.0
+    if user_id:
+        with tracer.span("essay.find_previous"):
+            previous, similarity = await _find_previous_submission(user_id, essay_type, signature)
+    
+    if previous and previous.analysis and similarity >= settings.ESSAY_REUSE_THRESHOLD:
+        mode = "reused"
+        analysis = {"feedback": previous.feedback, **json.loads(previous.analysis)}
+    elif previous and previous.analysis and similarity >= settings.ESSAY_INCREMENTAL_THRESHOLD:
+        mode = "incremental"
+        prompt = EssayPrompts.INCREMENTAL_ANALYSIS.format(
+            previous_analysis=json.dumps({"feedback": previous.feedback, **json.loads(previous.analysis)}),
+            diff=_sentence_diff(previous.content, content),
+            max_score=rubric["max_score"]
+        )
+        with tracer.span("essay.analyze", mode=mode):
+            analysis = await checkpoint("analysis", lambda: _generate_analysis(prompt, rubric))
+    else:
+        mode = "full"
+        prompt = EssayPrompts.COMBINED_ANALYSIS.format(
+            essay_text=content,
+            max_score=rubric["max_score"],
+            criteria=", ".join(rubric["criteria"])
+        )
+        with tracer.span("essay.analyze", mode=mode):
+            analysis = await checkpoint("analysis", lambda: _generate_analysis(prompt, rubric))
+    
+    analysis = {"max_score": rubric["max_score"], **analysis}
+    feedback = analysis.pop("feedback")
+    
+    essay_id = None
+    if user_id:
+        with tracer.span("essay.store"):
+            essay_id = await _store_essay(user_id, content, feedback, essay_type, analysis, signature)
+    
+    return {
+        "essay_id": essay_id,
+        "feedback": feedback,
+        **analysis,
+        "similarity": round(similarity, 3),
+        "similar_essay_id": previous.id if previous else None,
+        "analysis_mode": mode,
+    }
 
 async def analyze_essay(
     content: str,
@@ -26,24 +209,25 @@ async def analyze_essay(
     Returns:
         Detailed feedback for the essay
     """
-    prompt = EssayPrompts.FEEDBACK.format(essay_text=content)
+    result = await analyze_essay_full(content, user_id, essay_type)
+    return result["feedback"]
+
+async def _analyze_cv(content: str, user_id: Optional[int]) -> Dict:
+    """
+    Generate CV feedback and persist it for the user.
     
-    # Generate feedback using AI
-    feedback = await generate_response(prompt)
+    Returns:
+        Dictionary with the feedback and the stored essay ID
+    """
+    prompt = EssayPrompts.CV_FEEDBACK.format(cv_text=content)
     
-    # Store essay and feedback if user is specified
-    if user_id:
-        async with get_session() as session:
-            essay = Essay(
-                user_id=user_id,
-                content=content,
-                feedback=feedback,
-                essay_type=essay_type
-            )
-            session.add(essay)
-            await session.commit()
+    # Generate feedback, once per job even if storing it fails and the job is retried
+    feedback = await checkpoint("feedback", lambda: generate_response(prompt, call_site="cv_feedback"))
+    
+    # Store in database if user specified
+    essay_id = await _store_essay(user_id, content, feedback, "cv_resume") if user_id else None
     
-    return feedback
+    return {"essay_id": essay_id, "feedback": feedback}
 
 async def analyze_cv(content: str, user_id: Optional[int] = None) -> str:
     """
@@ -56,24 +240,36 @@ async def analyze_cv(content: str, user_id: Optional[int] = None) -> str:
     Returns:
         CV feedback
     """
-    prompt = EssayPrompts.CV_FEEDBACK.format(cv_text=content)
-    
-    # Generate feedback
-    feedback = await generate_response(prompt)
+    result = await _analyze_cv(content, user_id)
+    return result["feedback"]
+
+@job_queue.handler("essay")
+async def run_essay_job(payload: Dict, user_id: Optional[int]) -> Dict:
+    """
+    Background job: analyze an essay and persist the feedback.
     
-    # Store in database if user specified
-    if user_id:
-        async with get_session() as session:
-            essay = Essay(
-                user_id=user_id,
-                content=content,
-                feedback=feedback,
-                essay_type="cv_resume"
-            )
-            session.add(essay)
-            await session.commit()
+    Args:
+        payload: Job payload with "content" and optional "essay_type"
+        user_id: Submitting user
+        
+    Returns:
+        Job result with the structured analysis and stored essay ID
+    """
+    return await analyze_essay_full(payload["content"], user_id, payload.get("essay_type", "college_app"))
+
+@job_queue.handler("cv")
+async def run_cv_job(payload: Dict, user_id: Optional[int]) -> Dict:
+    """
+    Background job: analyze a CV/resume and persist the feedback.
     
-    return feedback
+    Args:
+        payload: Job payload with "content"
+        user_id: Submitting user
+        
+    Returns:
+        Job result with the feedback and stored essay ID
+    """
+    return await _analyze_cv(payload["content"], user_id)
 
 async def get_essay_history(user_id: int) -> List[Dict]:
     """
@@ -85,7 +281,7 @@ async def get_essay_history(user_id: int) -> List[Dict]:
     Returns:
         List of essay records with feedback
     """
-    async with get_session() as session:
+    async with AsyncSessionLocal() as session:
         result = await session.execute(
             select(Essay)
             .where(Essay.user_id == user_id)
@@ -98,8 +294,9 @@ async def get_essay_history(user_id: int) -> List[Dict]:
                 "id": essay.id,
                 "content": essay.content,
                 "feedback": essay.feedback,
+                "analysis": json.loads(essay.analysis) if essay.analysis else None,
                 "created_at": essay.created_at.isoformat(),
-                "essay_type": getattr(essay, "essay_type", "general")
+                "essay_type": essay.essay_type
             })
             
         return essays
@@ -108,17 +305,27 @@ async def suggest_improvements(essay_id: int) -> str:
     """
     Generate specific improvement suggestions for a previously submitted essay.
     
+    Essays analyzed by the combined pipeline already carry their improvements,
+    so only older essays need another full-essay prompt.
+    
     Args:
         essay_id: ID of the essay to improve
         
     Returns:
         Specific improvement suggestions
     """
-    async with get_session() as session:
+    async with AsyncSessionLocal() as session:
         essay = await session.get(Essay, essay_id)
         if not essay:
             return "Essay not found"
         
+        improvements = json.loads(essay.analysis).get("improvements") if essay.analysis else None
+        if improvements:
+            return "\n\n".join(
+                f"{i}. {item.get('suggestion', '')}\n   Example: {item.get('example', '')}"
+                for i, item in enumerate(improvements, 1)
+            )
+        
         prompt = f"""
         Based on this essay:
         
@@ -132,5 +339,5 @@ async def suggest_improvements(essay_id: int) -> str:
         For each suggestion, provide an example of how to implement the change.
         """
         
-        suggestions = await generate_response(prompt)
+        suggestions = await generate_response(prompt, call_site="essay_improvements")
         return suggestions
\ No newline at end of file
@@ -0,0 +1,254 @@
+"""
+Batch essay scoring for teachers.
+
+A class set of essays is scored by a small pool of workers shared by every
+teacher in this process. Each teacher has their own queue and the workers
+take essays from the queues in turn, so a 200-essay batch does not hold up
+another teacher's 20 essays behind it. The pools of all worker processes
+together stay below LLM_MAX_CONCURRENCY, which leaves LLM slots free for
+interactive requests.
+
+Identical submissions within a batch are scored once, and results are
+yielded as they complete, not in submission order.
+"""
+
+import asyncio
+import functools
+import hashlib
+import re
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import errors, registry
+from app.core.ratelimit import LLMOverloaded
+from app.services.feedback import score_essay
+
+# Attempts per essay while the LLM is saturated by other traffic
+OVERLOAD_ATTEMPTS = 3
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+class SchedulerFull(Exception):
+    """Raised when a batch would exceed the scheduler's queue bound."""
+
+
+class FairScheduler:
+    """
+    Bounded worker pool serving per-tenant FIFO queues round-robin.
+
+    Args:
+        workers: Tasks run concurrently
+        max_pending: Queued tasks across all tenants before submissions are refused
+    """
+
+    def __init__(self, workers: int = 4, max_pending: int = 2000):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.running = 0
+        self._queues: Dict[Any, Deque[Tuple[Callable[[], Awaitable[Any]], asyncio.Future]]] = {}
+        # Tenants with queued work, next to be served first
+        self._turns: Deque[Any] = deque()
+        self._available: Optional[asyncio.Semaphore] = None
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = False
+
+    def submit_many(self, tenant: Any, calls: List[Callable[[], Awaitable[Any]]]) -> List[asyncio.Future]:
+        """
+        Queue calls for a tenant, all or none.
+
+        Raises:
+            SchedulerFull: If the calls do not fit in the queue
+        """
+        if self._stopping:
+            raise SchedulerFull("Scheduler is shutting down")
+        if self.pending + len(calls) > self.max_pending:
+            raise SchedulerFull(f"{self.pending} tasks already queued")
+        self._start()
+
+        loop = asyncio.get_running_loop()
+        queue = self._queues.get(tenant)
+        if queue is None:
+            queue = self._queues[tenant] = deque()
+            self._turns.append(tenant)
+        futures = []
+        for call in calls:
+            future = loop.create_future()
+            queue.append((call, future))
+            futures.append(future)
+            self.pending += 1
+            self._available.release()
+        return futures
+
+    def _start(self):
+        if not self._tasks:
+            self._available = asyncio.Semaphore(0)
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    def _next(self) -> Tuple[Callable[[], Awaitable[Any]], asyncio.Future]:
+        tenant = self._turns.popleft()
+        queue = self._queues[tenant]
+        item = queue.popleft()
+        if queue:
+            self._turns.append(tenant)
+        else:
+            del self._queues[tenant]
+        self.pending -= 1
+        return item
+
+    async def _worker(self):
+        while True:
+            await self._available.acquire()
+            if not self._turns:
+                # Woken by stop() with nothing left to run
+                return
+            call, future = self._next()
+            if future.cancelled():
+                # The batch was abandoned while this waited
+                continue
+            self.running += 1
+            try:
+                result = await call()
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
+            finally:
+                self.running -= 1
+
+    async def stop(self, timeout: float = 0.0):
+        """Stop accepting work, finish queued tasks for up to timeout seconds, then cancel the rest."""
+        self._stopping = True
+        if not self._tasks:
+            return
+        for _ in self._tasks:
+            self._available.release()
+        if timeout > 0:
+            await asyncio.wait(self._tasks, timeout=timeout)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+def content_key(content: str, essay_type: str) -> str:
+    """Key under which identical submissions (up to whitespace) are scored once."""
+    normalized = _WHITESPACE_RE.sub(" ", content).strip()
+    return hashlib.sha256(f"{essay_type}\0{normalized}".encode()).hexdigest()
+
+
+async def _score(content: str, essay_type: str, score: Callable[..., Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+    for attempt in range(1, OVERLOAD_ATTEMPTS + 1):
+        try:
+            return await score(content, essay_type, fallback=False)
+        except LLMOverloaded as e:
+            # Interactive traffic has the slots; wait our turn rather than fail the essay
+            if attempt == OVERLOAD_ATTEMPTS:
+                raise
+            await asyncio.sleep(e.retry_after)
+
+
+class ScoringBatch:
+    """
+    Essays of one batch queued for scoring.
+
+    Args:
+        groups: Content key -> IDs of the essays with that content, in submission order
+        futures: Scoring future -> content key
+    """
+
+    def __init__(self, groups: Dict[str, List[str]], futures: Dict[asyncio.Future, str]):
+        self.groups = groups
+        self.futures = futures
+
+    @property
+    def essays(self) -> int:
+        return sum(len(ids) for ids in self.groups.values())
+
+    async def results(self) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield one result per essay as its scoring completes.
+
+        Duplicates are yielded together with the essay they duplicate. If the
+        consumer stops early, essays not yet started are dropped from the queue.
+        """
+        pending = set(self.futures)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    ids = self.groups[self.futures[future]]
+                    if future.exception() is None:
+                        outcome = {"status": "scored", "result": future.result()}
+                    else:
+                        outcome = {"status": "failed", "error": "Scoring failed, please resubmit this essay"}
+                    for i, essay_id in enumerate(ids):
+                        yield {"id": essay_id, **outcome, **({"duplicate_of": ids[0]} if i else {})}
+        finally:
+            self.cancel()
+
+    def cancel(self):
+        for future in self.futures:
+            future.cancel()
+
+
+def submit_batch(
+    teacher_id: int,
+    essays: List[Tuple[str, str]],
+    essay_type: str = "college_app",
+    scheduler: Optional[FairScheduler] = None,
+    score: Callable[..., Awaitable[Dict[str, Any]]] = score_essay,
+) -> ScoringBatch:
+    """
+    Queue a batch of essays for scoring under the teacher's fair share.
+
+    Args:
+        teacher_id: Tenant whose queue the essays join
+        essays: (essay ID, content) pairs
+        essay_type: Rubric to score with
+        scheduler: Scheduler to use (the shared one by default)
+        score: Scoring function
+
+    Returns:
+        The queued batch
+
+    Raises:
+        SchedulerFull: If the essays do not fit in the queue
+    """
+    scheduler = scheduler or batch_scheduler
+    groups: Dict[str, List[str]] = {}
+    contents: Dict[str, str] = {}
+    for essay_id, content in essays:
+        key = content_key(content, essay_type)
+        groups.setdefault(key, []).append(essay_id)
+        contents.setdefault(key, content)
+
+    keys = list(groups)
+    futures = scheduler.submit_many(
+        teacher_id, [functools.partial(_score, contents[key], essay_type, score) for key in keys]
+    )
+    for future in futures:
+        # Failures are reported per essay; keep asyncio from logging abandoned ones
+        future.add_done_callback(_count_failure)
+    return ScoringBatch(groups, dict(zip(futures, keys)))
+
+
+def _count_failure(future: asyncio.Future):
+    if not future.cancelled() and future.exception() is not None:
+        errors.labels("essay_batch").inc()
+
+
+batch_scheduler = FairScheduler(workers=settings.ESSAY_BATCH_WORKERS, max_pending=settings.ESSAY_BATCH_MAX_PENDING)
+
+
+@registry.collector("essay_batch_tasks", "gauge", "Batch essay scoring tasks queued and running.")
+def _task_samples():
+    yield "essay_batch_tasks", {"state": "queued"}, batch_scheduler.pending
+    yield "essay_batch_tasks", {"state": "running"}, batch_scheduler.running
@@ -0,0 +1,142 @@
+"""
+Local stand-ins for Gemini and Pinecone.
+
+Selected with LLM_BACKEND=fake and VECTOR_BACKEND=memory for offline
+development, tests and load tests. Both take a FaultInjector that adds
+latency and errors, so timeouts, retries, hedging and circuit breakers can be
+exercised without the real services.
+"""
+
+import asyncio
+import math
+import random
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class InjectedFault(Exception):
+    """Error raised by a FaultInjector."""
+
+
+class FaultInjector:
+    """
+    Adds latency and failures to fake backend calls.
+
+    Args:
+        error_rate: Probability that a call raises InjectedFault
+        latency: Base latency of every call in seconds
+        slow_rate: Probability that a call takes slow_latency instead
+        slow_latency: Latency of slow calls (a latency tail)
+        seed: Random seed for reproducible runs
+    """
+
+    def __init__(
+        self,
+        error_rate: float = 0.0,
+        latency: float = 0.0,
+        slow_rate: float = 0.0,
+        slow_latency: float = 0.0,
+        seed: Optional[int] = None
+    ):
+        self.error_rate = error_rate
+        self.latency = latency
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.random = random.Random(seed)
+        self._forced_failures = 0
+        self.calls = 0
+
+    def fail_next(self, count: int = 1):
+        """Make the next count calls fail regardless of error_rate."""
+        self._forced_failures += count
+
+    async def __call__(self):
+        self.calls += 1
+        delay = self.slow_latency if self.random.random() < self.slow_rate else self.latency
+        if delay:
+            await asyncio.sleep(delay)
+        if self._forced_failures:
+            self._forced_failures -= 1
+            raise InjectedFault("injected failure")
+        if self.random.random() < self.error_rate:
+            raise InjectedFault("injected failure")
+
+
+def _estimate_tokens(text: str) -> int:
+    return -(-len(text) // 4)
+
+
+def default_reply(prompt: str) -> str:
+    return "Let's work through this step by step. Review the key concept, then try a similar practice problem."
+
+
+class FakeLLM:
+    """
+    Gemini stand-in that returns canned replies.
+
+    Args:
+        responder: Function producing the reply text for a prompt
+        faults: Latency and errors added before each reply
+        tokens_per_second: Simulated generation speed; 0 returns immediately
+    """
+
+    def __init__(
+        self,
+        responder: Callable[[str], str] = default_reply,
+        faults: Optional[FaultInjector] = None,
+        tokens_per_second: float = 0.0
+    ):
+        self.responder = responder
+        self.faults = faults or FaultInjector()
+        self.tokens_per_second = tokens_per_second
+        self.prompts: List[str] = []
+
+    async def generate(self, prompt: str):
+        from app.services.gemini import Completion
+
+        self.prompts.append(prompt)
+        await self.faults()
+        text = self.responder(prompt)
+        output_tokens = _estimate_tokens(text)
+        if self.tokens_per_second:
+            await asyncio.sleep(output_tokens / self.tokens_per_second)
+        return Completion(text, _estimate_tokens(prompt), output_tokens)
+
+    async def stream(self, prompt: str):
+        """Yield the reply word by word, paced like generate."""
+        self.prompts.append(prompt)
+        await self.faults()
+        for word in re.findall(r"\S+\s*", self.responder(prompt)):
+            if self.tokens_per_second:
+                await asyncio.sleep(_estimate_tokens(word) / self.tokens_per_second)
+            yield word
+
+
+def _cosine(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class InMemoryVectorStore:
+    """Pinecone stand-in with exact cosine search."""
+
+    def __init__(self, faults: Optional[FaultInjector] = None):
+        self.faults = faults or FaultInjector()
+        self.vectors: Dict[str, Tuple[List[float], Dict[str, Any]]] = {}
+
+    async def upsert(self, vector_id: str, vector: List[float], metadata: Dict[str, Any]):
+        await self.faults()
+        self.vectors[vector_id] = (list(vector), dict(metadata))
+
+    async def query(self, vector: List[float], top_k: int = 5) -> Dict[str, Any]:
+        await self.faults()
+        scored = sorted(
+            (
+                {"id": vector_id, "score": _cosine(vector, stored), "metadata": metadata}
+                for vector_id, (stored, metadata) in self.vectors.items()
+            ),
+            key=lambda match: match["score"],
+            reverse=True,
+        )
+        return {"matches": scored[:top_k]}
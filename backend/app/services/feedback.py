@@ -4,44 +4,74 @@ Service for generating feedback and scoring for essays, quizzes, and progress.
 
 from typing import Dict, List, Any, Optional
 import json
-from app.services.gemini import generate_response
+from pydantic import BaseModel
+from sqlalchemy import update
+from app.db.models import UserProgress
+from app.db.session import AsyncSessionLocal
+from app.services.analytics import summarize_quiz_results
+from app.services.progress import progress_snapshot, narrative_is_stale
+from app.utils.structured import generate_structured
+from app.core.metrics import errors
 
-async def score_essay(essay_text: str, rubric_type: str = "college_app") -> Dict[str, Any]:
+class CriterionScore(BaseModel):
+    score: float
+    feedback: str
+
+class EssayScores(BaseModel):
+    overall_score: float
+    detailed_scores: Dict[str, CriterionScore]
+    summary: str
+
+class StudyRecommendation(BaseModel):
+    topic: str
+    action: str
+    resource: str
+
+class StudyRecommendations(BaseModel):
+    recommendations: List[StudyRecommendation]
+
+class ProgressInsights(BaseModel):
+    progress_summary: str
+    recommendations: List[str]
+    estimated_score_range: str
+
+# Scoring rubrics for different essay types
+RUBRICS = {
+    "college_app": {
+        "criteria": [
+            "Originality and authenticity",
+            "Structure and organization",
+            "Grammar and mechanics",
+            "Clarity and coherence",
+            "Impact and memorability"
+        ],
+        "max_score": 10
+    },
+    "sat": {
+        "criteria": [
+            "Reading comprehension",
+            "Analysis of argument",
+            "Writing clarity",
+            "Grammar and usage",
+            "Overall essay effectiveness"
+        ],
+        "max_score": 8
+    }
+}
+
+async def score_essay(essay_text: str, rubric_type: str = "college_app", fallback: bool = True) -> Dict[str, Any]:
     """
     Score an essay based on various criteria.
     
     Args:
         essay_text: The essay to score
         rubric_type: Type of scoring rubric to use
+        fallback: Return placeholder scores if scoring fails, instead of raising
         
     Returns:
         Dictionary containing scores and feedback
     """
-    # Define scoring rubrics for different essay types
-    rubrics = {
-        "college_app": {
-            "criteria": [
-                "Originality and authenticity",
-                "Structure and organization",
-                "Grammar and mechanics",
-                "Clarity and coherence",
-                "Impact and memorability"
-            ],
-            "max_score": 10
-        },
-        "sat": {
-            "criteria": [
-                "Reading comprehension",
-                "Analysis of argument",
-                "Writing clarity",
-                "Grammar and usage",
-                "Overall essay effectiveness"
-            ],
-            "max_score": 8
-        }
-    }
-    
-    rubric = rubrics.get(rubric_type, rubrics["college_app"])
+    rubric = RUBRICS.get(rubric_type, RUBRICS["college_app"])
     
     prompt = f"""
     Score the following essay based on these criteria (scale 1-{rubric["max_score"]}):
@@ -71,11 +101,13 @@ async def score_essay(essay_text: str, rubric_type: str = "college_app") -> Dict
     """
     
     try:
-        response = await generate_response(prompt)
-        scores = json.loads(response)
-        return scores
+        scores = await generate_structured(prompt, EssayScores, "score_essay")
+        return scores.dict()
     except Exception as e:
         print(f"Error scoring essay: {e}")
+        errors.labels("score_essay").inc()
+        if not fallback:
+            raise
         # Fallback with basic scoring
         return {
             "overall_score": 7,
@@ -108,37 +140,10 @@ async def analyze_quiz_results(
             "recommendations": ["Complete some quizzes to receive personalized feedback"]
         }
     
-    # Calculate basic statistics
-    total_score = 0
-    correct_by_topic = {}
-    total_by_topic = {}
-    
-    for result in quiz_results:
-        total_score += result.get("score", 0)
-        
-        # Track performance by topic
-        topic = result.get("topic", "unknown")
-        if topic not in correct_by_topic:
-            correct_by_topic[topic] = 0
-            total_by_topic[topic] = 0
-            
-        correct_by_topic[topic] += result.get("correct_count", 0)
-        total_by_topic[topic] += result.get("total_questions", 0)
-    
-    average_score = total_score / len(quiz_results)
-    
-    # Identify strengths and weaknesses
-    strengths = []
-    weaknesses = []
-    
-    for topic, correct in correct_by_topic.items():
-        total = total_by_topic[topic]
-        if total > 0:
-            accuracy = correct / total
-            if accuracy >= 0.7:
-                strengths.append(topic)
-            elif accuracy <= 0.5:
-                weaknesses.append(topic)
+    summary = summarize_quiz_results(quiz_results)
+    average_score = summary["average_score"]
+    strengths = summary["strengths"]
+    weaknesses = summary["weaknesses"]
     
     # Generate recommendations prompt
     prompt = f"""
@@ -164,17 +169,17 @@ async def analyze_quiz_results(
     """
     
     try:
-        response = await generate_response(prompt)
-        recommendations = json.loads(response)
+        recommendations = await generate_structured(prompt, StudyRecommendations, "quiz_analysis")
         
         return {
             "average_score": average_score,
             "strengths": strengths,
             "weaknesses": weaknesses,
-            "recommendations": recommendations.get("recommendations", [])
+            "recommendations": [r.dict() for r in recommendations.recommendations]
         }
     except Exception as e:
         print(f"Error generating recommendations: {e}")
+        errors.labels("quiz_analysis").inc()
         return {
             "average_score": average_score,
             "strengths": strengths,
@@ -190,35 +195,49 @@ async def generate_progress_report(user_id: int) -> Dict[str, Any]:
     """
     Generate a comprehensive progress report for a user.
     
+    Figures come from the user's incremental rollup row; the AI narrative is
+    cached on that row and only regenerated when the rollup changes materially.
+    
     Args:
         user_id: User ID
         
     Returns:
         Progress report data
     """
-    # In a real implementation, this would query the database for user activity
-    # This is a placeholder that would be replaced with actual DB queries
+    async with AsyncSessionLocal() as session:
+        progress = await session.get(UserProgress, user_id)
+    data = progress_snapshot(progress)
     
-    # Mock data for demonstration purposes
-    mock_data = {
-        "quiz_attempts": 12,
-        "essay_submissions": 3,
-        "chat_interactions": 45,
-        "study_time_hours": 28,
-        "topics_studied": ["algebra", "geometry", "reading comprehension"],
-        "average_quiz_score": 720,
-        "score_improvement": 80
-    }
+    if not data["quiz_attempts"] and not data["essay_submissions"]:
+        return {
+            **data,
+            "progress_summary": "Complete a quiz or submit an essay to start tracking your progress!",
+            "recommendations": [
+                "Take a diagnostic quiz to find your starting point",
+                "Submit a practice essay for feedback",
+                "Ask the tutor about topics you find difficult"
+            ],
+            "estimated_score_range": None
+        }
+    
+    basis = json.loads(progress.narrative_basis) if progress.narrative_basis else None
+    if not narrative_is_stale(basis, data):
+        return {**data, **json.loads(progress.narrative)}
     
-    # AI could enhance this with personalized insights
+    topic_lines = "\n".join(
+        f"    - {topic}: {accuracy:.0%} accuracy"
+        for topic, accuracy in data["topic_accuracy"].items()
+    )
     prompt = f"""
     Based on this student's SAT prep activity:
-    - Completed {mock_data["quiz_attempts"]} quizzes
-    - Submitted {mock_data["essay_submissions"]} essays
-    - Had {mock_data["chat_interactions"]} tutor chat interactions
-    - Studied for {mock_data["study_time_hours"]} hours
-    - Current average score: {mock_data["average_quiz_score"]}
-    - Improved by {mock_data["score_improvement"]} points
+    - Completed {data["quiz_attempts"]} quizzes
+    - Submitted {data["essay_submissions"]} essays
+    - Had {data["chat_interactions"]} tutor chat interactions
+    - Average quiz score: {data["average_quiz_score"]}
+    - Recent quiz score (moving average): {data["recent_quiz_score"]}
+    - Improved by {data["score_improvement"]} points since their first quiz
+    - Accuracy by topic:
+{topic_lines or "    - No topic data yet"}
     
     Provide a motivational progress summary and 3 specific recommendations for continued improvement.
     
@@ -235,23 +254,34 @@ async def generate_progress_report(user_id: int) -> Dict[str, Any]:
     """
     
     try:
-        response = await generate_response(prompt)
-        insights = json.loads(response)
-        
-        # Combine data and insights
-        return {
-            **mock_data,
-            **insights
-        }
+        insights = (await generate_structured(prompt, ProgressInsights, "progress_report")).dict()
     except Exception as e:
         print(f"Error generating progress report: {e}")
+        errors.labels("progress_report").inc()
+        # Serve the previous narrative if there is one rather than a generic message
+        if progress.narrative:
+            return {**data, **json.loads(progress.narrative)}
         return {
-            **mock_data,
+            **data,
             "progress_summary": "You're making good progress in your SAT preparation!",
             "recommendations": [
                 "Focus more on your weakest topics",
                 "Take timed practice tests to build stamina",
                 "Review your mistakes carefully to avoid repeating them"
             ],
-            "estimated_score_range": "700-750"
-        }
\ No newline at end of file
+            "estimated_score_range": None
+        }
+    
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            update(UserProgress)
+            .where(UserProgress.user_id == user_id)
+            .values(narrative=json.dumps(insights), narrative_basis=json.dumps(data))
+        )
+        await session.commit()
+    
+    # Combine data and insights
+    return {
+        **data,
+        **insights
+    }
@@ -0,0 +1,210 @@
+"""
+Flashcard decks and spaced-repetition review scheduling.
+
+Decks are generated once per (topic, subtopic) and shared by every student;
+topics are matched ignoring case and spacing, and concurrent requests for a
+missing deck wait for a single generation instead of each calling the LLM.
+Review state is kept per user and card and scheduled with SM-2: successful
+reviews multiply the interval by the card's ease, lapses reset it, and the
+ease drifts with how hard each recall was. Due cards are an indexed range
+query on (user_id, due_at).
+"""
+
+import asyncio
+import datetime
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.db.models import Flashcard, FlashcardDeck, FlashcardReview
+
+MIN_EASE = 1.3
+INITIAL_EASE = 2.5
+# Minimum quality (0-5) counted as a successful recall
+PASSING_QUALITY = 3
+MAX_TOPIC_LENGTH = 100
+
+_deck_locks: Dict[str, asyncio.Lock] = {}
+
+
+def schedule_review(review: FlashcardReview, quality: int, now: datetime.datetime) -> FlashcardReview:
+    """
+    Apply one SM-2 review to a card's state.
+
+    Args:
+        review: Review state to update in place
+        quality: Recall quality from 0 (blackout) to 5 (perfect)
+        now: Review time
+
+    Returns:
+        The updated review state
+    """
+    if quality < PASSING_QUALITY:
+        review.repetitions = 0
+        review.interval_days = 1.0
+        review.lapses += 1
+    else:
+        if review.repetitions == 0:
+            review.interval_days = 1.0
+        elif review.repetitions == 1:
+            review.interval_days = 6.0
+        else:
+            review.interval_days = round(review.interval_days * review.ease, 1)
+        review.repetitions += 1
+
+    miss = 5 - quality
+    review.ease = max(MIN_EASE, review.ease + 0.1 - miss * (0.08 + miss * 0.02))
+    review.reviewed_at = now
+    review.due_at = now + datetime.timedelta(days=review.interval_days)
+    return review
+
+
+def normalize_topic(value: Optional[str]) -> str:
+    """
+    Deck key for a topic or subtopic as typed: "Algebra" and "algebra "
+    share a deck. Blank values give "".
+
+    Raises:
+        ValueError: If the topic is longer than MAX_TOPIC_LENGTH
+    """
+    value = " ".join((value or "").split()).lower()
+    if len(value) > MAX_TOPIC_LENGTH:
+        raise ValueError(f"Topics are limited to {MAX_TOPIC_LENGTH} characters")
+    return value
+
+
+async def _find_deck(session, topic: str, subtopic: str) -> Optional[FlashcardDeck]:
+    return (await session.execute(
+        select(FlashcardDeck).where(FlashcardDeck.topic == topic, FlashcardDeck.subtopic == subtopic)
+    )).scalar_one_or_none()
+
+
+async def get_or_create_deck(
+    session,
+    topic: str,
+    subtopic: Optional[str],
+    generate: Callable[..., Awaitable[List[Dict[str, str]]]],
+) -> FlashcardDeck:
+    """
+    Load the shared deck for a topic, generating and storing it on first use.
+
+    Args:
+        session: Active database session
+        topic: Deck topic
+        subtopic: Optional subtopic
+        generate: Async (topic, subtopic, num_cards) -> list of {front, back}
+
+    Returns:
+        The deck
+
+    Raises:
+        ValueError: If generation returned no cards; nothing is stored, so
+            a later request generates again
+    """
+    topic, subtopic = normalize_topic(topic), normalize_topic(subtopic)
+    deck = await _find_deck(session, topic, subtopic)
+    if deck is not None:
+        return deck
+
+    key = f"{topic}/{subtopic}"
+    lock = _deck_locks.setdefault(key, asyncio.Lock())
+    try:
+        async with lock:
+            # Another request may have created it while we waited
+            deck = await _find_deck(session, topic, subtopic)
+            if deck is not None:
+                return deck
+
+            cards = await generate(topic, subtopic or None, settings.FLASHCARD_DECK_SIZE)
+            if not cards:
+                raise ValueError(f"No flashcards generated for {key}")
+            deck = FlashcardDeck(topic=topic, subtopic=subtopic)
+            deck.cards = [Flashcard(front=card["front"], back=card["back"]) for card in cards]
+            session.add(deck)
+            try:
+                await session.commit()
+            except IntegrityError:
+                # Created concurrently by another worker process
+                await session.rollback()
+                deck = await _find_deck(session, topic, subtopic)
+            return deck
+    finally:
+        _deck_locks.pop(key, None)
+
+
+async def deck_cards(session, deck_id: int) -> List[Flashcard]:
+    result = await session.execute(select(Flashcard).where(Flashcard.deck_id == deck_id).order_by(Flashcard.id))
+    return list(result.scalars())
+
+
+async def enroll(session, user_id: int, cards: List[Flashcard], now: datetime.datetime) -> int:
+    """
+    Start review state for the cards the user has not seen yet; new cards are
+    due immediately. The caller commits.
+
+    Returns:
+        Number of cards added to the user's reviews
+    """
+    card_ids = [card.id for card in cards]
+    seen = set((await session.execute(
+        select(FlashcardReview.card_id).where(
+            FlashcardReview.user_id == user_id, FlashcardReview.card_id.in_(card_ids)
+        )
+    )).scalars())
+    new = [card_id for card_id in card_ids if card_id not in seen]
+    for card_id in new:
+        session.add(FlashcardReview(
+            user_id=user_id, card_id=card_id, ease=INITIAL_EASE, interval_days=0.0,
+            repetitions=0, lapses=0, due_at=now
+        ))
+    return len(new)
+
+
+async def due_cards(session, user_id: int, now: datetime.datetime, limit: int = 20) -> List[Dict]:
+    """
+    Cards due for review, most overdue first.
+
+    Args:
+        session: Active database session
+        user_id: User ID
+        now: Current time
+        limit: Maximum number of cards
+
+    Returns:
+        List of cards with their review state
+    """
+    result = await session.execute(
+        select(FlashcardReview, Flashcard)
+        .join(Flashcard, Flashcard.id == FlashcardReview.card_id)
+        .where(FlashcardReview.user_id == user_id, FlashcardReview.due_at <= now)
+        .order_by(FlashcardReview.due_at)
+        .limit(limit)
+    )
+    return [
+        {
+            "id": card.id,
+            "deck_id": card.deck_id,
+            "front": card.front,
+            "back": card.back,
+            "due_at": review.due_at.isoformat(),
+            "repetitions": review.repetitions,
+        }
+        for review, card in result.all()
+    ]
+
+
+async def review_card(
+    session, user_id: int, card_id: int, quality: int, now: datetime.datetime
+) -> Optional[FlashcardReview]:
+    """
+    Record a review of a card the user is enrolled in. The caller commits.
+
+    Returns:
+        The updated review state, or None if the user has no state for the card
+    """
+    review = await session.get(FlashcardReview, (user_id, card_id))
+    if review is None:
+        return None
+    return schedule_review(review, quality, now)
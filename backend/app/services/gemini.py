@@ -1,12 +1,148 @@
 
-from typing import List
-from google.generativeai import GenerativeModel, configure
+import asyncio
+import time
+from typing import AsyncIterator, List, NamedTuple
 from app.core.config import settings
+from app.core.metrics import record_llm_call
+from app.core.ratelimit import LLMOverloaded, llm_limiter
+from app.core.resilience import ResiliencePolicy, circuit_breaker
+from app.core.tracing import tracer
 
-configure(api_key=settings.GEMINI_API_KEY)
+class Completion(NamedTuple):
+    text: str
+    prompt_tokens: int = 0
+    output_tokens: int = 0
 
-model = GenerativeModel("gemini-pro")
+class GeminiBackend:
+    def __init__(self, api_key: str, model_name: str = "gemini-pro"):
+        from google.generativeai import GenerativeModel, configure
 
-async def generate_response(prompt: str) -> str:
-    resp = model.generate_content(prompt)
-    return resp.candidates[0].text
+        configure(api_key=api_key)
+        self.model = GenerativeModel(model_name)
+
+    async def generate(self, prompt: str) -> Completion:
+        resp = await self.model.generate_content_async(prompt)
+        usage = getattr(resp, "usage_metadata", None)
+        return Completion(
+            resp.candidates[0].text,
+            getattr(usage, "prompt_token_count", 0),
+            getattr(usage, "candidates_token_count", 0),
+        )
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        resp = await self.model.generate_content_async(prompt, stream=True)
+        async for chunk in resp:
+            if chunk.text:
+                yield chunk.text
+
+_backend = None
+
+def get_backend():
+    """LLM backend selected by LLM_BACKEND, created on first use."""
+    global _backend
+    if _backend is None:
+        if settings.LLM_BACKEND == "fake":
+            from app.services.fakes import FakeLLM, FaultInjector
+            _backend = FakeLLM(
+                faults=FaultInjector(latency=settings.FAKE_LLM_LATENCY),
+                tokens_per_second=settings.FAKE_LLM_TOKENS_PER_SECOND,
+            )
+        else:
+            _backend = GeminiBackend(settings.GEMINI_API_KEY)
+    return _backend
+
+policy = ResiliencePolicy(
+    circuit_breaker(
+        "gemini",
+        failure_threshold=settings.BREAKER_FAILURE_THRESHOLD,
+        recovery_timeout=settings.BREAKER_RECOVERY_TIMEOUT,
+    ),
+    timeout=settings.LLM_TIMEOUT,
+    attempts=settings.LLM_ATTEMPTS,
+    hedge_after=settings.LLM_HEDGE_AFTER or None,
+    # Waiting for a local slot says nothing about Gemini's health
+    passthrough=(LLMOverloaded,),
+)
+
+async def generate_response(prompt: str, call_site: str = "other") -> str:
+    """
+    Generate text under the LLM concurrency cap and resilience policy.
+
+    Args:
+        prompt: Prompt text
+        call_site: Name used to break down LLM metrics (chat, essay_analysis, ...)
+    """
+    backend = get_backend()
+
+    async def attempt():
+        async with llm_limiter:
+            return await backend.generate(prompt)
+
+    start = time.perf_counter()
+    with tracer.span("llm.generate", call_site=call_site) as span:
+        try:
+            completion = await policy.call(attempt)
+        except Exception as e:
+            record_llm_call(call_site, time.perf_counter() - start, type(e).__name__)
+            raise
+        record_llm_call(
+            call_site, time.perf_counter() - start, "ok", completion.prompt_tokens, completion.output_tokens
+        )
+        span.set_attribute("llm.prompt_tokens", completion.prompt_tokens)
+        span.set_attribute("llm.output_tokens", completion.output_tokens)
+    return completion.text
+
+async def stream_response(prompt: str, call_site: str = "other") -> AsyncIterator[str]:
+    """
+    Stream generated text under the LLM concurrency cap and circuit breaker.
+
+    Unlike generate_response there are no retries or hedging, since chunks
+    already sent cannot be taken back; LLM_TIMEOUT bounds the wait for each
+    chunk instead of the whole reply.
+
+    Args:
+        prompt: Prompt text
+        call_site: Name used to break down LLM metrics
+
+    Yields:
+        Text chunks as the model produces them
+    """
+    backend = get_backend()
+    breaker = policy.breaker
+    start = time.perf_counter()
+    output_chars = 0
+    with tracer.span("llm.generate", call_site=call_site, streamed=True) as span:
+        try:
+            breaker.before_call()
+        except Exception as e:
+            record_llm_call(call_site, time.perf_counter() - start, type(e).__name__)
+            raise
+        try:
+            async with llm_limiter:
+                chunks = backend.stream(prompt)
+                try:
+                    while True:
+                        try:
+                            chunk = await asyncio.wait_for(chunks.__anext__(), settings.LLM_TIMEOUT)
+                        except StopAsyncIteration:
+                            break
+                        if not output_chars:
+                            span.set_attribute("llm.first_chunk_ms", round((time.perf_counter() - start) * 1000, 1))
+                        output_chars += len(chunk)
+                        yield chunk
+                finally:
+                    await chunks.aclose()
+        except (asyncio.CancelledError, GeneratorExit, LLMOverloaded) as e:
+            # The client went away or no slot was free: nothing learned about Gemini
+            breaker.abandon()
+            record_llm_call(call_site, time.perf_counter() - start, type(e).__name__)
+            raise
+        except Exception as e:
+            breaker.record_failure()
+            record_llm_call(call_site, time.perf_counter() - start, type(e).__name__)
+            raise
+        breaker.record_success()
+        # Streams carry no usage metadata; estimate at ~4 characters per token
+        output_tokens = -(-output_chars // 4)
+        record_llm_call(call_site, time.perf_counter() - start, "ok", -(-len(prompt) // 4), output_tokens)
+        span.set_attribute("llm.output_tokens", output_tokens)
@@ -0,0 +1,424 @@
+"""
+Background job queue for long-running analysis work.
+
+Requests enqueue a job and return its id immediately; a pool of worker tasks
+claims queued jobs from a durable store, runs the registered handler with
+retries, and records the result for clients to poll.
+
+Handlers wrap expensive steps (LLM calls) in checkpoint(), which stores each
+step's result with the job. A retry after a later failure, such as a failed
+database write, reuses the stored result instead of paying for the call again.
+"""
+
+import asyncio
+import copy
+import datetime
+import json
+import uuid
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from sqlalchemy import update
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.core.metrics import errors
+from app.core.tracing import tracer
+from app.db.models import AnalysisJob
+from app.db.session import AsyncSessionLocal
+
+JobHandler = Callable[[Dict[str, Any], Optional[int]], Awaitable[Dict[str, Any]]]
+
+TERMINAL_STATUSES = ("succeeded", "failed")
+
+
+def _utcnow() -> datetime.datetime:
+    return datetime.datetime.utcnow()
+
+
+class JobStore:
+    """Interface for job persistence backends."""
+
+    async def enqueue(self, kind: str, payload: Dict[str, Any], user_id: Optional[int]) -> str:
+        raise NotImplementedError
+
+    async def claim(self) -> Optional[Dict[str, Any]]:
+        """Atomically move the oldest runnable job to 'running' and return it."""
+        raise NotImplementedError
+
+    async def complete(self, job_id: str, result: Dict[str, Any]):
+        raise NotImplementedError
+
+    async def retry(self, job_id: str, error: str, delay: float):
+        raise NotImplementedError
+
+    async def fail(self, job_id: str, error: str):
+        raise NotImplementedError
+
+    async def save_checkpoints(self, job_id: str, checkpoints: Dict[str, Any]):
+        raise NotImplementedError
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    async def requeue_stale(self, older_than: datetime.timedelta) -> int:
+        """Requeue jobs left 'running' by a worker that died mid-job."""
+        raise NotImplementedError
+
+
+def _job_to_dict(job: AnalysisJob) -> Dict[str, Any]:
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "user_id": job.user_id,
+        "payload": json.loads(job.payload) if job.payload else {},
+        "status": job.status,
+        "attempts": job.attempts,
+        "result": json.loads(job.result) if job.result else None,
+        "checkpoints": json.loads(job.checkpoints) if job.checkpoints else {},
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+    }
+
+
+class SQLJobStore(JobStore):
+    """Job store backed by the application database (Postgres or SQLite)."""
+
+    def __init__(self, session_factory=AsyncSessionLocal):
+        self.session_factory = session_factory
+
+    async def enqueue(self, kind, payload, user_id):
+        job_id = uuid.uuid4().hex
+        async with self.session_factory() as session:
+            session.add(AnalysisJob(
+                id=job_id,
+                kind=kind,
+                user_id=user_id,
+                payload=json.dumps(payload),
+                status="queued",
+            ))
+            await session.commit()
+        return job_id
+
+    async def claim(self):
+        async with self.session_factory() as session:
+            # A few attempts in case another worker claims the same row first
+            for _ in range(3):
+                job_id = (await session.execute(
+                    select(AnalysisJob.id)
+                    .where(AnalysisJob.status == "queued", AnalysisJob.run_after <= _utcnow())
+                    .order_by(AnalysisJob.run_after)
+                    .limit(1)
+                )).scalar_one_or_none()
+                if job_id is None:
+                    return None
+
+                claimed = await session.execute(
+                    update(AnalysisJob)
+                    .where(AnalysisJob.id == job_id, AnalysisJob.status == "queued")
+                    .values(status="running", attempts=AnalysisJob.attempts + 1, updated_at=_utcnow())
+                )
+                await session.commit()
+                if claimed.rowcount == 1:
+                    return _job_to_dict(await session.get(AnalysisJob, job_id, populate_existing=True))
+            return None
+
+    async def _update(self, job_id: str, **values):
+        async with self.session_factory() as session:
+            await session.execute(
+                update(AnalysisJob)
+                .where(AnalysisJob.id == job_id)
+                .values(updated_at=_utcnow(), **values)
+            )
+            await session.commit()
+
+    async def complete(self, job_id, result):
+        await self._update(job_id, status="succeeded", result=json.dumps(result), error=None)
+
+    async def retry(self, job_id, error, delay):
+        run_after = _utcnow() + datetime.timedelta(seconds=delay)
+        await self._update(job_id, status="queued", error=error, run_after=run_after)
+
+    async def fail(self, job_id, error):
+        await self._update(job_id, status="failed", error=error)
+
+    async def save_checkpoints(self, job_id, checkpoints):
+        await self._update(job_id, checkpoints=json.dumps(checkpoints))
+
+    async def get(self, job_id):
+        async with self.session_factory() as session:
+            job = await session.get(AnalysisJob, job_id)
+            return _job_to_dict(job) if job else None
+
+    async def requeue_stale(self, older_than):
+        async with self.session_factory() as session:
+            result = await session.execute(
+                update(AnalysisJob)
+                .where(AnalysisJob.status == "running", AnalysisJob.updated_at < _utcnow() - older_than)
+                .values(status="queued", updated_at=_utcnow())
+            )
+            await session.commit()
+            return result.rowcount
+
+
+class InMemoryJobStore(JobStore):
+    """Non-durable job store for tests and single-process development."""
+
+    def __init__(self):
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+
+    async def enqueue(self, kind, payload, user_id):
+        job_id = uuid.uuid4().hex
+        now = _utcnow()
+        self.jobs[job_id] = {
+            "id": job_id,
+            "kind": kind,
+            "user_id": user_id,
+            "payload": payload,
+            "status": "queued",
+            "attempts": 0,
+            "result": None,
+            "checkpoints": {},
+            "error": None,
+            "run_after": now,
+            "updated_at": now,
+            "created_at": now.isoformat(),
+        }
+        return job_id
+
+    async def claim(self):
+        now = _utcnow()
+        runnable = [
+            job for job in self.jobs.values()
+            if job["status"] == "queued" and job["run_after"] <= now
+        ]
+        if not runnable:
+            return None
+        job = min(runnable, key=lambda job: job["run_after"])
+        job.update(status="running", attempts=job["attempts"] + 1, updated_at=now)
+        return self._public(job)
+
+    async def complete(self, job_id, result):
+        self.jobs[job_id].update(status="succeeded", result=result, error=None, updated_at=_utcnow())
+
+    async def retry(self, job_id, error, delay):
+        run_after = _utcnow() + datetime.timedelta(seconds=delay)
+        self.jobs[job_id].update(status="queued", error=error, run_after=run_after, updated_at=_utcnow())
+
+    async def fail(self, job_id, error):
+        self.jobs[job_id].update(status="failed", error=error, updated_at=_utcnow())
+
+    async def save_checkpoints(self, job_id, checkpoints):
+        # Copied like a durable store would serialize it
+        self.jobs[job_id].update(checkpoints=copy.deepcopy(checkpoints), updated_at=_utcnow())
+
+    async def get(self, job_id):
+        job = self.jobs.get(job_id)
+        return self._public(job) if job else None
+
+    async def requeue_stale(self, older_than):
+        cutoff = _utcnow() - older_than
+        stale = [
+            job for job in self.jobs.values()
+            if job["status"] == "running" and job["updated_at"] < cutoff
+        ]
+        for job in stale:
+            job["status"] = "queued"
+        return len(stale)
+
+    @staticmethod
+    def _public(job: Dict[str, Any]) -> Dict[str, Any]:
+        public = {k: v for k, v in job.items() if k not in ("run_after", "updated_at")}
+        public["checkpoints"] = copy.deepcopy(job["checkpoints"])
+        return public
+
+
+# (store, job) of the job running in the current task
+_current_job: ContextVar[Optional[Tuple[JobStore, Dict[str, Any]]]] = ContextVar("current_job", default=None)
+
+
+async def checkpoint(name: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Run a step of the current job once across retries.
+
+    The step's result is stored with the job; if the job is retried, the
+    stored result is returned without running the step again. Outside a job
+    the step simply runs.
+
+    Args:
+        name: Step name, unique within the handler
+        compute: Coroutine function producing a JSON-serializable result
+    """
+    current = _current_job.get()
+    if current is None:
+        return await compute()
+    store, job = current
+    if name in job["checkpoints"]:
+        return job["checkpoints"][name]
+    value = await compute()
+    job["checkpoints"][name] = value
+    await store.save_checkpoints(job["id"], job["checkpoints"])
+    return value
+
+
+class JobQueue:
+    """
+    Pool of asyncio workers that run jobs from a JobStore.
+
+    Handlers are registered per job kind and receive the job payload and the
+    submitting user's id; whatever dict they return is stored as the result.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        workers: int = 2,
+        max_attempts: int = 3,
+        poll_interval: float = 1.0,
+        retry_base_delay: float = 2.0
+    ):
+        self.store = store
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.retry_base_delay = retry_base_delay
+        self.handlers: Dict[str, JobHandler] = {}
+        self._tasks = []
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._waiters: Dict[str, asyncio.Event] = {}
+
+    def handler(self, kind: str):
+        """Decorator registering the handler for a job kind."""
+        def decorator(func: JobHandler) -> JobHandler:
+            self.handlers[kind] = func
+            return func
+        return decorator
+
+    async def submit(self, kind: str, payload: Dict[str, Any], user_id: Optional[int] = None) -> str:
+        """
+        Enqueue a job.
+
+        Args:
+            kind: Registered job kind
+            payload: JSON-serializable handler input
+            user_id: Submitting user
+
+        Returns:
+            The new job id
+        """
+        if kind not in self.handlers:
+            raise ValueError(f"No handler registered for job kind '{kind}'")
+        job_id = await self.store.enqueue(kind, payload, user_id)
+        self._wakeup.set()
+        return job_id
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        Return the job once it is finished, or its current state after timeout.
+        """
+        job = await self.store.get(job_id)
+        if job is None or job["status"] in TERMINAL_STATUSES or timeout <= 0:
+            return job
+
+        event = self._waiters.setdefault(job_id, asyncio.Event())
+        try:
+            # Wake on local completion; poll the store for jobs finished by other workers
+            deadline = asyncio.get_running_loop().time() + timeout
+            while True:
+                remaining = deadline - asyncio.get_running_loop().time()
+                if remaining <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(event.wait(), min(remaining, self.poll_interval))
+                    break
+                except asyncio.TimeoutError:
+                    job = await self.store.get(job_id)
+                    if job["status"] in TERMINAL_STATUSES:
+                        return job
+        finally:
+            self._waiters.pop(job_id, None)
+        return await self.store.get(job_id)
+
+    async def start(self, stale_after: datetime.timedelta = datetime.timedelta(minutes=10)):
+        requeued = await self.store.requeue_stale(stale_after)
+        if requeued:
+            print(f"Requeued {requeued} stale jobs")
+        self._stopping = False
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self, timeout: float = 0.0):
+        """
+        Stop the workers, letting running jobs finish for up to timeout seconds.
+
+        Jobs still running after that are cancelled and picked up again by
+        requeue_stale on a later start.
+        """
+        self._stopping = True
+        self._wakeup.set()
+        if self._tasks and timeout > 0:
+            await asyncio.wait(self._tasks, timeout=timeout)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def run_once(self) -> bool:
+        """Claim and run a single job. Returns False if nothing was runnable."""
+        job = await self.store.claim()
+        if job is None:
+            return False
+
+        token = _current_job.set((self.store, job))
+        try:
+            with tracer.trace(f"job {job['kind']}", job_id=job["id"], attempt=job["attempts"]):
+                result = await self.handlers[job["kind"]](job["payload"], job["user_id"])
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if job["attempts"] < self.max_attempts:
+                delay = self.retry_base_delay * 2 ** (job["attempts"] - 1)
+                await self.store.retry(job["id"], error, delay)
+                return True
+            print(f"Job {job['id']} failed after {job['attempts']} attempts: {error}")
+            errors.labels("jobs").inc()
+            await self.store.fail(job["id"], error)
+        else:
+            await self.store.complete(job["id"], result)
+        finally:
+            _current_job.reset(token)
+
+        event = self._waiters.get(job["id"])
+        if event:
+            event.set()
+        return True
+
+    async def _worker(self):
+        while not self._stopping:
+            try:
+                if await self.run_once():
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Job worker error: {e}")
+                errors.labels("job_worker").inc()
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+def _create_store() -> JobStore:
+    if settings.JOB_STORE == "memory":
+        return InMemoryJobStore()
+    return SQLJobStore()
+
+
+job_queue = JobQueue(
+    _create_store(),
+    workers=settings.JOB_WORKERS,
+    max_attempts=settings.JOB_MAX_ATTEMPTS,
+    poll_interval=settings.JOB_POLL_INTERVAL,
+)
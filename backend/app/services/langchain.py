@@ -3,10 +3,10 @@ from langchain.vectorstores import Pinecone as PineconeStore
 from langchain.embeddings import OpenAIEmbeddings
 from langchain.chains import ConversationalRetrievalChain
 from app.core.config import settings
-from app.services.pinecone import index
+from app.services.pinecone import get_index
 
 embeddings = OpenAIEmbeddings()  # or Gemini embedding when available
-vector_store = PineconeStore(index, embeddings.embed_query, "text")
+vector_store = PineconeStore(get_index(), embeddings.embed_query, "text")
 
 chain = ConversationalRetrievalChain.from_llm(
     llm=...,  # Placeholder, supply Gemini chat model
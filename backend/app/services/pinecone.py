@@ -1,16 +1,65 @@
 
-import os, json
-import pinecone
+import asyncio
 from app.core.config import settings
+from app.core.metrics import timed, vector_latency
+from app.core.resilience import ResiliencePolicy, circuit_breaker
+from app.core.tracing import tracer
 
-pinecone.init(api_key=settings.PINECONE_API_KEY, environment="gcp-starter")
 index_name = "sathelp-memory"
-if index_name not in pinecone.list_indexes():
-    pinecone.create_index(name=index_name, dimension=1536)
-index = pinecone.Index(index_name)
 
-def upsert_embedding(user_id: str, vector: list[float], metadata: dict):
-    index.upsert([(f"{user_id}-{metadata.get('id')}", vector, metadata)])
+class PineconeStore:
+    """Async wrapper around the synchronous Pinecone client."""
 
-def query_embedding(vector: list[float], top_k=5):
-    return index.query(vector, top_k=top_k, include_metadata=True)
+    def __init__(self, api_key: str, name: str = index_name, dimension: int = 1536):
+        import pinecone
+
+        pinecone.init(api_key=api_key, environment="gcp-starter")
+        if name not in pinecone.list_indexes():
+            pinecone.create_index(name=name, dimension=dimension)
+        self.index = pinecone.Index(name)
+
+    async def upsert(self, vector_id: str, vector: list[float], metadata: dict):
+        await asyncio.to_thread(self.index.upsert, [(vector_id, vector, metadata)])
+
+    async def query(self, vector: list[float], top_k: int = 5):
+        return await asyncio.to_thread(self.index.query, vector, top_k=top_k, include_metadata=True)
+
+_store = None
+
+def get_store():
+    """Vector store selected by VECTOR_BACKEND, created on first use."""
+    global _store
+    if _store is None:
+        if settings.VECTOR_BACKEND == "memory":
+            from app.services.fakes import InMemoryVectorStore
+            _store = InMemoryVectorStore()
+        else:
+            _store = PineconeStore(settings.PINECONE_API_KEY)
+    return _store
+
+def get_index():
+    return get_store().index
+
+breaker = circuit_breaker(
+    "pinecone",
+    failure_threshold=settings.BREAKER_FAILURE_THRESHOLD,
+    recovery_timeout=settings.BREAKER_RECOVERY_TIMEOUT,
+)
+# Queries are hedged: a duplicate read is cheap compared to a slow chat reply
+query_policy = ResiliencePolicy(
+    breaker,
+    timeout=settings.VECTOR_TIMEOUT,
+    attempts=2,
+    hedge_after=settings.VECTOR_HEDGE_AFTER or None,
+)
+upsert_policy = ResiliencePolicy(breaker, timeout=settings.VECTOR_TIMEOUT, attempts=2)
+
+async def upsert_embedding(user_id: str, vector: list[float], metadata: dict):
+    store = get_store()
+    with tracer.span("vector.upsert"), timed(vector_latency.labels("upsert")):
+        await upsert_policy.call(lambda: store.upsert(f"{user_id}-{metadata.get('id')}", vector, metadata))
+
+async def query_embedding(vector: list[float], top_k=5):
+    store = get_store()
+    with tracer.span("vector.query", top_k=top_k), timed(vector_latency.labels("query")):
+        return await query_policy.call(lambda: store.query(vector, top_k))
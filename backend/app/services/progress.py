@@ -0,0 +1,152 @@
+"""
+Incremental per-user progress rollups.
+
+Every quiz submission, essay and chat interaction updates a single
+UserProgress row in the same transaction as the write itself, so building a
+progress report is a primary-key read instead of a scan of the user's history.
+"""
+
+import datetime
+import json
+from typing import Any, Dict, Optional
+
+from sqlalchemy.future import select
+
+from app.db.models import UserProgress
+from app.db.upsert import upsert
+
+# Smoothing factor for moving averages (higher reacts faster to recent results)
+EMA_ALPHA = 0.3
+
+# Changes that make a cached progress narrative stale
+NARRATIVE_MIN_NEW_QUIZZES = 3
+NARRATIVE_MIN_NEW_ESSAYS = 2
+NARRATIVE_MIN_SCORE_CHANGE = 20
+
+
+def _new_progress_values(user_id: int) -> Dict[str, Any]:
+    return {
+        "user_id": user_id,
+        "quiz_attempts": 0,
+        "score_total": 0,
+        "essay_submissions": 0,
+        "chat_interactions": 0,
+        "topic_stats": "{}",
+    }
+
+
+def _new_progress(user_id: int) -> UserProgress:
+    return UserProgress(**_new_progress_values(user_id))
+
+
+def _ema(previous: Optional[float], value: float) -> float:
+    return value if previous is None else EMA_ALPHA * value + (1 - EMA_ALPHA) * previous
+
+
+async def record_quiz_result(
+    session,
+    user_id: int,
+    topic: str,
+    score: int,
+    correct: int,
+    total: int
+):
+    """
+    Fold a quiz result into the user's rollup. The caller commits.
+
+    Args:
+        session: Active database session
+        user_id: User ID
+        topic: Quiz topic
+        score: Scaled quiz score
+        correct: Number of correct answers
+        total: Number of questions
+    """
+    # Create the row if needed without racing other first writes, then lock it
+    await upsert(session, UserProgress, [_new_progress_values(user_id)])
+    progress = (await session.execute(
+        select(UserProgress)
+        .where(UserProgress.user_id == user_id)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )).scalar_one()
+
+    progress.quiz_attempts += 1
+    progress.score_total += score
+    progress.score_ema = _ema(progress.score_ema, score)
+    if progress.first_score is None:
+        progress.first_score = score
+    progress.last_score = score
+
+    topics = json.loads(progress.topic_stats or "{}")
+    stats = topics.setdefault(topic, {"correct": 0, "total": 0, "accuracy_ema": None})
+    stats["correct"] += correct
+    stats["total"] += total
+    if total:
+        stats["accuracy_ema"] = _ema(stats["accuracy_ema"], correct / total)
+    progress.topic_stats = json.dumps(topics)
+    progress.updated_at = datetime.datetime.utcnow()
+
+
+async def _increment(session, user_id: int, column: str, amount: int = 1):
+    now = datetime.datetime.utcnow()
+    await upsert(
+        session,
+        UserProgress,
+        [{**_new_progress_values(user_id), column: amount, "updated_at": now}],
+        set_={column: UserProgress.__table__.c[column] + amount, "updated_at": now},
+    )
+
+
+async def record_essay(session, user_id: int, count: int = 1):
+    """Count essay submissions in the user's rollup. The caller commits."""
+    await _increment(session, user_id, "essay_submissions", count)
+
+
+async def record_chat_interactions(session, user_id: int, count: int = 1):
+    """Count tutor chat interactions in the user's rollup. The caller commits."""
+    await _increment(session, user_id, "chat_interactions", count)
+
+
+def progress_snapshot(progress: Optional[UserProgress]) -> Dict[str, Any]:
+    """
+    Build report figures from a rollup row.
+
+    Args:
+        progress: The user's rollup, or None if they have no activity yet
+
+    Returns:
+        Dictionary of progress statistics
+    """
+    if progress is None:
+        progress = _new_progress(0)
+
+    topics = json.loads(progress.topic_stats or "{}")
+    attempts = progress.quiz_attempts
+    return {
+        "quiz_attempts": attempts,
+        "essay_submissions": progress.essay_submissions,
+        "chat_interactions": progress.chat_interactions,
+        "topics_studied": list(topics),
+        "topic_accuracy": {
+            topic: round(stats["correct"] / stats["total"], 3)
+            for topic, stats in topics.items() if stats["total"]
+        },
+        "average_quiz_score": round(progress.score_total / attempts) if attempts else 0,
+        "recent_quiz_score": round(progress.score_ema) if progress.score_ema is not None else 0,
+        "score_improvement": round(progress.score_ema - progress.first_score) if attempts else 0,
+    }
+
+
+def narrative_is_stale(basis: Optional[Dict[str, Any]], snapshot: Dict[str, Any]) -> bool:
+    """
+    Decide whether the rollup has changed enough to regenerate the narrative.
+    """
+    if not basis:
+        return True
+    return (
+        snapshot["quiz_attempts"] - basis["quiz_attempts"] >= NARRATIVE_MIN_NEW_QUIZZES
+        or snapshot["essay_submissions"] - basis["essay_submissions"] >= NARRATIVE_MIN_NEW_ESSAYS
+        or abs(snapshot["recent_quiz_score"] - basis["recent_quiz_score"]) >= NARRATIVE_MIN_SCORE_CHANGE
+        or set(snapshot["topics_studied"]) != set(basis["topics_studied"])
+    )
@@ -0,0 +1,152 @@
+"""
+Scholarship catalog and search service.
+"""
+
+from bisect import bisect_left, bisect_right
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from app.core.cache import invalidate_catalog
+
+# In a real app, these would come from a database
+SCHOLARSHIPS = [
+    {
+        "id": 1,
+        "name": "Fulbright Scholarship",
+        "amount": 20000,
+        "deadline": "2025-11-15",
+        "countries": ["USA"],
+    },
+    {
+        "id": 2,
+        "name": "UAE Government Scholarship",
+        "amount": 30000,
+        "deadline": "2025-10-30",
+        "countries": ["UAE"],
+    },
+    {
+        "id": 3,
+        "name": "Global Excellence Award",
+        "amount": 15000,
+        "deadline": "2025-12-01",
+        "countries": ["USA", "UK", "UAE", "Canada"],
+    }
+]
+
+
+class ScholarshipIndex:
+    """
+    Deadline-ordered scholarship index, partitioned by eligible country.
+
+    Each partition is kept sorted by deadline so a deadline window is a pair
+    of binary searches instead of a scan over the whole catalog.
+    """
+
+    ALL = "*"
+
+    def __init__(self, scholarships: List[Dict]):
+        partitions: Dict[str, List[Tuple[date, Dict]]] = {self.ALL: []}
+        for scholarship in scholarships:
+            entry = (date.fromisoformat(scholarship["deadline"]), scholarship)
+            partitions[self.ALL].append(entry)
+            for country in scholarship.get("countries", []):
+                partitions.setdefault(country.lower(), []).append(entry)
+
+        self._entries: Dict[str, List[Dict]] = {}
+        self._deadlines: Dict[str, List[date]] = {}
+        for key, entries in partitions.items():
+            entries.sort(key=lambda entry: (entry[0], entry[1]["id"]))
+            self._deadlines[key] = [deadline for deadline, _ in entries]
+            self._entries[key] = [scholarship for _, scholarship in entries]
+
+    def search(
+        self,
+        query: Optional[str] = None,
+        country: Optional[str] = None,
+        min_amount: Optional[int] = None,
+        max_amount: Optional[int] = None,
+        deadline_after: Optional[date] = None,
+        deadline_before: Optional[date] = None,
+        today: Optional[date] = None,
+    ) -> List[Dict]:
+        """
+        Find eligible scholarships ordered by deadline proximity.
+
+        Upcoming deadlines come first (soonest first), followed by deadlines
+        that have already passed (most recent first).
+        """
+        key = country.lower() if country else self.ALL
+        deadlines = self._deadlines.get(key, [])
+        entries = self._entries.get(key, [])
+
+        lo = bisect_left(deadlines, deadline_after) if deadline_after else 0
+        hi = bisect_right(deadlines, deadline_before) if deadline_before else len(deadlines)
+        split = min(max(bisect_left(deadlines, today or date.today()), lo), hi)
+
+        ordered = entries[split:hi] + entries[lo:split][::-1]
+
+        query = query.lower() if query else None
+        return [
+            scholarship for scholarship in ordered
+            if (not query or query in scholarship["name"].lower())
+            and (min_amount is None or scholarship["amount"] >= min_amount)
+            and (max_amount is None or scholarship["amount"] <= max_amount)
+        ]
+
+
+scholarship_index = ScholarshipIndex(SCHOLARSHIPS)
+
+
+def load_scholarships(scholarships: List[Dict]):
+    """
+    Replace the scholarship catalog and rebuild the search index.
+
+    Args:
+        scholarships: Full list of scholarship records
+    """
+    global scholarship_index
+    SCHOLARSHIPS[:] = scholarships
+    scholarship_index = ScholarshipIndex(SCHOLARSHIPS)
+    invalidate_catalog()
+
+
+async def search_scholarships(
+    query: Optional[str] = None,
+    country: Optional[str] = None,
+    min_amount: Optional[int] = None,
+    max_amount: Optional[int] = None,
+    deadline_after: Optional[date] = None,
+    deadline_before: Optional[date] = None,
+    limit: int = 20,
+    offset: int = 0
+) -> Dict:
+    """
+    Search scholarships based on eligibility criteria
+
+    Args:
+        query: Search term for name
+        country: Country eligibility filter
+        min_amount: Minimum scholarship amount
+        max_amount: Maximum scholarship amount
+        deadline_after: Earliest deadline to include
+        deadline_before: Latest deadline to include
+        limit: Page size
+        offset: Number of results to skip
+
+    Returns:
+        Page of matching scholarships, sorted by deadline proximity, with the total match count
+    """
+    results = scholarship_index.search(
+        query=query,
+        country=country,
+        min_amount=min_amount,
+        max_amount=max_amount,
+        deadline_after=deadline_after,
+        deadline_before=deadline_before,
+    )
+    return {
+        "scholarships": results[offset:offset + limit],
+        "total": len(results),
+        "limit": limit,
+        "offset": offset,
+    }
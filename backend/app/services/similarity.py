@@ -0,0 +1,90 @@
+"""
+MinHash signatures for detecting near-duplicate essays.
+
+Each essay is reduced to a fixed-size signature over its word shingles; the
+fraction of matching signature slots estimates the Jaccard similarity of the
+two shingle sets, so resubmissions can be compared without the original text.
+"""
+
+import hashlib
+import random
+import re
+from typing import Iterable, List, Optional, Set, Tuple
+
+SHINGLE_SIZE = 4
+NUM_PERMUTATIONS = 64
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+# Fixed seed so signatures stay comparable across processes and restarts
+_rng = random.Random(0x5A7)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_PERMUTATIONS)
+]
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> Set[str]:
+    """
+    Split text into overlapping word n-grams, ignoring case and punctuation.
+    """
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def minhash_signature(text: str) -> List[int]:
+    """
+    Compute the MinHash signature of a document.
+
+    Args:
+        text: Document text
+
+    Returns:
+        List of NUM_PERMUTATIONS minimum hash values
+    """
+    hashes = [
+        int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=4).digest(), "little")
+        for shingle in shingles(text)
+    ]
+    if not hashes:
+        return [_MAX_HASH] * NUM_PERMUTATIONS
+    return [
+        min((a * h + b) % _MERSENNE_PRIME for h in hashes) & _MAX_HASH
+        for a, b in _PERMUTATIONS
+    ]
+
+
+def estimate_similarity(signature_a: List[int], signature_b: List[int]) -> float:
+    """
+    Estimate the Jaccard similarity of two documents from their signatures.
+    """
+    if len(signature_a) != len(signature_b) or not signature_a:
+        return 0.0
+    matches = sum(1 for a, b in zip(signature_a, signature_b) if a == b)
+    return matches / len(signature_a)
+
+
+def most_similar(
+    signature: List[int],
+    candidates: Iterable[Tuple[int, List[int]]]
+) -> Tuple[Optional[int], float]:
+    """
+    Find the candidate with the highest estimated similarity.
+
+    Args:
+        signature: Signature of the new document
+        candidates: (document id, signature) pairs
+
+    Returns:
+        Tuple of (best document id or None, similarity)
+    """
+    best_id, best_similarity = None, 0.0
+    for doc_id, candidate in candidates:
+        similarity = estimate_similarity(signature, candidate)
+        if similarity > best_similarity:
+            best_id, best_similarity = doc_id, similarity
+    return best_id, best_similarity
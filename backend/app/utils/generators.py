@@ -2,11 +2,15 @@
 Generators for creating quizzes, flashcards, and other learning materials.
 """
 
+import asyncio
 import random
-import json
 from typing import List, Dict, Any, Optional, Tuple
+from pydantic import BaseModel
+from app.services.adaptive import difficulty_label, initial_ability
 from app.services.gemini import generate_response
 from app.utils.prompts import QuizPrompts
+from app.utils.question_parser import parse_questions
+from app.utils.structured import generate_structured
 
 # Math topics and subtopics for quiz generation
 MATH_TOPICS = {
@@ -40,18 +44,99 @@ MATH_TOPICS = {
     ]
 }
 
-# Difficulty levels and their weights for adaptive quizzing
-DIFFICULTY_LEVELS = ["easy", "medium", "hard"]
-DIFFICULTY_WEIGHTS = {
-    "easy": {"easy": 0.7, "medium": 0.3, "hard": 0.0},
-    "medium": {"easy": 0.2, "medium": 0.6, "hard": 0.2},
-    "hard": {"easy": 0.0, "medium": 0.3, "hard": 0.7}
-}
+# Attempts per question before falling back to a placeholder
+MAX_QUESTION_ATTEMPTS = 2
+
+class Flashcard(BaseModel):
+    front: str
+    back: str
+
+# Offsets around the estimated ability, so a pre-generated quiz spans the
+# difficulties that are most informative for the student
+ADAPTIVE_OFFSETS = [0.0, -0.5, 0.5]
+
+def _placeholder_question(topic: str, subtopic: Optional[str], difficulty: str) -> Dict[str, Any]:
+    return {
+        "prompt": f"Sample {topic} question about {subtopic}",
+        "choices": ["Option A", "Option B", "Option C", "Option D"],
+        "answer": "0",
+        "explanation": "This is a placeholder explanation.",
+        "topic": topic,
+        "subtopic": subtopic,
+        "difficulty": difficulty
+    }
+
+async def generate_quiz_questions(
+    topic: str,
+    difficulties: List[str],
+    subtopic: Optional[str] = None,
+    fallback: bool = True
+) -> List[Dict[str, Any]]:
+    """
+    Generate a batch of quiz questions concurrently.
+    
+    Only questions whose output fails to parse are regenerated, up to
+    MAX_QUESTION_ATTEMPTS times; anything still unparseable falls back to a
+    placeholder question.
+    
+    Args:
+        topic: Main topic (algebra, geometry, etc.)
+        difficulties: Difficulty for each question to generate
+        subtopic: Optional specific subtopic for every question
+        fallback: Use placeholder questions for unparseable output, instead of raising
+        
+    Returns:
+        List of question dictionaries, in the order of difficulties
+
+    Raises:
+        ValueError: If fallback is False and a question could not be parsed
+    """
+    subtopics = [
+        subtopic or (random.choice(MATH_TOPICS[topic]) if topic in MATH_TOPICS else None)
+        for _ in difficulties
+    ]
+    prompts = [
+        QuizPrompts.GENERATE_QUESTION.format(
+            topic=f"{sub} in {topic}" if sub else topic,
+            difficulty=difficulty
+        )
+        for sub, difficulty in zip(subtopics, difficulties)
+    ]
+    
+    questions: List[Optional[Dict[str, Any]]] = [None] * len(prompts)
+    pending = list(range(len(prompts)))
+    for _ in range(MAX_QUESTION_ATTEMPTS):
+        responses = await asyncio.gather(*(generate_response(prompts[i], call_site="quiz_generation") for i in pending))
+        parsed, failures = parse_questions(responses)
+        
+        for i, question in zip(pending, parsed):
+            if question:
+                questions[i] = {
+                    **question,
+                    "answer": str(question["answer"]),
+                    "topic": topic,
+                    "subtopic": subtopics[i],
+                    "difficulty": difficulties[i]
+                }
+        for j, errors in failures.items():
+            print(f"Error parsing AI question {pending[j]}: {'; '.join(errors)}")
+        
+        pending = [pending[j] for j in failures]
+        if not pending:
+            break
+    
+    if pending and not fallback:
+        raise ValueError(f"Could not parse {len(pending)} generated {topic} question(s)")
+    for i in pending:
+        questions[i] = _placeholder_question(topic, subtopics[i], difficulties[i])
+    
+    return questions
 
 async def generate_quiz_question(
     topic: str, 
     difficulty: str = "medium",
-    subtopic: Optional[str] = None
+    subtopic: Optional[str] = None,
+    fallback: bool = True
 ) -> Dict[str, Any]:
     """
     Generate a single quiz question using AI.
@@ -60,65 +145,13 @@ async def generate_quiz_question(
         topic: Main topic (algebra, geometry, etc.)
         difficulty: Question difficulty (easy, medium, hard)
         subtopic: Optional specific subtopic
+        fallback: Return a placeholder question if parsing fails, instead of raising
         
     Returns:
         Dictionary containing the generated question
     """
-    if not subtopic and topic in MATH_TOPICS:
-        subtopic = random.choice(MATH_TOPICS[topic])
-        
-    full_topic = f"{subtopic} in {topic}" if subtopic else topic
-    
-    # Generate the question using Gemini
-    prompt = QuizPrompts.GENERATE_QUESTION.format(
-        topic=full_topic,
-        difficulty=difficulty
-    )
-    
-    response = await generate_response(prompt)
-    
-    # Parse the response
-    try:
-        lines = response.strip().split('\n')
-        question_text = ""
-        options = []
-        correct_answer = ""
-        explanation = ""
-        
-        # Extract question content
-        for i, line in enumerate(lines):
-            if line.startswith("Question:"):
-                question_text = line.replace("Question:", "").strip()
-            elif line.startswith(("A.", "B.", "C.", "D.")):
-                options.append(line[2:].strip())
-            elif line.startswith("Correct:"):
-                correct_letter = line.replace("Correct:", "").strip()
-                correct_answer = ["A", "B", "C", "D"].index(correct_letter)
-            elif line.startswith("Explanation:"):
-                explanation = '\n'.join(lines[i:]).replace("Explanation:", "").strip()
-                break
-        
-        return {
-            "prompt": question_text,
-            "choices": options,
-            "answer": str(correct_answer),
-            "explanation": explanation,
-            "topic": topic,
-            "subtopic": subtopic,
-            "difficulty": difficulty
-        }
-    except Exception as e:
-        # Fallback with static question if parsing fails
-        print(f"Error parsing AI response: {e}")
-        return {
-            "prompt": f"Sample {topic} question about {subtopic}",
-            "choices": ["Option A", "Option B", "Option C", "Option D"],
-            "answer": "0",
-            "explanation": "This is a placeholder explanation.",
-            "topic": topic,
-            "subtopic": subtopic,
-            "difficulty": difficulty
-        }
+    questions = await generate_quiz_questions(topic, [difficulty], subtopic, fallback=fallback)
+    return questions[0]
 
 async def generate_adaptive_quiz(
     topic: str,
@@ -128,6 +161,9 @@ async def generate_adaptive_quiz(
     """
     Generate an adaptive quiz based on user performance.
     
+    Interactive sessions should use /quiz/adaptive instead, which picks each
+    question from the bank as the ability estimate changes.
+    
     Args:
         topic: Quiz topic
         user_performance: Dictionary with correct and incorrect question IDs
@@ -136,41 +172,23 @@ async def generate_adaptive_quiz(
     Returns:
         List of quiz questions
     """
-    questions = []
-    current_difficulty = "medium"
+    answered = len(user_performance.get("correct", [])) + len(user_performance.get("incorrect", []))
+    accuracy = len(user_performance.get("correct", [])) / answered if answered else None
     
-    # Determine initial difficulty based on past performance
-    correct_ratio = 0.5  # Default 50% if no history
-    if len(user_performance.get("correct", [])) + len(user_performance.get("incorrect", [])) > 0:
-        total_answered = len(user_performance.get("correct", [])) + len(user_performance.get("incorrect", []))
-        correct_ratio = len(user_performance.get("correct", [])) / total_answered
-        
-        if correct_ratio > 0.8:
-            current_difficulty = "hard"
-        elif correct_ratio < 0.4:
-            current_difficulty = "easy"
-    
-    # Generate questions with adaptive difficulty
-    for i in range(num_questions):
-        # Update difficulty based on performance
-        if i > 0:
-            # Weighted random selection for next difficulty
-            weights = DIFFICULTY_WEIGHTS[current_difficulty]
-            current_difficulty = random.choices(
-                DIFFICULTY_LEVELS, 
-                weights=[weights.get(d, 0) for d in DIFFICULTY_LEVELS]
-            )[0]
-        
-        # Generate question with current difficulty
-        question = await generate_quiz_question(topic, current_difficulty)
-        questions.append(question)
+    # Questions are most informative near the student's ability
+    theta = initial_ability(accuracy)
+    difficulties = [
+        difficulty_label(theta + ADAPTIVE_OFFSETS[i % len(ADAPTIVE_OFFSETS)])
+        for i in range(num_questions)
+    ]
     
-    return questions
+    return await generate_quiz_questions(topic, difficulties)
 
 async def generate_flashcards(
     topic: str,
     subtopic: Optional[str] = None,
-    num_cards: int = 5
+    num_cards: int = 5,
+    fallback: bool = True
 ) -> List[Dict[str, str]]:
     """
     Generate flashcards for a specific topic.
@@ -179,6 +197,7 @@ async def generate_flashcards(
         topic: Topic for flashcards
         subtopic: Optional subtopic
         num_cards: Number of flashcards to generate
+        fallback: Return placeholder cards if generation fails, instead of raising
         
     Returns:
         List of flashcard dictionaries (front/back)
@@ -203,10 +222,11 @@ async def generate_flashcards(
     """
     
     try:
-        response = await generate_response(prompt)
-        cards = json.loads(response)
-        return cards
+        cards = await generate_structured(prompt, List[Flashcard], "flashcards")
+        return [card.dict() for card in cards]
     except Exception as e:
+        if not fallback:
+            raise
         # Fallback with static flashcards if generation fails
         print(f"Error generating flashcards: {e}")
         return [
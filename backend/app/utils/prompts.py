@@ -30,6 +30,15 @@ class ChatPrompts:
     
     Provide a response that's helpful, accurate, and tailored to SAT preparation.
     """
+    
+    SUMMARIZE_HISTORY = """
+    Summarize the following tutoring conversation between an SAT student and a tutor
+    in at most {max_words} words. Keep the topics covered, concepts the student struggled
+    with, and anything the student said about their goals. Do not add new advice.
+    
+    CONVERSATION:
+    {conversation}
+    """
 
 class EssayPrompts:
     FEEDBACK = """
@@ -48,6 +57,52 @@ class EssayPrompts:
     For each area, highlight strengths and provide constructive suggestions for improvement.
     """
     
+    COMBINED_ANALYSIS = """
+    As an expert in college application essays, analyze the following essay in a single pass.
+    
+    ESSAY:
+    {essay_text}
+    
+    1. Write detailed feedback covering structure and organization, clarity and coherence,
+       use of evidence and examples, grammar and style, and overall effectiveness.
+       For each area, highlight strengths and provide constructive suggestions.
+    2. Score the essay on each of these criteria (scale 1-{max_score}): {criteria}
+    3. Provide 5 specific, actionable improvements, each with an example of how to implement it.
+    
+    Return your response as valid JSON with this structure:
+    {{
+      "feedback": "(detailed feedback)",
+      "overall_score": (average of all scores),
+      "detailed_scores": {{
+        "criterion1": {{
+          "score": (score value),
+          "feedback": "(specific feedback)"
+        }},
+        ... (for each criterion)
+      }},
+      "summary": "(overall feedback summary)",
+      "improvements": [
+        {{
+          "suggestion": "(specific improvement)",
+          "example": "(example of the change)"
+        }},
+        ...
+      ]
+    }}
+    """
+    
+    INCREMENTAL_ANALYSIS = """
+    You previously analyzed an essay and produced this analysis (JSON):
+    {previous_analysis}
+    
+    The student has revised the essay. These are the changes (unified diff):
+    {diff}
+    
+    Update the analysis to reflect the revisions only where they matter. Keep the same
+    criteria (scale 1-{max_score}) and return valid JSON with exactly the same structure,
+    including the "feedback" field.
+    """
+    
     CV_FEEDBACK = """
     As an expert in college and job applications, review the following CV/resume:
     
@@ -74,14 +129,13 @@ class QuizPrompts:
     3. Include 4 multiple-choice options labeled A, B, C, D
     4. Have only one correct answer
     
-    Format:
-    Question: [question text]
-    A. [option A]
-    B. [option B]
-    C. [option C]
-    D. [option D]
-    Correct: [correct letter]
-    Explanation: [step-by-step solution]
+    Return only valid JSON with this structure:
+    {{
+      "question": "(question text)",
+      "choices": ["(option A)", "(option B)", "(option C)", "(option D)"],
+      "answer": "(letter of the correct option: A, B, C or D)",
+      "explanation": "(step-by-step solution)"
+    }}
     """
     
     ADAPTIVE_DIFFICULTY = """
@@ -93,4 +147,18 @@ class QuizPrompts:
     Determine the appropriate next difficulty level (easy, medium, hard) for an SAT math question on topic: {next_topic}.
     
     Only respond with one of: "easy", "medium", or "hard"
-    """
\ No newline at end of file
+    """
+
+class StructuredPrompts:
+    REPAIR = """
+    The following output was supposed to be JSON matching this JSON Schema:
+    {schema}
+    
+    It failed validation with this error:
+    {error}
+    
+    OUTPUT:
+    {output}
+    
+    Return only the corrected JSON, with no code fences or commentary.
+    """
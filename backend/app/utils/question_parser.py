@@ -0,0 +1,223 @@
+"""
+Parser for generated multiple-choice quiz questions.
+
+The generator asks for JSON, but models drift: option labels come back as
+"A)" or "(A)", lines get markdown bold or indentation, and the answer may be
+given as a letter, an index, or the option text. JSON output is tried first,
+then a tolerant line-based parser; both paths share one validator so callers
+get a list of concrete errors instead of a silent placeholder.
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.utils.structured import StructuredOutputError, extract_json
+
+NUM_CHOICES = 4
+LABELS = "ABCD"
+
+_MARKUP_RE = re.compile(r"\*\*|__|`|^\s*#+\s*|^\s*[-*•]\s+")
+_QUESTION_RE = re.compile(r"^(?:question|q)\s*\d*\s*(?:[:.)]\s*(.*))?$", re.IGNORECASE)
+_OPTION_RE = re.compile(r"^\(?([A-Da-d])\s*[.):\]]\s*(.*)$")
+_ANSWER_RE = re.compile(r"^(?:the\s+)?(?:correct(?:\s+answer)?|answer)\s*(?:is)?\s*[:.)-]?\s*(.+)$", re.IGNORECASE)
+_LEADING_LABEL_RE = re.compile(r"^\(?([A-Da-d])(?:[.):\]]|\s|$)")
+_EXPLANATION_RE = re.compile(r"^(?:explanation|solution)\s*[:.)]\s*(.*)$", re.IGNORECASE)
+
+
+class QuestionParseError(ValueError):
+    """Raised when generated text does not contain a valid question."""
+
+    def __init__(self, errors: List[str], raw: str):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+        self.raw = raw
+
+
+def _strip_label(choice: str) -> str:
+    match = _OPTION_RE.match(choice.strip())
+    return match.group(2).strip() if match else choice.strip()
+
+
+def _answer_index(value: Any, choices: List[str]) -> Optional[int]:
+    """Normalize a letter, 0-based index or option text answer to an index."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if not isinstance(value, str):
+        return None
+
+    value = value.strip()
+    lowered = value.lower().rstrip(".")
+    for i, choice in enumerate(choices):
+        if choice.lower() == lowered:
+            return i
+    if value.isdigit():
+        return int(value)
+    match = _LEADING_LABEL_RE.match(value)
+    if match:
+        return LABELS.index(match.group(1).upper())
+    return None
+
+
+def _validate(fields: Dict[str, Any], raw: str) -> Dict[str, Any]:
+    errors = list(fields.get("errors", []))
+    prompt = (fields.get("prompt") or "").strip()
+    choices = [str(choice).strip() for choice in fields.get("choices") or []]
+    answer = fields.get("answer")
+
+    if not prompt:
+        errors.append("missing question text")
+    if len(choices) != NUM_CHOICES:
+        errors.append(f"expected {NUM_CHOICES} choices, found {len(choices)}")
+    elif not all(choices):
+        errors.append("empty choice text")
+    elif len(set(c.lower() for c in choices)) != NUM_CHOICES:
+        errors.append("duplicate choices")
+    if answer is None:
+        errors.append("missing correct answer")
+    elif not 0 <= answer < NUM_CHOICES:
+        errors.append(f"correct answer index {answer} out of range")
+
+    if errors:
+        raise QuestionParseError(errors, raw)
+    return {
+        "prompt": prompt,
+        "choices": choices,
+        "answer": answer,
+        "explanation": (fields.get("explanation") or "").strip(),
+    }
+
+
+def _from_json(data: Any) -> Dict[str, Any]:
+    if isinstance(data, list) and len(data) == 1:
+        data = data[0]
+    if not isinstance(data, dict):
+        return {}
+
+    data = {str(key).lower(): value for key, value in data.items()}
+    choices = data.get("choices", data.get("options", []))
+    if isinstance(choices, dict):
+        choices = [value for _, value in sorted(choices.items(), key=lambda item: str(item[0]).upper())]
+    if not isinstance(choices, list):
+        choices = []
+    # Models sometimes keep the "A." label inside the option text
+    choices = [_strip_label(str(choice)) for choice in choices]
+
+    answer = data.get("correct_index", data.get("answer", data.get("correct", data.get("correct_answer"))))
+    return {
+        "prompt": data.get("question", data.get("prompt")),
+        "choices": choices,
+        "answer": _answer_index(answer, choices),
+        "explanation": data.get("explanation", ""),
+    }
+
+
+def _from_text(text: str) -> Dict[str, Any]:
+    prompt_lines: List[str] = []
+    options: Dict[str, List[str]] = {}
+    answer_text = None
+    explanation_lines: List[str] = []
+    errors: List[str] = []
+    section = "preamble"
+    current_label = None
+
+    for raw_line in text.splitlines():
+        line = _MARKUP_RE.sub("", raw_line).strip()
+        if not line:
+            continue
+
+        if section == "explanation":
+            explanation_lines.append(line)
+            continue
+
+        match = _QUESTION_RE.match(line)
+        if match and section in ("preamble", "question"):
+            section = "question"
+            prompt_lines.append(match.group(1) or "")
+            continue
+
+        match = _ANSWER_RE.match(line)
+        if match:
+            answer_text = match.group(1)
+            section = "answer"
+            continue
+
+        match = _EXPLANATION_RE.match(line)
+        if match:
+            section = "explanation"
+            explanation_lines.append(match.group(1))
+            continue
+
+        match = _OPTION_RE.match(line)
+        if match and section != "answer":
+            current_label = match.group(1).upper()
+            if current_label in options:
+                errors.append(f"duplicate choice label {current_label}")
+            options[current_label] = [match.group(2)]
+            section = "options"
+            continue
+
+        if section == "options" and current_label:
+            options[current_label].append(line)
+        elif section in ("preamble", "question"):
+            # Models sometimes omit the "Question:" prefix
+            section = "question"
+            prompt_lines.append(line)
+
+    choices = [" ".join(options[label]).strip() for label in LABELS if label in options]
+    return {
+        "prompt": " ".join(part for part in prompt_lines if part),
+        "choices": choices,
+        "answer": _answer_index(answer_text, choices) if answer_text else None,
+        "explanation": "\n".join(part for part in explanation_lines if part),
+        "errors": errors,
+    }
+
+
+def parse_question(text: str) -> Dict[str, Any]:
+    """
+    Parse one generated question.
+
+    Args:
+        text: Raw model output (JSON or the labeled text format)
+
+    Returns:
+        Dictionary with prompt, choices (4), answer (0-based int) and explanation
+
+    Raises:
+        QuestionParseError: With the list of problems found
+    """
+    json_error = None
+    try:
+        fields = _from_json(extract_json(text))
+        if fields:
+            return _validate(fields, text)
+    except StructuredOutputError:
+        pass
+    except QuestionParseError as e:
+        json_error = e
+
+    try:
+        return _validate(_from_text(text), text)
+    except QuestionParseError as text_error:
+        # Report the JSON problems if the model clearly attempted JSON
+        raise json_error or text_error
+
+
+def parse_questions(texts: List[str]) -> Tuple[List[Optional[Dict[str, Any]]], Dict[int, List[str]]]:
+    """
+    Parse a batch of generated questions.
+
+    Returns:
+        Tuple of (parsed questions with None for failures, {index: errors} for failures)
+    """
+    parsed: List[Optional[Dict[str, Any]]] = []
+    failures: Dict[int, List[str]] = {}
+    for i, text in enumerate(texts):
+        try:
+            parsed.append(parse_question(text))
+        except QuestionParseError as e:
+            parsed.append(None)
+            failures[i] = e.errors
+    return parsed, failures
@@ -0,0 +1,159 @@
+"""
+Structured-output helpers for LLM responses that are supposed to be JSON.
+
+Models often wrap JSON in code fences or surround it with prose. These helpers
+extract the JSON payload, validate it against a Pydantic schema, and on failure
+issue a single cheap repair prompt that only resends the broken output.
+"""
+
+import functools
+import json
+import re
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from pydantic import ValidationError, parse_obj_as, schema_json_of
+
+from app.core.metrics import registry
+from app.services.gemini import generate_response
+from app.utils.prompts import StructuredPrompts
+
+_FENCE_RE = re.compile(r"```(?:json|JSON)?\s*\n?(.*?)```", re.DOTALL)
+_decoder = json.JSONDecoder()
+
+# Per call site counters: calls, parse_failures, repaired, failed
+PARSE_STATS: Dict[str, Dict[str, int]] = defaultdict(
+    lambda: {"calls": 0, "parse_failures": 0, "repaired": 0, "failed": 0}
+)
+
+
+@registry.collector("llm_structured_output_total", "counter", "Structured LLM responses by call site and parse outcome.")
+def _parse_samples():
+    for call_site, stats in list(PARSE_STATS.items()):
+        for outcome, count in stats.items():
+            yield "llm_structured_output_total", {"call_site": call_site, "outcome": outcome}, count
+
+
+class StructuredOutputError(ValueError):
+    """Raised when a response cannot be parsed into the expected schema."""
+
+    def __init__(self, message: str, raw: str):
+        super().__init__(message)
+        self.raw = raw
+
+
+def extract_json(text: str) -> Any:
+    """
+    Extract the first JSON value from model output.
+
+    Handles bare JSON, fenced ```json blocks, and JSON embedded in prose.
+
+    Raises:
+        StructuredOutputError: If no JSON value can be decoded
+    """
+    stripped = text.strip()
+    try:
+        return json.loads(stripped)
+    except ValueError:
+        pass
+
+    for block in _FENCE_RE.findall(text):
+        try:
+            return json.loads(block.strip())
+        except ValueError:
+            continue
+
+    for match in re.finditer(r"[\[{]", text):
+        try:
+            value, _ = _decoder.raw_decode(text, match.start())
+            return value
+        except ValueError:
+            continue
+
+    raise StructuredOutputError("No JSON value found in response", text)
+
+
+def parse_structured(text: str, schema: Any) -> Any:
+    """
+    Extract JSON from model output and validate it against a schema.
+
+    Args:
+        text: Raw model output
+        schema: Pydantic model or typing construct (e.g. List[Model])
+
+    Returns:
+        The validated value
+
+    Raises:
+        StructuredOutputError: If extraction or validation fails
+    """
+    data = extract_json(text)
+    try:
+        return parse_obj_as(schema, data)
+    except ValidationError as e:
+        raise StructuredOutputError(str(e), text)
+
+
+async def generate_structured(
+    prompt: str,
+    schema: Any,
+    call_site: str,
+    generate: Callable[[str], Awaitable[str]] = generate_response
+) -> Any:
+    """
+    Generate a response and parse it into the given schema.
+
+    If the first response does not parse, the model is asked once to repair
+    its own output; the original prompt is not resent.
+
+    Args:
+        prompt: Prompt requesting JSON output
+        schema: Pydantic model or typing construct to validate against
+        call_site: Name used for parse-failure statistics
+        generate: Text generation function
+
+    Returns:
+        The validated value
+
+    Raises:
+        StructuredOutputError: If the repaired response still does not parse
+    """
+    if generate is generate_response:
+        generate = functools.partial(generate_response, call_site=call_site)
+    stats = PARSE_STATS[call_site]
+    stats["calls"] += 1
+
+    response = await generate(prompt)
+    try:
+        return parse_structured(response, schema)
+    except StructuredOutputError as e:
+        stats["parse_failures"] += 1
+        error = str(e)
+
+    repair_prompt = StructuredPrompts.REPAIR.format(
+        schema=schema_json_of(schema),
+        error=error[:1000],
+        output=response[:8000],
+    )
+    try:
+        result = parse_structured(await generate(repair_prompt), schema)
+    except StructuredOutputError:
+        stats["failed"] += 1
+        # Keep the original text so callers can salvage free-form content
+        raise StructuredOutputError(error, response)
+
+    stats["repaired"] += 1
+    return result
+
+
+def parse_failure_rate(call_site: Optional[str] = None) -> float:
+    """
+    Fraction of first responses that failed to parse.
+
+    Args:
+        call_site: Call site to report on; all call sites if omitted
+    """
+    sites = [PARSE_STATS[call_site]] if call_site else list(PARSE_STATS.values())
+    calls = sum(site["calls"] for site in sites)
+    failures = sum(site["parse_failures"] for site in sites)
+    return failures / calls if calls else 0.0
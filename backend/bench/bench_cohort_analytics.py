@@ -0,0 +1,69 @@
+"""
+Benchmark vectorized cohort analytics against the per-user summary loop.
+
+Usage:
+    python -m bench.bench_cohort_analytics [--users N] [--attempts N]
+"""
+
+import argparse
+import random
+import time
+
+from app.services.analytics import QuizColumns, cohort_topic_stats, summarize_quiz_results
+
+TOPICS = ["algebra", "geometry", "functions", "statistics", "reading", "grammar", "vocabulary", "data analysis"]
+
+
+def synthetic_results(users: int, attempts: int):
+    rng = random.Random(0)
+    records = []
+    for _ in range(users * attempts):
+        total = rng.choice([5, 10])
+        records.append({
+            "user_id": rng.randrange(users),
+            "topic": rng.choice(TOPICS),
+            "score": rng.randrange(200, 801, 10),
+            "correct_count": rng.randint(0, total),
+            "total_questions": total,
+        })
+    return records
+
+
+def per_user(records):
+    by_user = {}
+    for record in records:
+        by_user.setdefault(record["user_id"], []).append(record)
+    return {user_id: summarize_quiz_results(results) for user_id, results in by_user.items()}
+
+
+def run(users: int, attempts: int):
+    records = synthetic_results(users, attempts)
+
+    start = time.perf_counter()
+    per_user(records)
+    loop_seconds = time.perf_counter() - start
+
+    # Rows as the database returns them to load_quiz_columns
+    rows = [
+        (r["user_id"], r["topic"], r["score"], r["correct_count"], r["total_questions"]) for r in records
+    ]
+    start = time.perf_counter()
+    columns = QuizColumns.from_rows(rows)
+    build_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    cohort_topic_stats(columns)
+    vector_seconds = time.perf_counter() - start
+
+    print(f"{users:,} users, {len(records):,} quiz results")
+    print(f"{'per-user loop':<22} {loop_seconds * 1e3:>9.1f} ms {users / loop_seconds:>12,.0f} users/s")
+    print(f"{'columns + vectorized':<22} {(build_seconds + vector_seconds) * 1e3:>9.1f} ms "
+          f"{users / (build_seconds + vector_seconds):>12,.0f} users/s")
+    print(f"{'vectorized only':<22} {vector_seconds * 1e3:>9.1f} ms {users / vector_seconds:>12,.0f} users/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--attempts", type=int, default=20)
+    args = parser.parse_args()
+    run(args.users, args.attempts)
@@ -0,0 +1,45 @@
+"""
+Benchmark the quiz question parser over the recorded model-output corpus.
+
+Usage:
+    python -m bench.bench_question_parser [--rounds N]
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+from app.utils.question_parser import QuestionParseError, parse_question
+
+CORPUS_PATH = Path(__file__).resolve().parent.parent / "tests" / "fixtures" / "quiz_outputs.jsonl"
+
+
+def load_corpus():
+    return [json.loads(line) for line in CORPUS_PATH.read_text().splitlines() if line.strip()]
+
+
+def run(rounds: int):
+    corpus = load_corpus()
+    by_name = {}
+    for case in corpus:
+        start = time.perf_counter()
+        for _ in range(rounds):
+            try:
+                parse_question(case["output"])
+            except QuestionParseError:
+                pass
+        by_name[case["name"]] = (time.perf_counter() - start) / rounds
+
+    total = sum(by_name.values())
+    print(f"{'case':<28} {'us/parse':>10}")
+    for name, seconds in sorted(by_name.items(), key=lambda item: -item[1]):
+        print(f"{name:<28} {seconds * 1e6:>10.1f}")
+    print(f"\n{len(corpus)} cases, mean {total / len(corpus) * 1e6:.1f} us/parse, "
+          f"{len(corpus) / total:,.0f} parses/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rounds", type=int, default=2000)
+    run(parser.parse_args().rounds)
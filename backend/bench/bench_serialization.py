@@ -0,0 +1,130 @@
+"""
+Benchmark response serialization on the largest API payloads.
+
+Compares FastAPI's default path (jsonable_encoder + json.dumps), the
+FastJSONResponse default class, returning FastJSONResponse directly, and
+serving a pre-serialized body from the cache. Reports time and peak memory
+allocated per response.
+
+Usage:
+    python -m bench.bench_serialization [--questions N] [--page-size N] [--turns N]
+"""
+
+import argparse
+import datetime
+import time
+import tracemalloc
+
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import JSONResponse
+
+from app.api.routers.quiz import QuizQuestion, QuizResponse
+from app.core.cache import ResponseCache
+from app.core.responses import FastJSONResponse, dumps, orjson
+
+
+def quiz_payload(questions: int) -> QuizResponse:
+    return QuizResponse(
+        id=1,
+        topic="reading",
+        difficulty="hard",
+        questions=[
+            QuizQuestion(
+                id=i,
+                prompt=f"Passage {i}: " + "The author's argument develops through a series of examples. " * 6,
+                choices=[f"Choice {c}: " + "a plausible but subtly different reading " * 2 for c in "ABCD"],
+            )
+            for i in range(questions)
+        ],
+    )
+
+
+def scholarship_page(size: int) -> dict:
+    return {
+        "scholarships": [
+            {
+                "id": i,
+                "name": f"Scholarship {i} for Excellence in Science and Engineering",
+                "amount": 1000 * (i % 40 + 1),
+                "deadline": datetime.date(2025, 1 + i % 12, 1 + i % 28),
+                "countries": ["USA", "UAE", "India"][: 1 + i % 3],
+            }
+            for i in range(size)
+        ],
+        "total": size * 5,
+        "limit": size,
+        "offset": 0,
+    }
+
+
+def chat_history(turns: int) -> dict:
+    start = datetime.datetime(2025, 3, 1, 12, 0, 0)
+    return {
+        "history": [
+            {
+                "id": i,
+                "message": "How do I solve a system of two linear equations with substitution?",
+                "response": "Solve one equation for a variable, substitute it into the other, then back-substitute. " * 4,
+                "created_at": start + datetime.timedelta(minutes=i),
+            }
+            for i in range(turns)
+        ],
+        "next_cursor": "MjAyNS0wMy0wMVQxMjowMDowMHwx",
+    }
+
+
+def measure(fn, min_seconds: float = 0.3):
+    """Return (microseconds per call, peak KiB allocated by one call)."""
+    fn()
+    calls, start = 0, time.perf_counter()
+    while time.perf_counter() - start < min_seconds:
+        fn()
+        calls += 1
+    per_call = (time.perf_counter() - start) / calls * 1e6
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return per_call, peak / 1024
+
+
+def plain(payload):
+    return payload.dict() if hasattr(payload, "dict") else payload
+
+
+def paths(payload):
+    cache = ResponseCache(1)
+    cache.set("payload", 1, dumps(plain(payload)), "application/json")
+    return [
+        ("default (encoder + json)", lambda: JSONResponse(jsonable_encoder(payload)).body),
+        ("FastJSONResponse class", lambda: FastJSONResponse(jsonable_encoder(payload)).body),
+        ("FastJSONResponse direct", lambda: FastJSONResponse(plain(payload)).body),
+        ("pre-serialized", lambda: cache.get("payload", 1)[0]),
+    ]
+
+
+def run(questions: int, page_size: int, turns: int):
+    payloads = [
+        (f"quiz body ({questions} questions)", quiz_payload(questions)),
+        (f"scholarship page ({page_size})", scholarship_page(page_size)),
+        (f"chat history ({turns} turns)", chat_history(turns)),
+    ]
+    print(f"JSON backend: {'orjson ' + orjson.__version__ if orjson else 'stdlib json'}")
+    for name, payload in payloads:
+        size = len(dumps(plain(payload)))
+        print(f"\n{name}, {size / 1024:.1f} KiB")
+        baseline = None
+        for label, fn in paths(payload):
+            micros, peak_kib = measure(fn)
+            baseline = baseline or micros
+            print(f"  {label:<26} {micros:>9.1f} us {baseline / micros:>6.1f}x {peak_kib:>9.1f} KiB peak")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--questions", type=int, default=50)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--turns", type=int, default=100)
+    args = parser.parse_args()
+    run(args.questions, args.page_size, args.turns)
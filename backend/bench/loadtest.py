@@ -0,0 +1,356 @@
+"""
+End-to-end load test of the API with offline fakes.
+
+Boots the app in-process against SQLite (or --database-url, e.g. a local
+Postgres) with the fake LLM and the in-memory vector store, seeds users and
+quizzes, then runs virtual users through a weighted mix of sessions: login
+storms, quiz submit bursts, chat sessions and catalog browsing. Throughput
+and p50/p95/p99 latency are reported per route. With --save the results are
+written to bench/results/<commit>-<mix>.json, and --compare prints the change
+against an earlier results file.
+
+Usage:
+    python -m bench.loadtest [--mix mix] [--users 50] [--duration 30]
+        [--llm-latency 0.5] [--llm-tokens-per-second 60]
+        [--database-url URL] [--url URL] [--save] [--compare FILE]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+MIXES = {
+    "mix": {"chat": 3, "quiz": 3, "catalog": 3, "login": 1},
+    "login_storm": {"login": 1},
+    "quiz_burst": {"quiz": 1},
+    "chat": {"chat": 1},
+    "catalog": {"catalog": 1},
+}
+
+TOPICS = ["algebra", "geometry", "reading", "grammar", "statistics"]
+CHAT_MESSAGES = [
+    "How do I solve 2x + 3 = 11?",
+    "What is the area of a circle with radius 4?",
+    "Can you explain subject-verb agreement?",
+    "How should I approach the reading passages?",
+    "What does the slope of a line mean?",
+]
+COLLEGE_QUERIES = ["", "university", "college", "institute", "state"]
+PASSWORD = "loadtest-password"
+
+
+def configure_environment(args):
+    """Point the app at the test database and fakes; must run before app imports."""
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ["LLM_BACKEND"] = "fake"
+    os.environ["VECTOR_BACKEND"] = "memory"
+    os.environ["JOB_STORE"] = "memory"
+    os.environ["FAKE_LLM_LATENCY"] = str(args.llm_latency)
+    os.environ["FAKE_LLM_TOKENS_PER_SECOND"] = str(args.llm_tokens_per_second)
+    # Per-user limits would turn most of a load test into 429s
+    for name in ("CHAT", "ESSAY", "PROGRESS"):
+        os.environ[f"RATE_LIMIT_{name}"] = "1000000/minute"
+
+
+async def seed(users: int, quizzes_per_topic: int = 4, questions_per_quiz: int = 10):
+    """Create the schema, users and quizzes unless a previous run already did."""
+    from sqlalchemy import func
+    from sqlalchemy.future import select
+
+    from app.core.security import get_password_hash
+    from app.db import models
+    from app.db.base import Base
+    from app.db.session import AsyncSessionLocal, engine
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with AsyncSessionLocal() as session:
+        existing = (await session.execute(select(func.count(models.User.id)))).scalar()
+        # bcrypt is deliberately slow; one hash serves every seeded user
+        hashed = get_password_hash(PASSWORD)
+        session.add_all(
+            models.User(email=user_email(i), hashed_password=hashed) for i in range(existing, users)
+        )
+        if not (await session.execute(select(func.count(models.Quiz.id)))).scalar():
+            rng = random.Random(0)
+            for topic in TOPICS:
+                for level in range(quizzes_per_topic):
+                    quiz = models.Quiz(topic=topic, difficulty=["easy", "medium", "hard", "medium"][level % 4])
+                    session.add(quiz)
+                    await session.flush()
+                    session.add_all(
+                        models.Question(
+                            quiz_id=quiz.id,
+                            prompt=f"{topic.title()} question {n + 1}: which choice is correct?",
+                            choices=json.dumps([f"Choice {c}" for c in "ABCD"]),
+                            answer=str(rng.randrange(4)),
+                        )
+                        for n in range(questions_per_quiz)
+                    )
+        await session.commit()
+
+
+def user_email(index: int) -> str:
+    return f"loadtest{index}@example.com"
+
+
+class Recorder:
+    """Latencies and status codes per route."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+
+    async def request(self, client, route: str, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except Exception:
+            self.latencies[route].append(time.perf_counter() - start)
+            self.errors[route] += 1
+            self.statuses[route][0] += 1
+            return None
+        self.latencies[route].append(time.perf_counter() - start)
+        self.statuses[route][response.status_code] += 1
+        if response.status_code >= 400:
+            self.errors[route] += 1
+        return response
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * q // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def route_stats(recorder: Recorder, seconds: float) -> Dict[str, Dict]:
+    stats = {}
+    for route in sorted(recorder.latencies):
+        values = sorted(recorder.latencies[route])
+        stats[route] = {
+            "requests": len(values),
+            "errors": recorder.errors[route],
+            "rps": len(values) / seconds,
+            "p50_ms": percentile(values, 50) * 1e3,
+            "p95_ms": percentile(values, 95) * 1e3,
+            "p99_ms": percentile(values, 99) * 1e3,
+            "statuses": {str(code): count for code, count in sorted(recorder.statuses[route].items())},
+        }
+    return stats
+
+
+async def login(client, recorder: Recorder, email: str) -> Optional[str]:
+    response = await recorder.request(
+        client, "POST /auth/login", "POST", "/auth/login", data={"username": email, "password": PASSWORD}
+    )
+    if response is None or response.status_code != 200:
+        return None
+    return response.json()["access_token"]
+
+
+class VirtualUser:
+    def __init__(self, client, recorder: Recorder, email: str, rng: random.Random):
+        self.client = client
+        self.recorder = recorder
+        self.email = email
+        self.rng = rng
+        self.headers: Dict[str, str] = {}
+        self.quiz_ids: List[int] = []
+
+    async def request(self, route: str, method: str, url: str, **kwargs):
+        return await self.recorder.request(self.client, route, method, url, headers=self.headers, **kwargs)
+
+    async def ensure_login(self) -> bool:
+        if not self.headers:
+            token = await login(self.client, self.recorder, self.email)
+            if token is None:
+                return False
+            self.headers = {"Authorization": f"Bearer {token}"}
+        return True
+
+    async def run_login(self):
+        self.headers = {}
+        await self.ensure_login()
+
+    async def run_quiz(self):
+        if not await self.ensure_login():
+            return
+        if not self.quiz_ids:
+            response = await self.request("GET /quizzes", "GET", "/quizzes")
+            if response is None or response.status_code != 200:
+                return
+            self.quiz_ids = [quiz["id"] for quiz in response.json()]
+        # Burst: several quizzes back to back, as in a timed practice section
+        for quiz_id in self.rng.sample(self.quiz_ids, min(3, len(self.quiz_ids))):
+            response = await self.request("GET /quiz/{quiz_id}", "GET", f"/quiz/{quiz_id}")
+            if response is None or response.status_code != 200:
+                continue
+            answers = {q["id"]: self.rng.randrange(len(q["choices"])) for q in response.json()["questions"]}
+            await self.request(
+                "POST /quiz/submit", "POST", "/quiz/submit", json={"quiz_id": quiz_id, "answers": answers}
+            )
+
+    async def run_chat(self):
+        if not await self.ensure_login():
+            return
+        for _ in range(self.rng.randint(2, 4)):
+            await self.request("POST /chat", "POST", "/chat", json={"message": self.rng.choice(CHAT_MESSAGES)})
+        await self.request("GET /chat/history", "GET", "/chat/history", params={"limit": 20})
+
+    async def run_catalog(self):
+        await self.request(
+            "GET /colleges", "GET", "/colleges", params={"q": self.rng.choice(COLLEGE_QUERIES)}
+        )
+        await self.request("GET /colleges/{college_id}", "GET", f"/colleges/{self.rng.randint(1, 4)}")
+        await self.request(
+            "GET /scholarships", "GET", "/scholarships",
+            params={"limit": 20, "offset": self.rng.choice([0, 20, 40])},
+        )
+
+
+async def virtual_user(client, recorder: Recorder, index: int, weights: Dict[str, int], deadline: float, think: float):
+    rng = random.Random(index)
+    user = VirtualUser(client, recorder, user_email(index), rng)
+    sessions, counts = list(weights), list(weights.values())
+    while time.perf_counter() < deadline:
+        await getattr(user, f"run_{rng.choices(sessions, counts)[0]}")()
+        if think:
+            await asyncio.sleep(rng.expovariate(1 / think))
+
+
+async def run(args) -> Dict:
+    import httpx
+
+    await seed(args.users)
+
+    if args.url:
+        transport, base_url, app = None, args.url, None
+    else:
+        from app.main import app
+
+        await app.router.startup()
+        transport, base_url = httpx.ASGITransport(app=app), "http://loadtest"
+
+    recorder = Recorder()
+    weights = MIXES[args.mix]
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=60) as client:
+        start = time.perf_counter()
+        deadline = start + args.duration
+        await asyncio.gather(*(
+            virtual_user(client, recorder, i, weights, deadline, args.think) for i in range(args.users)
+        ))
+        elapsed = time.perf_counter() - start
+
+    if app is not None:
+        await app.router.shutdown()
+
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "config": {
+            "mix": args.mix,
+            "users": args.users,
+            "duration": args.duration,
+            "think": args.think,
+            "llm_latency": args.llm_latency,
+            "llm_tokens_per_second": args.llm_tokens_per_second,
+            "database": args.database_url.split(":", 1)[0],
+            "target": args.url or "in-process",
+        },
+        "elapsed": elapsed,
+        "routes": route_stats(recorder, elapsed),
+    }
+
+
+def git_commit() -> str:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{commit}-dirty" if dirty.strip() else commit
+
+
+def print_report(results: Dict, baseline: Optional[Dict] = None):
+    routes = results["routes"]
+    total = sum(stats["requests"] for stats in routes.values())
+    print(f"mix={results['config']['mix']}, {results['config']['users']} users, "
+          f"{results['elapsed']:.1f}s, {total:,} requests ({total / results['elapsed']:,.1f} req/s) "
+          f"at {results['commit']}")
+    print(f"{'route':<28} {'reqs':>7} {'err':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for route, stats in routes.items():
+        print(f"{route:<28} {stats['requests']:>7} {stats['errors']:>5} {stats['rps']:>8.1f} "
+              f"{stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f}")
+
+    if baseline is None:
+        return
+    print(f"\nchange vs {baseline['commit']} (negative latency change is better)")
+    print(f"{'route':<28} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for route, stats in routes.items():
+        before = baseline["routes"].get(route)
+        if before is None:
+            continue
+        changes = [_change(before[key], stats[key]) for key in ("rps", "p50_ms", "p95_ms", "p99_ms")]
+        print(f"{route:<28} " + " ".join(f"{change:>8}" for change in changes))
+
+
+def _change(before: float, after: float) -> str:
+    if not before:
+        return "n/a"
+    return f"{(after - before) / before * 100:+.1f}%"
+
+
+def save_results(results: Dict) -> str:
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"{results['commit']}-{results['config']['mix']}.json")
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--mix", choices=sorted(MIXES), default="mix")
+    parser.add_argument("--users", type=int, default=50, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run")
+    parser.add_argument("--think", type=float, default=0.0, help="Mean think time between sessions in seconds")
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--llm-tokens-per-second", type=float, default=60.0)
+    parser.add_argument("--database-url", help="Defaults to a fresh SQLite file")
+    parser.add_argument("--url", help="Drive a running server instead; it must use --database-url")
+    parser.add_argument("--save", action="store_true", help="Store results under bench/results")
+    parser.add_argument("--compare", help="Results file to compare against")
+    args = parser.parse_args()
+
+    if args.database_url is None:
+        path = os.path.join(tempfile.mkdtemp(prefix="sathelp-loadtest-"), "loadtest.db")
+        args.database_url = f"sqlite+aiosqlite:///{path}"
+    configure_environment(args)
+
+    results = asyncio.run(run(args))
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+    if args.save:
+        print(f"\nSaved {save_results(results)}")
+
+
+if __name__ == "__main__":
+    main()
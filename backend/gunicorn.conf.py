@@ -0,0 +1,66 @@
+"""
+Production server: gunicorn managing uvicorn worker processes.
+
+    gunicorn app.main:app -c gunicorn.conf.py
+
+The app is imported once in the master (preload_app) and workers are forked
+from it, so import cost is paid once and shared memory (app.core.shared) is
+visible to every worker. On SIGTERM each worker stops accepting connections,
+finishes in-flight requests, then runs the app's shutdown handlers, which
+drain running jobs and flush the chat log.
+"""
+
+import math
+import os
+import shutil
+import tempfile
+
+# Shared-memory buckets, so per-user limits hold across workers (unless set otherwise)
+os.environ.setdefault("RATE_LIMIT_BACKEND", "shared")
+# Workers exchange metric snapshots here, so /metrics covers all of them
+os.environ.setdefault("METRICS_DIR", os.path.join(tempfile.gettempdir(), "sathelp-metrics"))
+
+
+def _available_cores() -> int:
+    """CPU cores this container may use, honouring cgroup v2 quotas."""
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cores = min(cores, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    return max(1, cores)
+
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+# Async workers: one per core keeps every core busy without oversubscribing
+workers = int(os.getenv("WEB_CONCURRENCY") or _available_cores())
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+
+# Seconds a worker gets to finish requests and run shutdown handlers on SIGTERM
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+keepalive = 5
+
+# Recycle workers periodically to bound memory growth; jitter avoids restarting all at once
+max_requests = int(os.getenv("MAX_REQUESTS", "10000"))
+max_requests_jitter = max_requests // 10
+
+accesslog = None
+errorlog = "-"
+
+
+def on_starting(server):
+    # Snapshots from a previous run would be added to this run's totals
+    shutil.rmtree(os.environ["METRICS_DIR"], ignore_errors=True)
+
+
+def post_fork(server, worker):
+    # Connections must not be shared across processes; the pool is empty after
+    # a clean preload, but make sure each worker opens its own
+    from app.db.session import engine
+
+    engine.sync_engine.dispose(close=False)
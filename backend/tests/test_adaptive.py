@@ -0,0 +1,179 @@
+import asyncio
+import json
+import math
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from app.api.routers import quiz as quiz_router
+from app.core.auth import get_current_user
+from app.core.cache import catalog_version
+from app.db.base import Base
+from app.db.models import Question, QuestionResponse, QuestionStats, Quiz
+from app.db.session import get_session
+from app.services import adaptive, gemini
+from app.services.adaptive import ItemBank, difficulty_label, initial_ability, information, p_correct
+from app.services.fakes import FakeLLM
+from app.services.progress import record_quiz_result
+
+async def make_session_factory():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+
+async def seed_bank(session, topic="algebra"):
+    for difficulty in ("easy", "medium", "hard"):
+        quiz = Quiz(topic=topic, difficulty=difficulty)
+        session.add(quiz)
+        await session.flush()
+        for i in range(3):
+            session.add(Question(
+                quiz_id=quiz.id, prompt=f"{difficulty} {i}", choices=json.dumps(["a", "b"]), answer="0"
+            ))
+    await session.commit()
+
+def test_model_functions():
+    assert p_correct(0.0, 1.0, 0.0) == 0.5
+    assert p_correct(2.0, 1.0, 0.0) > p_correct(1.0, 1.0, 0.0)
+    # Information peaks where ability equals difficulty
+    assert information(1.0, 1.0, 1.0) > information(1.0, 1.0, 0.0)
+    assert initial_ability(None) == 0.0
+    assert initial_ability(0.5) == 0.0
+    assert math.isclose(initial_ability(1.0), math.log(0.95 / 0.05))
+    assert difficulty_label(-1.2) == "easy"
+    assert difficulty_label(0.3) == "medium"
+    assert difficulty_label(2.5) == "hard"
+
+def test_bank_selects_most_informative_unanswered():
+    bank = ItemBank([10, 11, 12, 13], [1.0, 1.0, 2.0, 1.0], [1.0, -1.0, 0.1, 0.0])
+    assert list(bank.ids) == [11, 13, 12, 10]
+    # Higher discrimination wins near theta
+    assert bank.select(0.0, set())[0] == 12
+    assert bank.select(0.0, {12})[0] == 13
+    assert bank.select(0.0, {10, 11, 12, 13}) is None
+    assert ItemBank([], [], []).select(0.0, set()) is None
+
+def test_bank_falls_back_beyond_window():
+    n = adaptive.SELECTION_WINDOW * 4
+    bank = ItemBank(range(n), [1.0] * n, [i / n for i in range(n)])
+    near = {i for i in range(n) if abs(i / n) < 0.5}
+    found = bank.select(0.0, near)
+    assert found is not None and found[0] not in near
+
+def test_answers_update_ability_and_items():
+    async def scenario():
+        adaptive.item_banks.clear()
+        Session = await make_session_factory()
+        async with Session() as session:
+            await seed_bank(session)
+            # Quiz history seeds the starting ability
+            await record_quiz_result(session, 1, "algebra", 780, 9, 10)
+            first = await adaptive.next_question(session, 1, "algebra")
+            start = (await adaptive.get_ability(session, 1, "algebra")).theta
+
+            ability = await adaptive.record_answers(session, 1, "algebra", [(first["id"], True)])
+            await session.commit()
+            after_correct = ability.theta
+
+            second = await adaptive.next_question(session, 1, "algebra")
+            ability = await adaptive.record_answers(session, 1, "algebra", [(second["id"], False)])
+            await session.commit()
+
+            stats = await session.get(QuestionStats, first["id"])
+            responses = (await session.execute(QuestionResponse.__table__.select())).all()
+            return first, second, start, after_correct, ability, stats, responses
+
+    first, second, start, after_correct, ability, stats, responses = asyncio.run(scenario())
+    assert start > 0
+    assert first["prompt"].startswith("hard")
+    assert second["id"] != first["id"]
+    assert after_correct > start
+    assert ability.theta < after_correct
+    assert ability.responses == 2
+    assert ability.information > 0
+    # A correct answer makes the question look easier
+    assert stats.difficulty < 1.0 and stats.responses == 1
+    assert len(responses) == 2
+
+def test_exhausted_bank_generates_at_ability():
+    async def scenario():
+        adaptive.item_banks.clear()
+        Session = await make_session_factory()
+        requested = []
+
+        async def generate(topic, difficulty):
+            requested.append(difficulty)
+            return {"prompt": "generated", "choices": ["a", "b"], "answer": 1}
+
+        async with Session() as session:
+            await record_quiz_result(session, 1, "geometry", 780, 9, 10)
+            version = catalog_version.value
+            question = await adaptive.next_question(session, 1, "geometry", generate=generate)
+            await session.commit()
+            # Asking again before answering serves the same question
+            again = await adaptive.next_question(session, 1, "geometry", generate=generate)
+            await session.commit()
+            theta = (await adaptive.get_ability(session, 1, "geometry")).theta
+            stats = await session.get(QuestionStats, question["id"])
+            without_generator = await adaptive.next_question(session, 2, "statistics")
+            return question, again, theta, stats, requested, version, without_generator
+
+    question, again, theta, stats, requested, version, without_generator = asyncio.run(scenario())
+    assert requested == ["hard"]
+    assert again["id"] == question["id"]
+    assert question["prompt"] == "generated"
+    assert question["choices"] == ["a", "b"]
+    assert stats.difficulty == theta
+    # Bank questions are not part of the catalog
+    assert catalog_version.value == version
+    assert without_generator is None
+
+def test_served_question_is_kept_until_answered():
+    async def scenario():
+        adaptive.item_banks.clear()
+        Session = await make_session_factory()
+        async with Session() as session:
+            await seed_bank(session)
+            first = await adaptive.next_question(session, 1, "algebra")
+            repeated = await adaptive.next_question(session, 1, "algebra")
+            ability = await adaptive.record_answers(session, 1, "algebra", [(first["id"], True)])
+            cleared = ability.served_question_id
+            second = await adaptive.next_question(session, 1, "algebra")
+            await session.commit()
+            return first, repeated, cleared, second, ability.served_question_id
+
+    first, repeated, cleared, second, served = asyncio.run(scenario())
+    assert repeated["id"] == first["id"]
+    assert cleared is None
+    assert second["id"] != first["id"]
+    assert served == second["id"]
+
+def test_unparseable_generation_is_not_added_to_the_bank(monkeypatch):
+    llm = FakeLLM(responder=lambda prompt: "Sorry, I can't help with that.")
+    monkeypatch.setattr(gemini, "_backend", llm)
+    adaptive.item_banks.clear()
+    Session = asyncio.run(make_session_factory())
+
+    async def session_override():
+        async with Session() as session:
+            yield session
+
+    class User:
+        id = 1
+
+    app = FastAPI()
+    app.include_router(quiz_router.router)
+    app.dependency_overrides[get_session] = session_override
+    app.dependency_overrides[get_current_user] = lambda: User()
+    response = TestClient(app).get("/quiz/adaptive/next", params={"topic": "geometry"})
+
+    async def bank_size():
+        async with Session() as session:
+            questions = (await session.execute(Question.__table__.select())).all()
+            stats = (await session.execute(QuestionStats.__table__.select())).all()
+            return len(questions), len(stats)
+
+    assert response.status_code == 503
+    assert len(llm.prompts) > 0
+    assert asyncio.run(bank_size()) == (0, 0)
@@ -0,0 +1,68 @@
+import random
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api.routers import analytics as analytics_router
+from app.core.auth import get_current_user
+from app.db.session import get_session
+from app.services.analytics import QuizColumns, cohort_topic_stats, summarize_quiz_results
+
+TOPICS = ["algebra", "geometry", "reading", "grammar", "data analysis"]
+
+def synthetic_results(n_users, rng):
+    records = []
+    for _ in range(n_users * 6):
+        total = rng.choice([0, 5, 10])
+        records.append({
+            "user_id": rng.randrange(1, n_users + 1),
+            "topic": rng.choice(TOPICS),
+            "score": rng.randrange(200, 801, 10),
+            "correct_count": rng.randint(0, total),
+            "total_questions": total,
+        })
+    return records
+
+@pytest.mark.parametrize("seed", range(5))
+def test_cohort_matches_per_user_summary(seed):
+    rng = random.Random(seed)
+    records = synthetic_results(40, rng)
+    cohort = cohort_topic_stats(QuizColumns.from_records(records))
+
+    by_user = {}
+    for record in records:
+        by_user.setdefault(record["user_id"], []).append(record)
+
+    assert set(cohort) == set(by_user)
+    for user_id, results in by_user.items():
+        expected = summarize_quiz_results(results)
+        assert cohort[user_id]["average_score"] == pytest.approx(expected["average_score"])
+        assert cohort[user_id]["strengths"] == expected["strengths"]
+        assert cohort[user_id]["weaknesses"] == expected["weaknesses"]
+
+def test_topic_accuracy():
+    records = [
+        {"user_id": 1, "topic": "algebra", "score": 600, "correct_count": 3, "total_questions": 4},
+        {"user_id": 1, "topic": "algebra", "score": 700, "correct_count": 4, "total_questions": 4},
+        {"user_id": 1, "topic": "geometry", "score": 500, "correct_count": 0, "total_questions": 0},
+    ]
+    stats = cohort_topic_stats(QuizColumns.from_records(records))[1]
+    assert stats["average_score"] == 600
+    assert stats["topic_accuracy"] == {"algebra": 0.875}
+    assert stats["strengths"] == ["algebra"]
+
+def test_empty_cohort():
+    assert cohort_topic_stats(QuizColumns.from_records([])) == {}
+
+@pytest.mark.parametrize("role", ["student", "teacher"])
+def test_cohort_endpoint_is_admin_only(role):
+    class User:
+        id = 1
+
+    User.role = role
+    app = FastAPI()
+    app.include_router(analytics_router.router)
+    app.dependency_overrides[get_current_user] = lambda: User()
+    app.dependency_overrides[get_session] = lambda: None
+
+    response = TestClient(app).get("/analytics/cohort", params={"user_id": [2, 3]})
+    assert response.status_code == 403
@@ -0,0 +1,145 @@
+import asyncio
+import io
+import json
+import pytest
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import sessionmaker
+from app.core import cache
+from app.core.cache import catalog_version
+from app.db import bulk
+from app.db.base import Base
+from app.db.models import Question, Quiz
+
+async def make_session_factory():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+
+def question(i, quiz=None, topic="algebra", **overrides):
+    row = {"topic": topic, "difficulty": "medium", "prompt": f"Question {i}", "choices": ["a", "b", "c"], "answer": i % 3}
+    if quiz:
+        row["quiz"] = quiz
+    row.update(overrides)
+    return row
+
+def jsonl(rows):
+    return "".join((row if isinstance(row, str) else json.dumps(row)) + "\n" for row in rows)
+
+async def counts(session):
+    quizzes = (await session.execute(select(func.count()).select_from(Quiz))).scalar()
+    questions = (await session.execute(select(func.count()).select_from(Question))).scalar()
+    return quizzes, questions
+
+def test_import_validates_and_groups_rows():
+    rows = [
+        question(1, quiz="q1"),
+        question(2, quiz="q1"),
+        question(3, quiz="q2", topic="geometry"),
+        question(4, answer=5),
+        "{not json",
+        question(5, difficulty="impossible"),
+        question(6),
+    ]
+
+    async def scenario():
+        Session = await make_session_factory()
+        rejects = io.StringIO()
+        version = catalog_version.value
+        async with Session() as session:
+            job = await bulk.import_questions(session, io.StringIO(jsonl(rows)), job_id="bank", batch_size=2, rejects=rejects)
+            return job, await counts(session), rejects.getvalue(), catalog_version.value > version
+
+    job, (quizzes, questions), rejects, invalidated = asyncio.run(scenario())
+    assert (job.rows_done, job.rows_imported, job.rows_rejected, job.status) == (7, 4, 3, "done")
+    # q1, q2, and algebra/medium for the keyless row
+    assert quizzes == 3
+    assert questions == 4
+    assert [json.loads(line)["row"] for line in rejects.splitlines()] == [4, 5, 6]
+    assert invalidated
+
+def test_interrupted_import_resumes_without_duplicates(monkeypatch):
+    rows = [question(i, quiz=f"q{i // 4}") for i in range(10)]
+    insert_questions = bulk._insert_questions
+    calls = []
+
+    async def failing_insert(session, records):
+        calls.append(len(records))
+        if len(calls) == 2:
+            raise RuntimeError("connection lost")
+        await insert_questions(session, records)
+
+    async def scenario():
+        Session = await make_session_factory()
+        monkeypatch.setattr(bulk, "_insert_questions", failing_insert)
+        async with Session() as session:
+            with pytest.raises(RuntimeError):
+                await bulk.import_questions(session, io.StringIO(jsonl(rows)), job_id="bank", batch_size=3)
+            await session.rollback()
+        async with Session() as session:
+            interrupted_at = await counts(session)
+            job = await bulk.import_questions(session, io.StringIO(jsonl(rows)), job_id="bank", batch_size=3)
+            return interrupted_at, job, await counts(session)
+
+    interrupted_at, job, final = asyncio.run(scenario())
+    assert interrupted_at[1] == 3
+    assert job.rows_done == 10 and job.rows_imported == 10
+    # Quiz keys created before the interruption are reused
+    assert final == (3, 10)
+
+def test_csv_round_trip_through_export():
+    rows = [question(i, quiz="q1" if i < 3 else "q2", topic="algebra" if i < 3 else "geometry") for i in range(5)]
+
+    async def scenario():
+        Session = await make_session_factory()
+        async with Session() as session:
+            await bulk.import_questions(session, io.StringIO(jsonl(rows)), job_id="source")
+            exported = io.StringIO()
+            count = await bulk.export_questions(session, exported, "csv", batch_size=2)
+            geometry = io.StringIO()
+            await bulk.export_questions(session, geometry, "jsonl", topic="geometry")
+
+            job = await bulk.import_questions(session, io.StringIO(exported.getvalue()), "csv", job_id="copy")
+            return count, geometry.getvalue(), job, await counts(session)
+
+    count, geometry, job, (quizzes, questions) = asyncio.run(scenario())
+    assert count == 5
+    assert [json.loads(line)["prompt"] for line in geometry.splitlines()] == ["Question 3", "Question 4"]
+    assert (job.rows_imported, job.rows_rejected) == (5, 0)
+    assert (quizzes, questions) == (4, 10)
+
+def test_running_servers_see_imports(monkeypatch):
+    async def scenario():
+        Session = await make_session_factory()
+        # A server process polling the database
+        watcher = asyncio.create_task(cache.watch_catalog_version(Session, interval=0.01))
+        await asyncio.sleep(0.05)
+        version = catalog_version.value
+        # The import runs in another process, so its local invalidation is not seen here
+        monkeypatch.setattr(bulk, "invalidate_catalog", lambda: None)
+        async with Session() as session:
+            await bulk.import_questions(session, io.StringIO(jsonl([question(1)])), job_id="elsewhere")
+        await asyncio.sleep(0.05)
+        watcher.cancel()
+        return catalog_version.value > version
+
+    assert asyncio.run(scenario())
+
+def test_bank_questions_round_trip():
+    async def scenario():
+        Session = await make_session_factory()
+        async with Session() as session:
+            session.add(Quiz(topic="algebra", difficulty="bank"))
+            await session.flush()
+            session.add(Question(quiz_id=1, prompt="generated", choices=json.dumps(["a", "b"]), answer="1"))
+            await session.commit()
+            exported = io.StringIO()
+            await bulk.export_questions(session, exported)
+            job = await bulk.import_questions(session, io.StringIO(exported.getvalue()), job_id="copy")
+            return exported.getvalue(), job
+
+    exported, job = asyncio.run(scenario())
+    assert json.loads(exported)["difficulty"] == "bank"
+    assert (job.rows_imported, job.rows_rejected) == (1, 0)
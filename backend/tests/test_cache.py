@@ -0,0 +1,115 @@
+import pytest
+from datetime import date
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from app.core import cache
+from app.core.cache import (
+    ResponseCacheMiddleware,
+    cache_key,
+    invalidate_catalog,
+    response_cache,
+)
+
+calls = {"count": 0}
+colleges_by_id = {1: {"name": "MIT"}}
+
+app = FastAPI()
+app.add_middleware(ResponseCacheMiddleware)
+
+@app.get("/colleges")
+async def colleges(q: str = None):
+    calls["count"] += 1
+    return {"colleges": [{"name": q or "all"}]}
+
+@app.get("/colleges/{college_id}")
+async def college(college_id: int):
+    calls["count"] += 1
+    if college_id not in colleges_by_id:
+        raise HTTPException(status_code=404, detail="College not found")
+    return colleges_by_id[college_id]
+
+@app.get("/scholarships")
+async def scholarships():
+    calls["count"] += 1
+    return {"today": cache.date.today().isoformat()}
+
+@app.get("/private")
+async def private():
+    calls["count"] += 1
+    return {"ok": True}
+
+client = TestClient(app)
+
+@pytest.fixture(autouse=True)
+def reset_cache():
+    invalidate_catalog()
+    calls["count"] = 0
+    colleges_by_id[1] = {"name": "MIT"}
+
+def test_cache_key_normalization():
+    assert cache_key("/colleges/", "b=2&a=1&c=") == cache_key("/colleges", "a=1&b=2")
+    assert cache_key("/colleges", "") == "/colleges"
+
+def test_repeat_request_served_from_cache():
+    first = client.get("/colleges?q=mit")
+    second = client.get("/colleges?q=mit")
+
+    assert first.json() == second.json()
+    assert calls["count"] == 1
+    assert first.headers["etag"] == second.headers["etag"]
+    assert "max-age" in first.headers["cache-control"]
+
+def test_conditional_request_returns_304():
+    etag = client.get("/colleges").headers["etag"]
+
+    response = client.get("/colleges", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert calls["count"] == 1
+
+def test_invalidation_revalidates_against_content():
+    etag = client.get("/colleges/1").headers["etag"]
+    invalidate_catalog()
+
+    # The handler runs again, but the body is unchanged
+    unchanged = client.get("/colleges/1", headers={"If-None-Match": etag})
+    colleges_by_id[1] = {"name": "Caltech"}
+    invalidate_catalog()
+    changed = client.get("/colleges/1", headers={"If-None-Match": etag})
+
+    assert unchanged.status_code == 304
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert calls["count"] == 3
+
+def test_conditional_request_for_missing_resource_is_not_304():
+    response = client.get("/colleges/999999", headers={"If-None-Match": "*"})
+
+    assert response.status_code == 404
+    assert "etag" not in response.headers
+    assert len(response_cache) == 0
+
+def test_dated_paths_expire_at_midnight(monkeypatch):
+    class Day(date):
+        current = date(2030, 1, 1)
+
+        @classmethod
+        def today(cls):
+            return cls.current
+
+    monkeypatch.setattr(cache, "date", Day)
+    first = client.get("/scholarships")
+    client.get("/scholarships")
+    Day.current = date(2030, 1, 2)
+    next_day = client.get("/scholarships", headers={"If-None-Match": first.headers["etag"]})
+
+    assert calls["count"] == 2
+    assert next_day.status_code == 200
+    assert next_day.json() == {"today": "2030-01-02"}
+
+def test_non_catalog_paths_not_cached():
+    client.get("/private")
+    client.get("/private")
+
+    assert calls["count"] == 2
+    assert len(response_cache) == 0
@@ -0,0 +1,163 @@
+import asyncio
+import os
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from app.db.base import Base
+from app.db.models import UserProgress
+from app.services.chat_log import ChatLogWriter, SpillBuffer, get_chat_history
+
+async def make_session_factory():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+
+def test_batched_writes_and_keyset_pages():
+    async def scenario():
+        Session = await make_session_factory()
+        writer = ChatLogWriter(Session, batch_size=10)
+        for i in range(25):
+            writer.append(1, f"question {i}", f"answer {i}")
+        writer.append(2, "other user", "reply")
+        assert await writer.flush() == 26
+        assert len(writer) == 0
+
+        pages = []
+        cursor = None
+        async with Session() as session:
+            while True:
+                page = await get_chat_history(session, 1, limit=10, before=cursor)
+                pages.append([item["message"] for item in page["history"]])
+                cursor = page["next_cursor"]
+                if cursor is None:
+                    break
+            progress = await session.get(UserProgress, 1)
+        return pages, progress.chat_interactions
+
+    pages, chat_count = asyncio.run(scenario())
+    assert [len(page) for page in pages] == [10, 10, 5]
+    messages = [message for page in pages for message in page]
+    assert messages == [f"question {i}" for i in reversed(range(25))]
+    assert chat_count == 25
+
+def test_failed_flush_keeps_rows():
+    class BrokenSession:
+        async def __aenter__(self):
+            raise ConnectionError("database unavailable")
+        async def __aexit__(self, *args):
+            return False
+
+    async def scenario():
+        writer = ChatLogWriter(BrokenSession)
+        writer.append(1, "q", "a")
+        assert await writer.flush() == 0
+        return len(writer)
+
+    assert asyncio.run(scenario()) == 1
+
+def test_invalid_cursor():
+    async def scenario():
+        Session = await make_session_factory()
+        async with Session() as session:
+            await get_chat_history(session, 1, before="not-a-cursor")
+
+    with pytest.raises(ValueError):
+        asyncio.run(scenario())
+
+def test_spill_buffer_overflows_to_disk_and_replays(tmp_path):
+    path = tmp_path / "spill.jsonl"
+    buffer = SpillBuffer(str(path), max_entries=3)
+    for i in range(8):
+        buffer.put({"n": i})
+    assert len(buffer) == 8
+    assert os.path.exists(buffer.path)
+
+    # Survives a restart
+    buffer = SpillBuffer(str(path), max_entries=3)
+    assert len(buffer) == 5
+
+    seen = []
+    async def flaky(record):
+        if record["n"] == 6 and 6 not in seen:
+            seen.append(6)
+            raise ConnectionError("vector store down")
+        seen.append(record["n"])
+
+    assert asyncio.run(buffer.replay(flaky)) == 3
+    assert len(buffer) == 2
+    assert asyncio.run(buffer.replay(flaky)) == 2
+    assert seen == [3, 4, 5, 6, 6, 7]
+    assert len(buffer) == 0
+    assert not os.path.exists(buffer.path)
+
+def test_spill_files_of_exited_workers_are_adopted(tmp_path):
+    path = str(tmp_path / "spill.jsonl")
+    for worker in range(2):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                buffer = SpillBuffer(path, max_entries=0)
+                buffer.put({"worker": worker})
+            finally:
+                os._exit(0)
+        os.waitpid(pid, 0)
+
+    buffer = SpillBuffer(path, max_entries=0)
+    seen = []
+    async def record(item):
+        seen.append(item["worker"])
+
+    assert len(buffer) == 2
+    assert asyncio.run(buffer.replay(record)) == 2
+    assert seen == [0, 1]
+    assert os.listdir(tmp_path) == ["spill.jsonl.lock"]
+
+def test_persist_writes_memory_ahead_of_file(tmp_path):
+    path = tmp_path / "spill.jsonl"
+    buffer = SpillBuffer(str(path), max_entries=2)
+    for i in range(4):
+        buffer.put({"n": i})
+    asyncio.run(buffer.persist())
+
+    buffer = SpillBuffer(str(path), max_entries=2)
+    seen = []
+    async def record(item):
+        seen.append(item["n"])
+
+    assert len(buffer) == 4
+    assert asyncio.run(buffer.replay(record, limit=3)) == 3
+    assert asyncio.run(buffer.replay(record)) == 1
+    assert seen == [0, 1, 2, 3]
+
+def test_outage_rows_are_bounded_and_survive_restart(tmp_path):
+    class BrokenSession:
+        async def __aenter__(self):
+            raise ConnectionError("database unavailable")
+        async def __aexit__(self, *args):
+            return False
+
+    async def scenario():
+        path = str(tmp_path / "chat_spill.jsonl")
+        writer = ChatLogWriter(BrokenSession, max_pending=3, spill=SpillBuffer(path, max_entries=0))
+        for i in range(5):
+            writer.append(1, f"q{i}", f"a{i}")
+        await writer.flush()
+        during_outage = (len(writer), len(writer.spill))
+        writer.append(1, "q5", "a5")
+        await writer.stop()
+
+        Session = await make_session_factory()
+        restarted = ChatLogWriter(Session, max_pending=3, spill=SpillBuffer(path, max_entries=0))
+        restored = await restarted.restore()
+        await restarted.flush()
+        restored += await restarted.restore()
+        await restarted.flush()
+        async with Session() as session:
+            page = await get_chat_history(session, 1, limit=10)
+        return during_outage, restored, [item["message"] for item in page["history"]]
+
+    during_outage, restored, messages = asyncio.run(scenario())
+    assert during_outage == (3, 2)
+    assert restored == 6
+    assert messages == [f"q{i}" for i in reversed(range(6))]
@@ -0,0 +1,127 @@
+import asyncio
+import pytest
+from fastapi import FastAPI, HTTPException, WebSocketDisconnect
+from fastapi.testclient import TestClient
+from app.api.routers import chat as chat_router
+from app.core.config import settings
+from app.services import chat as chat_module, gemini, pinecone
+from app.services.fakes import FakeLLM, InMemoryVectorStore, default_reply
+
+class User:
+    def __init__(self, user_id):
+        self.id = user_id
+
+class Log:
+    def __init__(self):
+        self.rows = []
+    def append(self, *args):
+        self.rows.append(args)
+
+@pytest.fixture
+def llm(monkeypatch):
+    llm = FakeLLM()
+    monkeypatch.setattr(gemini, "_backend", llm)
+    monkeypatch.setattr(pinecone, "_store", InMemoryVectorStore())
+    return llm
+
+@pytest.fixture
+def service(monkeypatch, llm):
+    service = chat_module.ChatService(log=Log(), spill=[])
+    history_loads = []
+
+    async def recent_turns(user_id):
+        history_loads.append(user_id)
+        return []
+    monkeypatch.setattr(service, "_recent_turns", recent_turns)
+    service.history_loads = history_loads
+    return service
+
+@pytest.fixture
+def client(monkeypatch, service):
+    async def user_from_token(token):
+        if not token.startswith("user-"):
+            raise HTTPException(status_code=401, detail="Could not validate credentials")
+        return User(int(token[5:]))
+    monkeypatch.setattr(chat_router, "user_from_token", user_from_token)
+
+    app = FastAPI()
+    app.include_router(chat_router.router)
+    app.dependency_overrides[chat_router.get_chat_service] = lambda: service
+    return TestClient(app)
+
+def receive_reply(ws):
+    chunks = []
+    while True:
+        frame = ws.receive_json()
+        if frame["type"] != "token":
+            return "".join(chunks), frame
+        chunks.append(frame["text"])
+
+def test_streams_replies_with_session_history(client, service, llm):
+    with client.websocket_connect("/chat/ws?token=user-101") as ws:
+        ws.send_json({"type": "message", "message": "How do I factor x^2 - 9?"})
+        first, end = receive_reply(ws)
+        assert end == {"type": "done"}
+        assert first == default_reply("")
+
+        ws.send_json({"type": "message", "message": "And x^2 - 16?"})
+        second, end = receive_reply(ws)
+        assert end == {"type": "done"}
+
+    # History is loaded once; the second prompt sees the first exchange
+    assert service.history_loads == [101]
+    assert "How do I factor x^2 - 9?" in llm.prompts[1]
+    assert [row[1] for row in service.log.rows] == ["How do I factor x^2 - 9?", "And x^2 - 16?"]
+
+def test_rejects_invalid_token(client):
+    with pytest.raises(WebSocketDisconnect) as exc:
+        with client.websocket_connect("/chat/ws?token=bogus") as ws:
+            ws.receive_json()
+    assert exc.value.code == 1008
+
+def test_enforces_connection_limit(client, monkeypatch):
+    monkeypatch.setattr(settings, "CHAT_WS_MAX_CONNECTIONS", 1)
+    with client.websocket_connect("/chat/ws?token=user-102") as ws:
+        ws.send_json({"type": "ping"})
+        assert ws.receive_json() == {"type": "pong"}
+        with pytest.raises(WebSocketDisconnect) as exc:
+            with client.websocket_connect("/chat/ws?token=user-103") as other:
+                other.receive_json()
+        assert exc.value.code == 1013
+    assert chat_router._connections == 0
+
+def test_reports_bad_frames_and_pings_quiet_clients(client, monkeypatch):
+    monkeypatch.setattr(settings, "CHAT_WS_PING_INTERVAL", 0.05)
+    with client.websocket_connect("/chat/ws?token=user-104") as ws:
+        ws.send_text("not json")
+        assert ws.receive_json()["type"] == "error"
+        ws.send_json({"type": "message", "message": "  "})
+        assert ws.receive_json()["type"] == "error"
+        assert ws.receive_json() == {"type": "ping"}
+        ws.send_json({"type": "pong"})
+
+def test_stream_response_records_success(llm):
+    async def scenario():
+        return [chunk async for chunk in gemini.stream_response("Explain slope", call_site="test")]
+
+    chunks = asyncio.run(scenario())
+    assert len(chunks) > 1
+    assert "".join(chunks) == default_reply("")
+
+def test_clients_that_stop_reading_are_closed_with_1008(monkeypatch):
+    monkeypatch.setattr(settings, "CHAT_WS_SEND_TIMEOUT", 0.01)
+
+    class StalledSocket:
+        closed_with = None
+
+        async def send_text(self, text):
+            await asyncio.sleep(1.0)
+
+        async def close(self, code, reason=""):
+            self.closed_with = (code, reason)
+
+    websocket = StalledSocket()
+    with pytest.raises(WebSocketDisconnect) as exc:
+        asyncio.run(chat_router._send(websocket, {"type": "token", "text": "x"}))
+    assert exc.value.code == 1008
+    assert websocket.closed_with == (1008, "Client is not reading")
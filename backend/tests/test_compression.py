@@ -0,0 +1,73 @@
+import gzip
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from app.core.cache import ResponseCache, cached_response
+from app.core.compression import Codec, CompressionMiddleware, negotiate
+
+LARGE = {"colleges": [{"name": f"College {i}", "location": "Boston, MA"} for i in range(100)]}
+
+app = FastAPI()
+app.add_middleware(CompressionMiddleware, minimum_size=500)
+
+@app.get("/large")
+async def large():
+    return LARGE
+
+@app.get("/small")
+async def small():
+    return {"ok": True}
+
+@app.get("/stream")
+async def stream():
+    async def lines():
+        for i in range(50):
+            yield f'{{"line": {i}}}\n'
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+client = TestClient(app)
+
+def test_negotiate_honours_q_values():
+    assert negotiate("gzip, deflate").name == "gzip"
+    assert negotiate("*").name in ("br", "zstd", "gzip")
+    assert negotiate("gzip;q=0") is None
+    assert negotiate("identity") is None
+    assert negotiate(None) is None
+
+def test_large_bodies_are_compressed():
+    response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) < len(response.content)
+    assert response.json() == LARGE
+
+def test_small_and_unaccepted_bodies_are_not():
+    assert "content-encoding" not in client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+    assert "content-encoding" not in client.get("/large", headers={"Accept-Encoding": "identity"}).headers
+
+def test_streams_are_compressed_incrementally():
+    with client.stream("GET", "/stream", headers={"Accept-Encoding": "gzip"}) as response:
+        assert response.headers["content-encoding"] == "gzip"
+        assert "content-length" not in response.headers
+        raw = b"".join(response.iter_raw())
+    assert gzip.decompress(raw).decode().splitlines()[-1] == '{"line": 49}'
+
+def test_cached_bodies_are_compressed_once():
+    calls = []
+    codec = Codec("gzip", lambda data: calls.append(data) or gzip.compress(data), None)
+    cache = ResponseCache(4)
+    body = b'{"payload": "' + b"x" * 1000 + b'"}'
+    cache.set("/colleges", 1, body, "application/json")
+    first = cache.encoded("/colleges", codec)
+    assert cache.encoded("/colleges", codec) is first
+    assert len(calls) == 1
+    assert gzip.decompress(first) == body
+
+def test_cached_response_uses_precompressed_variant():
+    cache = ResponseCache(4)
+    body = b'{"payload": "' + b"x" * 1000 + b'"}'
+    cache.set("k", 1, body, "application/json")
+    response = cached_response(cache, "k", body, "application/json", "gzip")
+    assert response.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(response.body) == body
+    assert "content-encoding" not in cached_response(cache, "k", body, "application/json", None).headers
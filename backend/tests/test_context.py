@@ -0,0 +1,101 @@
+import asyncio
+from app.services.context import (
+    ContextBuilder,
+    count_tokens,
+    detect_subject,
+    select_template,
+    truncate_tokens,
+)
+from app.services.chat import ChatSession
+from app.utils.prompts import ChatPrompts
+
+def make_turns(n, answer="Short answer."):
+    # Newest first, like the chat log returns them
+    return [{"id": i, "message": f"question {i}", "response": answer} for i in reversed(range(n))]
+
+def test_truncate_respects_token_limit():
+    text = "word " * 1000
+    assert count_tokens(truncate_tokens(text, 50)) <= 50
+    assert truncate_tokens("short", 50) == "short"
+
+def test_subject_detection():
+    assert detect_subject("How do I solve a quadratic equation?") == "math"
+    assert detect_subject("If 3x + 2 = 11, what is x?") == "math"
+    assert detect_subject("When should I use a semicolon instead of a comma?") == "writing"
+    assert detect_subject("How early should I get to the test center?") == "general"
+    assert select_template("What is the slope of this line?") == ("math", ChatPrompts.MATH_TUTOR)
+
+def test_long_answers_stay_within_budget():
+    builder = ContextBuilder(token_budget=400, turn_max_tokens=150)
+    turns = make_turns(3, answer="very long explanation " * 2000)
+    memories = [{"message": "older question", "response": "x" * 50000}]
+
+    async def build():
+        return builder.build(1, turns, memories)
+
+    context = asyncio.run(build())
+    assert count_tokens(context) <= 400
+    # The newest turn is always kept, and turns read oldest to newest
+    assert "question 2" in context
+    assert context.index("question 0") < context.index("question 2")
+
+def test_retrieved_duplicates_of_recent_turns_are_skipped():
+    builder = ContextBuilder(token_budget=1000)
+    turns = make_turns(2)
+    memories = [{"message": "question 1", "response": "Short answer."}]
+
+    async def build():
+        return builder.build(1, turns, memories)
+
+    assert asyncio.run(build()).count("question 1") == 1
+
+def test_older_turns_are_summarized_in_background_and_cached():
+    calls = []
+
+    async def fake_summarize(prompt):
+        calls.append(prompt)
+        return "Student reviewed linear equations."
+
+    builder = ContextBuilder(token_budget=1000, recent_turns=2, summary_refresh_turns=3, summarize=fake_summarize)
+
+    async def scenario():
+        turns = make_turns(6)
+        first = builder.build(1, turns)
+        await builder.drain()
+        second = builder.build(1, turns)
+        # Two more turns age out: still within the refresh window
+        third = builder.build(1, make_turns(8))
+        await builder.drain()
+        # A fourth new turn triggers a refresh
+        builder.build(1, make_turns(10))
+        await builder.drain()
+        return first, second, third
+
+    first, second, third = asyncio.run(scenario())
+    assert "Earlier in this conversation" not in first
+    assert "Student reviewed linear equations." in second
+    assert "Student reviewed linear equations." in third
+    assert len(calls) == 2
+    assert "question 3" in calls[0] and "question 4" not in calls[0]
+
+def test_session_turns_refresh_the_summary():
+    calls = []
+
+    async def fake_summarize(prompt):
+        calls.append(prompt)
+        return f"Summary {len(calls)}."
+
+    builder = ContextBuilder(token_budget=1000, recent_turns=1, summary_refresh_turns=2, summarize=fake_summarize)
+    session = ChatSession(user=None, turns=[])
+
+    async def scenario():
+        for i in range(8):
+            session.add_turn(f"question {i}", "Short answer.")
+            builder.build(1, session.turns)
+            await builder.drain()
+
+    asyncio.run(scenario())
+    assert len({turn["id"] for turn in session.turns}) == len(session.turns)
+    # Summaries follow the conversation instead of being cached once
+    assert len(calls) > 1
+    assert "question 6" in calls[-1]
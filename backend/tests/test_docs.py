@@ -0,0 +1,72 @@
+import gzip
+import hashlib
+import pytest
+from fastapi.testclient import TestClient
+from app.core import docs
+from app.core.docs import OpenAPIDocument
+from app.main import app
+
+def test_schema_is_built_once():
+    calls = []
+    document = OpenAPIDocument(lambda: calls.append(1) or {"openapi": "3.0.2", "paths": {"/x": {}}})
+    first = document.response(None, None)
+    second = document.response(None, "gzip")
+    assert len(calls) == 1
+    assert first.body == b'{"openapi":"3.0.2","paths":{"/x":{}}}'
+    # One weak ETag for every encoding of the same schema
+    assert second.headers["etag"] == first.headers["etag"]
+    assert first.headers["etag"].startswith('W/"')
+
+def test_conditional_and_compressed_requests():
+    document = OpenAPIDocument(lambda: {"paths": {f"/route/{i}": {"get": {}} for i in range(100)}})
+    response = document.response(None, "gzip")
+    assert response.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(response.body).startswith(b'{"paths"')
+    assert document.response(document.etag, "gzip").status_code == 304
+
+def test_app_serves_cached_schema():
+    client = TestClient(app)
+    response = client.get("/openapi.json")
+    assert response.status_code == 200
+    assert "/quiz/{quiz_id}" in response.json()["paths"]
+    assert client.get("/openapi.json", headers={"If-None-Match": response.headers["etag"]}).status_code == 304
+    assert client.get("/docs").status_code == 200
+
+def test_swagger_assets_fall_back_to_cdn(tmp_path, monkeypatch):
+    monkeypatch.setattr(docs, "SWAGGER_UI_DIR", str(tmp_path))
+    assert docs.swagger_asset_url("swagger-ui.css").startswith(f"https://unpkg.com/swagger-ui-dist@{docs.SWAGGER_UI_VERSION}/")
+    for name in docs.SWAGGER_UI_ASSETS:
+        (tmp_path / name).write_bytes(b"asset")
+    assert docs.swagger_asset_url("swagger-ui.css") == f"/static/swagger-ui/{docs.SWAGGER_UI_VERSION}/swagger-ui.css"
+
+def test_vendoring_verifies_pinned_digests(tmp_path):
+    assets = {name: f"{name} contents".encode() for name in docs.SWAGGER_UI_ASSETS}
+    pinned = {
+        f"{docs.SWAGGER_UI_VERSION}/{name}": hashlib.sha256(data).hexdigest() for name, data in assets.items()
+    }
+    target = tmp_path / "assets"
+
+    tampered = dict(assets, **{"swagger-ui.css": b"body { display: none }"})
+    with pytest.raises(docs.AssetIntegrityError):
+        docs.vendor_swagger_ui(str(target), pinned, download=tampered.__getitem__)
+    assert not target.exists()
+
+    with pytest.raises(docs.AssetIntegrityError):
+        docs.vendor_swagger_ui(str(target), {}, download=assets.__getitem__)
+
+    docs.vendor_swagger_ui(str(target), pinned, download=assets.__getitem__)
+    assert (target / "swagger-ui.css").read_bytes() == b"swagger-ui.css contents"
+
+def test_pinned_digests_round_trip(tmp_path):
+    sums = tmp_path / "SHA256SUMS"
+    docs.pin_swagger_ui(str(sums), download=lambda name: name.encode())
+    pinned = docs.read_pinned_digests(str(sums))
+    assert pinned[f"{docs.SWAGGER_UI_VERSION}/favicon-32x32.png"] == hashlib.sha256(b"favicon-32x32.png").hexdigest()
+    assert len(pinned) == len(docs.SWAGGER_UI_ASSETS)
+
+def test_committed_assets_match_pinned_digests(tmp_path):
+    docs.verify_swagger_ui()
+    for name in docs.SWAGGER_UI_ASSETS:
+        (tmp_path / name).write_bytes((docs.SWAGGER_UI_DIR + "/" + name).encode())
+    with pytest.raises(docs.AssetIntegrityError):
+        docs.verify_swagger_ui(str(tmp_path))
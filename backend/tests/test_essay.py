@@ -0,0 +1,80 @@
+import asyncio
+import json
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from app.db.base import Base
+from app.db.models import Essay
+from app.services import essay, gemini
+from app.services.fakes import FakeLLM
+
+ESSAY = (
+    "The summer I spent volunteering at the community garden taught me more about patience "
+    "than any classroom ever could. Every morning I watered rows of tomatoes that refused to "
+    "ripen, and every evening I wrote down what had changed."
+)
+
+ANALYSIS = {
+    "feedback": "A vivid opening that needs a clearer conclusion.",
+    "overall_score": 7.5,
+    "detailed_scores": {},
+    "summary": "Patience learned in a garden.",
+    "improvements": [
+        {"suggestion": "End on what changed in you", "example": "Now I wait for results..."},
+        {"suggestion": "Cut the second sentence", "example": ""},
+    ],
+}
+
+@pytest.fixture
+def llm(monkeypatch):
+    llm = FakeLLM(responder=lambda prompt: json.dumps(ANALYSIS))
+    monkeypatch.setattr(gemini, "_backend", llm)
+    return llm
+
+@pytest.fixture
+def Session(monkeypatch):
+    async def make_session_factory():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        return sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+
+    Session = asyncio.run(make_session_factory())
+    monkeypatch.setattr(essay, "AsyncSessionLocal", Session)
+    return Session
+
+def test_full_analysis_is_one_llm_call(llm, Session):
+    async def scenario():
+        result = await essay.analyze_essay_full(ESSAY, user_id=1)
+        async with Session() as session:
+            return result, await session.get(Essay, result["essay_id"])
+
+    result, stored = asyncio.run(scenario())
+    assert len(llm.prompts) == 1
+    assert result["analysis_mode"] == "full"
+    assert result["feedback"] == ANALYSIS["feedback"]
+    assert result["overall_score"] == 7.5
+    assert stored.feedback == ANALYSIS["feedback"]
+    assert json.loads(stored.analysis)["improvements"] == ANALYSIS["improvements"]
+
+def test_improvements_reuse_stored_analysis(llm, Session):
+    async def scenario():
+        result = await essay.analyze_essay_full(ESSAY, user_id=1)
+        return await essay.suggest_improvements(result["essay_id"])
+
+    suggestions = asyncio.run(scenario())
+    assert len(llm.prompts) == 1
+    assert suggestions.startswith("1. End on what changed in you\n   Example: Now I wait for results...")
+    assert "2. Cut the second sentence" in suggestions
+
+def test_improvements_for_older_essays_are_generated(llm, Session):
+    async def scenario():
+        async with Session() as session:
+            old = Essay(user_id=1, content=ESSAY, feedback="Good start.", essay_type="college_app")
+            session.add(old)
+            await session.commit()
+        return await essay.suggest_improvements(old.id)
+
+    asyncio.run(scenario())
+    assert len(llm.prompts) == 1
+    assert ESSAY in llm.prompts[0]
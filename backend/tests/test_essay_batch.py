@@ -0,0 +1,107 @@
+import asyncio
+import pytest
+from app.core.ratelimit import LLMOverloaded
+from app.services.essay_batch import FairScheduler, SchedulerFull, content_key, submit_batch
+
+def recorder(order, name, delay=0.0):
+    async def call():
+        order.append(name)
+        await asyncio.sleep(delay)
+        return name
+    return call
+
+def test_scheduler_alternates_between_teachers():
+    async def scenario():
+        scheduler = FairScheduler(workers=1)
+        order = []
+        big = scheduler.submit_many("a", [recorder(order, f"a{i}") for i in range(4)])
+        small = scheduler.submit_many("b", [recorder(order, f"b{i}") for i in range(2)])
+        await asyncio.gather(*big, *small)
+        await scheduler.stop()
+        return order
+
+    assert asyncio.run(scenario()) == ["a0", "b0", "a1", "b1", "a2", "a3"]
+
+def test_scheduler_bounds_queue_and_drains_on_stop():
+    async def scenario():
+        scheduler = FairScheduler(workers=2, max_pending=3)
+        order = []
+        futures = scheduler.submit_many("a", [recorder(order, i, 0.01) for i in range(3)])
+        with pytest.raises(SchedulerFull):
+            scheduler.submit_many("b", [recorder(order, "b")])
+        await scheduler.stop(timeout=1.0)
+        with pytest.raises(SchedulerFull):
+            scheduler.submit_many("b", [recorder(order, "b")])
+        return [future.result() for future in futures], scheduler.pending
+
+    results, pending = asyncio.run(scenario())
+    assert results == [0, 1, 2]
+    assert pending == 0
+
+def test_batch_dedupes_and_streams_results():
+    calls = []
+
+    async def score(content, essay_type, fallback=True):
+        calls.append(content)
+        if "fail" in content:
+            raise ValueError("unparseable")
+        return {"overall_score": len(content)}
+
+    async def scenario():
+        scheduler = FairScheduler(workers=2)
+        essays = [("1", "My summer  job"), ("2", "My summer job "), ("3", "fail me"), ("4", "Another")]
+        batch = submit_batch(7, essays, scheduler=scheduler, score=score)
+        results = [result async for result in batch.results()]
+        await scheduler.stop()
+        return batch, results
+
+    batch, results = asyncio.run(scenario())
+    assert batch.essays == 4 and len(batch.futures) == 3
+    assert sorted(calls) == ["Another", "My summer  job", "fail me"]
+    by_id = {result["id"]: result for result in results}
+    assert by_id["1"]["status"] == "scored" and "duplicate_of" not in by_id["1"]
+    assert by_id["2"] == {**by_id["1"], "id": "2", "duplicate_of": "1"}
+    assert by_id["3"]["status"] == "failed"
+    assert by_id["4"]["result"] == {"overall_score": 7}
+    assert content_key("a  b", "sat") == content_key(" a b", "sat") != content_key("a b", "college_app")
+
+def test_overloaded_llm_is_retried():
+    attempts = []
+
+    async def score(content, essay_type, fallback=True):
+        attempts.append(content)
+        if len(attempts) == 1:
+            raise LLMOverloaded(retry_after=0)
+        return {"overall_score": 5}
+
+    async def scenario():
+        scheduler = FairScheduler(workers=1)
+        batch = submit_batch(1, [("1", "essay")], scheduler=scheduler, score=score)
+        results = [result async for result in batch.results()]
+        await scheduler.stop()
+        return results
+
+    assert asyncio.run(scenario())[0]["status"] == "scored"
+    assert len(attempts) == 2
+
+def test_abandoned_batch_skips_unstarted_essays():
+    started = []
+
+    async def score(content, essay_type, fallback=True):
+        started.append(content)
+        await asyncio.sleep(0.01)
+        return {"overall_score": 5}
+
+    async def scenario():
+        scheduler = FairScheduler(workers=1)
+        batch = submit_batch(1, [(str(i), f"essay {i}") for i in range(5)], scheduler=scheduler, score=score)
+        results = batch.results()
+        first = await results.__anext__()
+        await results.aclose()
+        await scheduler.stop(timeout=1.0)
+        return first
+
+    first = asyncio.run(scenario())
+    assert first["status"] == "scored"
+    # One essay may have started before the batch was abandoned
+    assert len(started) <= 2
@@ -0,0 +1,130 @@
+import asyncio
+import datetime
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from app.db.base import Base
+from app.db.models import FlashcardReview
+from app.services import flashcards
+
+NOW = datetime.datetime(2024, 1, 1, 12, 0)
+
+async def make_session_factory():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+
+def new_review():
+    return FlashcardReview(user_id=1, card_id=1, ease=2.5, interval_days=0.0, repetitions=0, lapses=0, due_at=NOW)
+
+def test_sm2_intervals_grow_and_reset():
+    review = new_review()
+    intervals = []
+    for day in range(3):
+        flashcards.schedule_review(review, 4, NOW)
+        intervals.append(review.interval_days)
+    assert intervals == [1.0, 6.0, 15.0]
+    assert review.ease == 2.5
+    assert review.due_at == NOW + datetime.timedelta(days=15)
+
+    flashcards.schedule_review(review, 1, NOW)
+    assert review.interval_days == 1.0
+    assert review.repetitions == 0
+    assert review.lapses == 1
+    assert review.ease < 2.5
+
+def test_ease_has_a_floor():
+    review = new_review()
+    for _ in range(10):
+        flashcards.schedule_review(review, 0, NOW)
+    assert review.ease == flashcards.MIN_EASE
+
+def test_deck_generated_once_and_shared():
+    calls = []
+
+    async def generate(topic, subtopic, num_cards):
+        calls.append((topic, subtopic))
+        await asyncio.sleep(0.01)
+        return [{"front": f"front {i}", "back": f"back {i}"} for i in range(3)]
+
+    async def scenario():
+        Session = await make_session_factory()
+
+        async def study(user_id):
+            async with Session() as session:
+                deck = await flashcards.get_or_create_deck(session, "algebra", None, generate)
+                cards = await flashcards.deck_cards(session, deck.id)
+                added = await flashcards.enroll(session, user_id, cards, NOW)
+                await session.commit()
+                return deck.id, added
+
+        results = await asyncio.gather(study(1), study(2))
+        again = await study(1)
+        return results, again
+
+    results, again = asyncio.run(scenario())
+    assert calls == [("algebra", None)]
+    assert results[0] == results[1] == (results[0][0], 3)
+    assert again == (results[0][0], 0)
+
+def test_topic_spellings_share_a_deck():
+    async def generate(topic, subtopic, num_cards):
+        return [{"front": topic, "back": "b"}]
+
+    async def scenario():
+        Session = await make_session_factory()
+        async with Session() as session:
+            first = await flashcards.get_or_create_deck(session, "Algebra", None, generate)
+            second = await flashcards.get_or_create_deck(session, " algebra  ", "  ", generate)
+            return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first.id == second.id
+    assert (first.topic, first.subtopic) == ("algebra", "")
+
+def test_empty_generation_is_not_stored():
+    batches = [[], [{"front": "f", "back": "b"}]]
+
+    async def generate(topic, subtopic, num_cards):
+        return batches.pop(0)
+
+    async def scenario():
+        Session = await make_session_factory()
+        async with Session() as session:
+            with pytest.raises(ValueError):
+                await flashcards.get_or_create_deck(session, "algebra", None, generate)
+            deck = await flashcards.get_or_create_deck(session, "algebra", None, generate)
+            return await flashcards.deck_cards(session, deck.id)
+
+    cards = asyncio.run(scenario())
+    assert len(cards) == 1
+    assert flashcards._deck_locks == {}
+
+def test_due_cards_follow_reviews():
+    async def generate(topic, subtopic, num_cards):
+        return [{"front": f"front {i}", "back": f"back {i}"} for i in range(3)]
+
+    async def scenario():
+        Session = await make_session_factory()
+        async with Session() as session:
+            deck = await flashcards.get_or_create_deck(session, "geometry", "circles", generate)
+            cards = await flashcards.deck_cards(session, deck.id)
+            await flashcards.enroll(session, 1, cards, NOW)
+            await session.commit()
+
+            due_before = await flashcards.due_cards(session, 1, NOW)
+            await flashcards.review_card(session, 1, cards[0].id, 5, NOW)
+            await session.commit()
+            due_after = await flashcards.due_cards(session, 1, NOW)
+            due_later = await flashcards.due_cards(session, 1, NOW + datetime.timedelta(days=2))
+            missing = await flashcards.review_card(session, 2, cards[0].id, 5, NOW)
+            return cards, due_before, due_after, due_later, missing
+
+    cards, due_before, due_after, due_later, missing = asyncio.run(scenario())
+    assert [card["id"] for card in due_before] == [card.id for card in cards]
+    assert cards[0].id not in [card["id"] for card in due_after]
+    assert len(due_after) == 2
+    # Unreviewed cards stay ahead of the reviewed one
+    assert [card["id"] for card in due_later][-1] == cards[0].id
+    assert missing is None
@@ -0,0 +1,123 @@
+import asyncio
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from app.db.base import Base
+from app.services.jobs import JobQueue, InMemoryJobStore, SQLJobStore, checkpoint
+
+def make_queue(store):
+    queue = JobQueue(store, workers=1, max_attempts=2, poll_interval=0.01, retry_base_delay=0)
+    attempts = {"count": 0}
+
+    @queue.handler("echo")
+    async def echo(payload, user_id):
+        return {"echo": payload["text"], "user_id": user_id}
+
+    @queue.handler("flaky")
+    async def flaky(payload, user_id):
+        attempts["count"] += 1
+        if attempts["count"] == 1:
+            raise RuntimeError("transient")
+        return {"ok": True}
+
+    @queue.handler("broken")
+    async def broken(payload, user_id):
+        raise RuntimeError("always fails")
+
+    return queue
+
+async def drain(queue):
+    while await queue.run_once():
+        pass
+
+async def sqlite_store():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return SQLJobStore(sessionmaker(engine, expire_on_commit=False, class_=AsyncSession))
+
+@pytest.fixture(params=["memory", "sql"])
+def queue(request):
+    if request.param == "memory":
+        return make_queue(InMemoryJobStore())
+    return make_queue(asyncio.run(sqlite_store()))
+
+def test_job_runs_and_stores_result(queue):
+    async def scenario():
+        job_id = await queue.submit("echo", {"text": "hi"}, user_id=7)
+        await drain(queue)
+        return await queue.wait(job_id, timeout=0)
+
+    job = asyncio.run(scenario())
+    assert job["status"] == "succeeded"
+    assert job["result"] == {"echo": "hi", "user_id": 7}
+
+def test_transient_failure_is_retried(queue):
+    async def scenario():
+        job_id = await queue.submit("flaky", {})
+        await drain(queue)
+        return await queue.wait(job_id, timeout=0)
+
+    job = asyncio.run(scenario())
+    assert job["status"] == "succeeded"
+    assert job["attempts"] == 2
+
+def test_job_fails_after_max_attempts(queue):
+    async def scenario():
+        job_id = await queue.submit("broken", {})
+        await drain(queue)
+        return await queue.wait(job_id, timeout=0)
+
+    job = asyncio.run(scenario())
+    assert job["status"] == "failed"
+    assert "always fails" in job["error"]
+
+def test_unknown_kind_rejected(queue):
+    with pytest.raises(ValueError):
+        asyncio.run(queue.submit("missing", {}))
+
+def test_wait_returns_when_worker_finishes():
+    queue = make_queue(InMemoryJobStore())
+
+    async def scenario():
+        await queue.start()
+        try:
+            job_id = await queue.submit("echo", {"text": "later"})
+            return await queue.wait(job_id, timeout=2)
+        finally:
+            await queue.stop()
+
+    job = asyncio.run(scenario())
+    assert job["status"] == "succeeded"
+
+def test_checkpointed_step_runs_once_across_retries(queue):
+    calls, runs = [], []
+
+    async def expensive():
+        calls.append(1)
+        return {"score": 5}
+
+    @queue.handler("store_fails")
+    async def store_fails(payload, user_id):
+        analysis = await checkpoint("analysis", expensive)
+        runs.append(1)
+        if len(runs) == 1:
+            raise RuntimeError("database unavailable")
+        return analysis
+
+    async def scenario():
+        job_id = await queue.submit("store_fails", {})
+        await drain(queue)
+        return await queue.wait(job_id, timeout=0)
+
+    job = asyncio.run(scenario())
+    assert job["status"] == "succeeded"
+    assert job["attempts"] == 2
+    assert job["result"] == {"score": 5}
+    assert len(calls) == 1
+
+def test_checkpoint_outside_job_just_runs():
+    async def compute():
+        return 3
+
+    assert asyncio.run(checkpoint("step", compute)) == 3
@@ -0,0 +1,127 @@
+import asyncio
+import os
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.core.metrics import MetricsMiddleware, MultiprocessMetrics, Registry, registry
+from app.services import gemini
+from app.services.fakes import FakeLLM
+
+def sample(text, line_start):
+    return [line for line in text.splitlines() if line.startswith(line_start)]
+
+def test_histogram_exposition():
+    reg = Registry()
+    latency = reg.histogram("op_seconds", "Op latency.", ("op",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        latency.labels("read").observe(value)
+    text = reg.render()
+    assert "# TYPE op_seconds histogram" in text
+    assert 'op_seconds_bucket{op="read",le="0.1"} 1' in text
+    assert 'op_seconds_bucket{op="read",le="1"} 2' in text
+    assert 'op_seconds_bucket{op="read",le="+Inf"} 3' in text
+    assert 'op_seconds_count{op="read"} 3' in text
+    assert 'op_seconds_sum{op="read"} 5.55' in text
+
+def test_failing_collector_is_skipped():
+    reg = Registry()
+    reg.counter("ok_total", "Fine.").inc()
+
+    @reg.collector("broken", "gauge", "Raises.")
+    def broken():
+        raise RuntimeError("boom")
+        yield
+
+    text = reg.render()
+    assert "ok_total 1" in text
+    assert "broken" not in text
+
+def test_routes_are_labelled_by_template():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/widgets/{widget_id}")
+    async def widget(widget_id: int):
+        return {"id": widget_id}
+
+    client = TestClient(app)
+    for widget_id in range(3):
+        client.get(f"/widgets/{widget_id}")
+    client.get("/nowhere")
+
+    text = registry.render()
+    assert 'http_requests_total{route="/widgets/{widget_id}",method="GET",status="200"} 3' in text
+    assert 'http_requests_total{route="unmatched",method="GET",status="404"} 1' in text
+    assert 'http_requests_in_flight{route="/widgets/{widget_id}",method="GET"} 0' in text
+    assert sample(text, 'http_request_duration_seconds_count{route="/widgets/{widget_id}"')
+
+def test_llm_calls_recorded_per_call_site(monkeypatch):
+    monkeypatch.setattr(gemini, "_backend", FakeLLM(responder=lambda prompt: "x" * 40))
+    asyncio.run(gemini.generate_response("y" * 80, call_site="metrics_test"))
+
+    text = registry.render()
+    assert 'llm_calls_total{call_site="metrics_test",outcome="ok"} 1' in text
+    assert 'llm_tokens_total{call_site="metrics_test",direction="prompt"} 20' in text
+    assert 'llm_tokens_total{call_site="metrics_test",direction="output"} 10' in text
+
+def test_metrics_endpoint_includes_collectors():
+    from app.main import app
+
+    text = TestClient(app).get("/metrics").text
+    for name in ("cache_lookups_total", "circuit_breaker_open", "llm_slots", "chat_log_pending"):
+        assert f"# TYPE {name}" in text
+
+def test_workers_are_reported_together(tmp_path):
+    reg = Registry()
+    requests = reg.counter("requests_total", "Requests.")
+    latency = reg.histogram("op_seconds", "Op latency.", buckets=(1.0,))
+    busy = reg.gauge("busy", "Busy.")
+    flags = {"open": 0}
+
+    @reg.collector("breaker_open", "gauge", "Open.", combine="max")
+    def breaker():
+        yield "breaker_open", {}, flags["open"]
+
+    metrics = MultiprocessMetrics(str(tmp_path), reg)
+    # A worker that served two requests, then exited
+    pid = os.fork()
+    if pid == 0:
+        try:
+            requests.inc(2)
+            latency.observe(2.0)
+            busy.labels().set(5)
+            flags["open"] = 1
+            metrics.write()
+        finally:
+            os._exit(0)
+    os.waitpid(pid, 0)
+
+    requests.inc()
+    latency.observe(0.5)
+    busy.labels().set(1)
+    text = metrics.render()
+
+    assert "requests_total 3" in text
+    assert 'op_seconds_bucket{le="1"} 1' in text
+    assert 'op_seconds_bucket{le="+Inf"} 2' in text
+    assert "op_seconds_count 2" in text
+    # Gauges of exited workers are dropped
+    assert "busy 1" in text
+    assert "breaker_open 0" in text
+    assert sorted(os.listdir(tmp_path)) == [".lock", f"{os.getpid()}.json", "archive.json"]
+    # The archive keeps the exited worker's counts on later scrapes
+    assert "requests_total 3" in metrics.render()
+
+def test_gauges_of_live_workers_are_combined(tmp_path):
+    reg = Registry()
+    flags = {"open": 0}
+
+    @reg.collector("breaker_open", "gauge", "Open.", combine="max")
+    def breaker():
+        yield "breaker_open", {}, flags["open"]
+
+    metrics = MultiprocessMetrics(str(tmp_path), reg)
+    # A live sibling worker (the test runner's parent process) with the breaker open
+    (tmp_path / f"{os.getppid()}.json").write_text(
+        '[["breaker_open", "gauge", "Open.", [["breaker_open", {}, 1]]]]'
+    )
+    assert "breaker_open 1" in metrics.render()
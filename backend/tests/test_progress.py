@@ -0,0 +1,98 @@
+import asyncio
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from app.db.base import Base
+from app.db.models import UserProgress
+from app.services.progress import (
+    narrative_is_stale,
+    progress_snapshot,
+    record_chat_interactions,
+    record_essay,
+    record_quiz_result,
+)
+
+async def make_session_factory():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+
+def test_rollup_accumulates_activity():
+    async def scenario():
+        Session = await make_session_factory()
+        async with Session() as session:
+            await record_quiz_result(session, 1, "algebra", 700, 8, 10)
+            await record_quiz_result(session, 1, "geometry", 640, 2, 10)
+            await record_quiz_result(session, 1, "algebra", 760, 10, 10)
+            await record_essay(session, 1)
+            await record_chat_interactions(session, 1, 3)
+            await session.commit()
+
+        async with Session() as session:
+            return progress_snapshot(await session.get(UserProgress, 1))
+
+    data = asyncio.run(scenario())
+    assert data["quiz_attempts"] == 3
+    assert data["essay_submissions"] == 1
+    assert data["chat_interactions"] == 3
+    assert data["average_quiz_score"] == 700
+    assert data["topics_studied"] == ["algebra", "geometry"]
+    assert data["topic_accuracy"] == {"algebra": 0.9, "geometry": 0.2}
+    assert data["score_improvement"] == data["recent_quiz_score"] - 700
+
+def test_counters_create_row_on_first_write():
+    async def scenario():
+        Session = await make_session_factory()
+        async with Session() as session:
+            await record_essay(session, 2)
+            await session.commit()
+        async with Session() as session:
+            await record_essay(session, 2)
+            await session.commit()
+            return progress_snapshot(await session.get(UserProgress, 2))
+
+    assert asyncio.run(scenario())["essay_submissions"] == 2
+
+def test_concurrent_first_writes_both_count(tmp_path):
+    async def scenario():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'progress.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        Session = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+
+        async def write(record, **kwargs):
+            async with Session() as session:
+                await record(session, 3, **kwargs)
+                await asyncio.sleep(0.01)
+                await session.commit()
+
+        await asyncio.gather(
+            write(record_essay),
+            write(record_chat_interactions, count=2),
+            write(record_quiz_result, topic="algebra", score=700, correct=7, total=10),
+        )
+        async with Session() as session:
+            snapshot = progress_snapshot(await session.get(UserProgress, 3))
+        await engine.dispose()
+        return snapshot
+
+    data = asyncio.run(scenario())
+    assert (data["essay_submissions"], data["chat_interactions"], data["quiz_attempts"]) == (1, 2, 1)
+
+def test_snapshot_without_activity():
+    data = progress_snapshot(None)
+    assert data["quiz_attempts"] == 0
+    assert data["topic_accuracy"] == {}
+
+def test_narrative_staleness():
+    basis = {
+        "quiz_attempts": 5,
+        "essay_submissions": 1,
+        "recent_quiz_score": 700,
+        "topics_studied": ["algebra"],
+    }
+    assert narrative_is_stale(None, basis)
+    assert not narrative_is_stale(basis, {**basis, "quiz_attempts": 6, "recent_quiz_score": 710})
+    assert narrative_is_stale(basis, {**basis, "quiz_attempts": 8})
+    assert narrative_is_stale(basis, {**basis, "recent_quiz_score": 730})
+    assert narrative_is_stale(basis, {**basis, "topics_studied": ["algebra", "geometry"]})
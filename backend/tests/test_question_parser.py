@@ -0,0 +1,58 @@
+import json
+import random
+from pathlib import Path
+import pytest
+from app.utils.question_parser import QuestionParseError, parse_question, parse_questions
+
+CORPUS = [
+    json.loads(line)
+    for line in (Path(__file__).parent / "fixtures" / "quiz_outputs.jsonl").read_text().splitlines()
+    if line.strip()
+]
+
+@pytest.mark.parametrize("case", CORPUS, ids=[case["name"] for case in CORPUS])
+def test_corpus(case):
+    if case["answer"] is None:
+        with pytest.raises(QuestionParseError) as exc:
+            parse_question(case["output"])
+        assert exc.value.errors
+    else:
+        question = parse_question(case["output"])
+        assert question["answer"] == case["answer"]
+        assert len(question["choices"]) == 4
+        assert question["prompt"]
+
+def test_batch_reports_only_failed_indexes():
+    outputs = [case["output"] for case in CORPUS]
+    parsed, failures = parse_questions(outputs)
+
+    expected_failures = {i for i, case in enumerate(CORPUS) if case["answer"] is None}
+    assert set(failures) == expected_failures
+    assert all(parsed[i] is None for i in expected_failures)
+    assert all(parsed[i] is not None for i in range(len(CORPUS)) if i not in expected_failures)
+
+def mutate(text, rng):
+    """Apply formatting drift seen in real model output."""
+    lines = text.splitlines()
+    mutations = [
+        lambda line: "  " + line,
+        lambda line: f"**{line}**",
+        lambda line: line.replace(". ", ") ", 1),
+        lambda line: line + "   ",
+        lambda line: "- " + line,
+        lambda line: line.lower(),
+    ]
+    return "\n".join(rng.choice(mutations)(line) if rng.random() < 0.3 else line for line in lines)
+
+def test_fuzzed_outputs_never_crash():
+    rng = random.Random(1234)
+    for _ in range(500):
+        case = rng.choice(CORPUS)
+        text = mutate(case["output"], rng)
+        try:
+            question = parse_question(text)
+        except QuestionParseError as e:
+            assert e.errors
+        else:
+            assert 0 <= question["answer"] < 4
+            assert len(question["choices"]) == 4
@@ -0,0 +1,90 @@
+import asyncio
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from app.core import ratelimit
+from app.core.auth import get_current_user
+from app.core.ratelimit import (
+    InMemoryRateLimitBackend,
+    LLMConcurrencyLimiter,
+    LLMOverloaded,
+    RateLimiter,
+    parse_rate,
+    rate_limit,
+)
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    def __call__(self):
+        return self.now
+
+class FakeUser:
+    def __init__(self, id):
+        self.id = id
+
+def test_parse_rate():
+    assert parse_rate("20/minute") == (20, 20 / 60)
+    assert parse_rate("5/hours") == (5, 5 / 3600)
+
+def test_token_bucket_refills():
+    clock = FakeClock()
+    backend = InMemoryRateLimitBackend(clock=clock)
+
+    async def scenario():
+        waits = [await backend.take("chat:1", 3, 1.0) for _ in range(4)]
+        clock.now = 2.0
+        waits += [await backend.take("chat:1", 3, 1.0) for _ in range(3)]
+        waits.append(await backend.take("chat:2", 3, 1.0))
+        return waits
+
+    assert asyncio.run(scenario()) == [0, 0, 0, 1.0, 0, 0, 1.0, 0]
+
+def test_route_returns_429_with_retry_after(monkeypatch):
+    monkeypatch.setattr(ratelimit, "rate_limiter", RateLimiter(InMemoryRateLimitBackend(), {"chat": "2/minute"}))
+    app = FastAPI()
+
+    @app.post("/chat", dependencies=[Depends(rate_limit("chat"))])
+    async def chat():
+        return {"reply": "ok"}
+
+    user = FakeUser(1)
+    app.dependency_overrides[get_current_user] = lambda: user
+    client = TestClient(app)
+
+    assert [client.post("/chat").status_code for _ in range(2)] == [200, 200]
+    response = client.post("/chat")
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) == 30
+
+    # Other users have their own bucket
+    user.id = 2
+    assert client.post("/chat").status_code == 200
+
+def test_limiter_fails_open_when_backend_errors():
+    class BrokenBackend(InMemoryRateLimitBackend):
+        async def take(self, *args, **kwargs):
+            raise ConnectionError("redis down")
+
+    limiter = RateLimiter(BrokenBackend(), {"chat": "1/minute"})
+    asyncio.run(limiter.check("chat", 1))
+
+def test_llm_concurrency_is_capped():
+    limiter = LLMConcurrencyLimiter(max_concurrent=2, max_waiting=1, timeout=0.05)
+    peak = 0
+
+    async def call():
+        nonlocal peak
+        async with limiter:
+            peak = max(peak, limiter.active)
+            await asyncio.sleep(0.2)
+
+    async def scenario():
+        return await asyncio.gather(*(call() for _ in range(4)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    overloaded = [r for r in results if isinstance(r, LLMOverloaded)]
+    assert peak == 2
+    # One waiter times out and the queue-full caller is rejected immediately
+    assert len(overloaded) == 2
+    assert limiter.active == 0 and limiter.waiting == 0
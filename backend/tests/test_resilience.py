@@ -0,0 +1,152 @@
+import asyncio
+import time
+import pytest
+from app.core.resilience import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpen,
+    ResiliencePolicy,
+    hedged,
+)
+from app.services import chat as chat_module, gemini, pinecone
+from app.services.fakes import FakeLLM, FaultInjector, InMemoryVectorStore, InjectedFault
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    def __call__(self):
+        return self.now
+
+def test_breaker_opens_and_recovers():
+    clock = FakeClock()
+    breaker = CircuitBreaker("test", failure_threshold=2, recovery_timeout=10, clock=clock)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpen) as exc:
+        breaker.before_call()
+    assert exc.value.retry_after == 10
+
+    clock.now = 10
+    assert breaker.state == HALF_OPEN
+    breaker.before_call()
+    # Only one trial call while half-open
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    clock.now = 20
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.snapshot()["opened"] == 2
+
+def test_policy_retries_then_fails_fast():
+    faults = FaultInjector()
+    llm = FakeLLM(faults=faults)
+    policy = ResiliencePolicy(CircuitBreaker("llm", failure_threshold=2), attempts=2, backoff_base=0.001)
+
+    async def scenario():
+        faults.fail_next(1)
+        assert await policy.call(lambda: llm.generate("hi"))
+        assert faults.calls == 2
+
+        faults.fail_next(10)
+        with pytest.raises(InjectedFault):
+            await policy.call(lambda: llm.generate("hi"))
+        with pytest.raises(CircuitOpen):
+            await policy.call(lambda: llm.generate("hi"))
+        return faults.calls
+
+    # The second call's failures open the breaker; the third never reaches the backend
+    assert asyncio.run(scenario()) == 4
+
+def test_timeouts_count_as_failures():
+    faults = FaultInjector(latency=0.2)
+    store = InMemoryVectorStore(faults=faults)
+    policy = ResiliencePolicy(CircuitBreaker("vectors", failure_threshold=1), timeout=0.01, attempts=1)
+
+    async def scenario():
+        with pytest.raises(asyncio.TimeoutError):
+            await policy.call(lambda: store.query([1.0], 1))
+
+    asyncio.run(scenario())
+    assert policy.breaker.state == OPEN
+
+def test_hedging_cuts_tail_latency():
+    # Every other call is slow; the hedge lands on a fast one
+    class Alternating(FaultInjector):
+        async def __call__(self):
+            self.calls += 1
+            await asyncio.sleep(1.0 if self.calls % 2 else 0.0)
+
+    store = InMemoryVectorStore(faults=Alternating())
+    policy = ResiliencePolicy(CircuitBreaker("vectors"), attempts=1, hedge_after=0.02)
+
+    async def scenario():
+        start = time.perf_counter()
+        await policy.call(lambda: store.query([1.0], 1))
+        return time.perf_counter() - start
+
+    assert asyncio.run(scenario()) < 0.5
+
+def test_cancelling_the_caller_before_the_hedge_cancels_the_call():
+    events = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(1.0)
+        except asyncio.CancelledError:
+            events.append("cancelled")
+            raise
+
+    async def scenario():
+        caller = asyncio.ensure_future(hedged(slow, hedge_after=0.5))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+        # Let the cancelled attempt run its handler (asyncio.run would cancel it anyway)
+        await asyncio.sleep(0)
+        return list(events)
+
+    assert asyncio.run(scenario()) == ["cancelled"]
+
+def test_chat_skips_retrieval_while_vector_store_is_down(monkeypatch):
+    faults = FaultInjector(error_rate=1.0)
+    breaker = CircuitBreaker("pinecone", failure_threshold=2)
+    monkeypatch.setattr(pinecone, "_store", InMemoryVectorStore(faults=faults))
+    monkeypatch.setattr(pinecone, "query_policy", ResiliencePolicy(breaker, attempts=1))
+    monkeypatch.setattr(pinecone, "upsert_policy", ResiliencePolicy(breaker, attempts=1))
+    monkeypatch.setattr(gemini, "_backend", FakeLLM())
+
+    class Log:
+        def append(self, *args):
+            pass
+
+    class Spill(list):
+        def put(self, record):
+            self.append(record)
+
+    service = chat_module.ChatService(log=Log(), spill=Spill())
+
+    async def no_turns(user_id):
+        return []
+    monkeypatch.setattr(service, "_recent_turns", no_turns)
+
+    class User:
+        id = 1
+
+    async def scenario():
+        for _ in range(3):
+            assert await service.get_chat_response(User(), "What is a semicolon for?")
+
+    asyncio.run(scenario())
+    # One failed query and one failed upsert open the breaker; later calls skip the store
+    assert faults.calls == 2
+    assert len(service.spill) == 3
+    assert breaker.rejections == 4
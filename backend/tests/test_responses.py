@@ -0,0 +1,57 @@
+import datetime
+import json
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+from app.core.cache import catalog_version, invalidate_catalog, quiz_body_cache
+from app.core.responses import FastJSONResponse, RawJSONResponse, dumps
+
+class Item(BaseModel):
+    id: int
+    name: str
+
+def test_dumps_matches_stdlib_output():
+    payload = {
+        "deadline": datetime.date(2025, 11, 15),
+        "created_at": datetime.datetime(2025, 3, 1, 12, 30, 5),
+        "correct_answers": {1: 2, 3: 0},
+        "item": Item(id=1, name="Ünïcode"),
+        "scores": [1.5, None, True],
+    }
+    assert json.loads(dumps(payload)) == {
+        "deadline": "2025-11-15",
+        "created_at": "2025-03-01T12:30:05",
+        "correct_answers": {"1": 2, "3": 0},
+        "item": {"id": 1, "name": "Ünïcode"},
+        "scores": [1.5, None, True],
+    }
+    assert b" " not in dumps({"a": [1, 2]})
+
+def test_default_and_direct_responses():
+    app = FastAPI(default_response_class=FastJSONResponse)
+
+    @app.get("/encoded")
+    async def encoded():
+        return {"answers": {1: 2}, "item": Item(id=1, name="a")}
+
+    @app.get("/direct")
+    async def direct():
+        return FastJSONResponse({"deadline": datetime.date(2025, 1, 1)})
+
+    @app.get("/raw")
+    async def raw():
+        return RawJSONResponse(b'{"cached":true}')
+
+    client = TestClient(app)
+    response = client.get("/encoded")
+    assert response.headers["content-type"] == "application/json"
+    assert response.json() == {"answers": {"1": 2}, "item": {"id": 1, "name": "a"}}
+    assert client.get("/direct").json() == {"deadline": "2025-01-01"}
+    assert client.get("/raw").json() == {"cached": True}
+
+def test_quiz_bodies_are_invalidated_with_the_catalog():
+    version = catalog_version.value
+    quiz_body_cache.set("7", version, b'{"id":7}', RawJSONResponse.media_type)
+    assert quiz_body_cache.get("7", version)[0] == b'{"id":7}'
+    invalidate_catalog()
+    assert quiz_body_cache.get("7", catalog_version.value) is None
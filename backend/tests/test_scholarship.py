@@ -0,0 +1,34 @@
+from datetime import date
+from app.services.scholarship import ScholarshipIndex
+
+SCHOLARSHIPS = [
+    {"id": 1, "name": "Early Award", "amount": 5000, "deadline": "2030-01-10", "countries": ["USA"]},
+    {"id": 2, "name": "Late Award", "amount": 20000, "deadline": "2030-06-01", "countries": ["USA", "UK"]},
+    {"id": 3, "name": "Expired Award", "amount": 10000, "deadline": "2029-12-01", "countries": ["UK"]},
+    {"id": 4, "name": "Mid Award", "amount": 15000, "deadline": "2030-03-15", "countries": ["UAE"]},
+]
+
+index = ScholarshipIndex(SCHOLARSHIPS)
+TODAY = date(2030, 1, 1)
+
+def ids(results):
+    return [s["id"] for s in results]
+
+def test_sorted_by_deadline_proximity():
+    assert ids(index.search(today=TODAY)) == [1, 4, 2, 3]
+
+def test_country_partition_is_case_insensitive():
+    assert ids(index.search(country="uk", today=TODAY)) == [2, 3]
+    assert index.search(country="France", today=TODAY) == []
+
+def test_amount_and_deadline_window():
+    results = index.search(
+        min_amount=10000,
+        deadline_after=date(2030, 1, 1),
+        deadline_before=date(2030, 5, 1),
+        today=TODAY,
+    )
+    assert ids(results) == [4]
+
+def test_query_matches_name():
+    assert ids(index.search(query="late", today=TODAY)) == [2]
@@ -0,0 +1,91 @@
+import asyncio
+import os
+import pytest
+from app.core.cache import CatalogVersion
+from app.core.ratelimit import LLMConcurrencyLimiter, LLMOverloaded
+from app.core.shared import SharedArena, SharedSlots, SharedTokenBuckets
+from app.services.jobs import InMemoryJobStore, JobQueue
+
+def run_in_child(fn):
+    pid = os.fork()
+    if pid == 0:
+        try:
+            fn()
+        finally:
+            os._exit(0)
+    os.waitpid(pid, 0)
+
+def test_counters_are_shared_with_forked_workers():
+    arena = SharedArena(counters=2)
+    version = CatalogVersion(arena.counter("catalog_version", initial=1))
+    run_in_child(version.bump)
+    assert version.value == 2
+    assert arena.counter("catalog_version") is arena.counter("catalog_version")
+
+def test_token_buckets_refill_and_are_shared():
+    now = [0.0]
+    buckets = SharedTokenBuckets(slots=16, clock=lambda: now[0])
+    assert buckets.take("chat:1", capacity=2, rate=1.0) == 0
+    run_in_child(lambda: buckets.take("chat:1", capacity=2, rate=1.0))
+    assert buckets.take("chat:1", capacity=2, rate=1.0) == 1.0
+    now[0] = 1.0
+    assert buckets.take("chat:1", capacity=2, rate=1.0) == 0
+    assert buckets.take("chat:2", capacity=2, rate=1.0) == 0
+
+def test_full_probe_window_evicts_least_recent():
+    now = [0.0]
+    buckets = SharedTokenBuckets(slots=4, clock=lambda: now[0])
+    for i in range(20):
+        now[0] = i
+        assert buckets.take(f"user:{i}", capacity=1, rate=0.001) == 0
+    # The most recent key survived eviction
+    assert buckets.take("user:19", capacity=1, rate=0.001) > 0
+
+def test_slots_are_capped_across_processes_and_reclaimed_from_dead_ones():
+    slots = SharedSlots(processes=4)
+    # A worker takes a slot and dies without releasing it
+    run_in_child(lambda: slots.try_acquire(limit=2))
+    assert slots.in_use == 1
+    assert slots.try_acquire(limit=2)
+    # Full: the dead worker's slot is reclaimed
+    assert slots.try_acquire(limit=2)
+    assert not slots.try_acquire(limit=2)
+    slots.release()
+    slots.release()
+    assert slots.in_use == 0
+
+def test_llm_cap_holds_across_workers():
+    slots = SharedSlots(processes=4)
+    limiter = LLMConcurrencyLimiter(max_concurrent=1, max_waiting=1, timeout=0.05, slots=slots)
+    # Another live worker holds the only slot
+    assert slots.try_acquire(limit=1, pid=os.getppid())
+
+    async def call():
+        async with limiter:
+            pass
+
+    with pytest.raises(LLMOverloaded):
+        asyncio.run(call())
+    slots.release(pid=os.getppid())
+    asyncio.run(call())
+    assert slots.in_use == 0 and limiter.active == 0 and limiter.waiting == 0
+
+def test_stop_lets_running_jobs_finish():
+    queue = JobQueue(InMemoryJobStore(), workers=1, poll_interval=0.01)
+    finished = []
+
+    @queue.handler("slow")
+    async def slow(payload, user_id):
+        await asyncio.sleep(0.05)
+        finished.append(payload["n"])
+        return {}
+
+    async def main():
+        await queue.start()
+        job_id = await queue.submit("slow", {"n": 1})
+        await asyncio.sleep(0.01)
+        await queue.stop(timeout=1.0)
+        return (await queue.store.get(job_id))["status"]
+
+    assert asyncio.run(main()) == "succeeded"
+    assert finished == [1]
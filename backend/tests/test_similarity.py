@@ -0,0 +1,40 @@
+from app.services.similarity import (
+    estimate_similarity,
+    minhash_signature,
+    most_similar,
+    shingles,
+)
+
+ESSAY = (
+    "The summer I spent volunteering at the community garden taught me more about patience "
+    "than any classroom ever could. Every morning I watered rows of tomatoes that refused to "
+    "ripen, and every evening I wrote down what had changed. Slowly I learned that growth is "
+    "rarely visible from one day to the next, but it is always there if you keep looking."
+)
+
+def test_shingles_ignore_case_and_punctuation():
+    assert shingles("One, two THREE four!") == shingles("one two three four")
+
+def test_identical_text_has_similarity_one():
+    assert estimate_similarity(minhash_signature(ESSAY), minhash_signature(ESSAY)) == 1.0
+
+def test_trivial_edit_is_near_duplicate():
+    edited = ESSAY.replace("taught me", "has taught me")
+    assert estimate_similarity(minhash_signature(ESSAY), minhash_signature(edited)) > 0.8
+
+def test_unrelated_text_is_not_similar():
+    other = "Photosynthesis converts light energy into chemical energy stored in glucose molecules."
+    assert estimate_similarity(minhash_signature(ESSAY), minhash_signature(other)) < 0.2
+
+def test_most_similar_picks_closest_candidate():
+    signature = minhash_signature(ESSAY)
+    candidates = [
+        (1, minhash_signature("A completely different essay about robotics competitions.")),
+        (2, minhash_signature(ESSAY.replace("tomatoes", "peppers"))),
+    ]
+    essay_id, similarity = most_similar(signature, candidates)
+    assert essay_id == 2
+    assert similarity > 0.7
+
+def test_most_similar_without_candidates():
+    assert most_similar(minhash_signature(ESSAY), []) == (None, 0.0)
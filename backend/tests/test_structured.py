@@ -0,0 +1,75 @@
+import asyncio
+from typing import List
+import pytest
+from pydantic import BaseModel
+from app.utils.structured import (
+    PARSE_STATS,
+    StructuredOutputError,
+    extract_json,
+    generate_structured,
+    parse_failure_rate,
+    parse_structured,
+)
+
+class Card(BaseModel):
+    front: str
+    back: str
+
+def fake_llm(*responses):
+    queue = list(responses)
+    prompts = []
+
+    async def generate(prompt):
+        prompts.append(prompt)
+        return queue.pop(0)
+
+    return generate, prompts
+
+@pytest.mark.parametrize("text", [
+    '{"front": "a", "back": "b"}',
+    '```json\n{"front": "a", "back": "b"}\n```',
+    'Here are your cards:\n```\n{"front": "a", "back": "b"}\n```\nGood luck!',
+    'Sure! {"front": "a", "back": "b"} Let me know if you need more.',
+])
+def test_extract_json_from_common_wrappers(text):
+    assert extract_json(text) == {"front": "a", "back": "b"}
+
+def test_extract_json_without_json_raises():
+    with pytest.raises(StructuredOutputError):
+        extract_json("I could not generate flashcards for that topic.")
+
+def test_parse_structured_validates_schema():
+    cards = parse_structured('[{"front": "x", "back": "y"}]', List[Card])
+    assert cards == [Card(front="x", back="y")]
+
+    with pytest.raises(StructuredOutputError):
+        parse_structured('[{"front": "x"}]', List[Card])
+
+def test_valid_response_needs_no_repair():
+    generate, prompts = fake_llm('```json\n{"front": "a", "back": "b"}\n```')
+
+    card = asyncio.run(generate_structured("make a card", Card, "test_ok", generate))
+
+    assert card.front == "a"
+    assert len(prompts) == 1
+    assert parse_failure_rate("test_ok") == 0.0
+
+def test_invalid_response_is_repaired_once():
+    generate, prompts = fake_llm('{"front": "a"}', '{"front": "a", "back": "b"}')
+
+    card = asyncio.run(generate_structured("make a card", Card, "test_repair", generate))
+
+    assert card.back == "b"
+    assert len(prompts) == 2
+    assert "make a card" not in prompts[1]
+    assert PARSE_STATS["test_repair"]["repaired"] == 1
+    assert parse_failure_rate("test_repair") == 1.0
+
+def test_failed_repair_keeps_original_text():
+    generate, _ = fake_llm("not json at all", "still not json")
+
+    with pytest.raises(StructuredOutputError) as exc:
+        asyncio.run(generate_structured("make a card", Card, "test_fail", generate))
+
+    assert exc.value.raw == "not json at all"
+    assert PARSE_STATS["test_fail"]["failed"] == 1
@@ -0,0 +1,106 @@
+import asyncio
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.core.tracing import InMemorySpanExporter, RatioSampler, Tracer, TracingMiddleware
+
+def make_tracer(rate=1.0, debug=False):
+    exporter = InMemorySpanExporter()
+    return Tracer(RatioSampler(rate), exporter, debug=debug), exporter
+
+def test_sampler_is_deterministic_and_respects_parent():
+    sampler = RatioSampler(0.5)
+    low, high = "0" * 16 + "0" * 16, "0" * 16 + "f" * 16
+    assert sampler.should_sample(low) and not sampler.should_sample(high)
+    assert sampler.should_sample(high, parent_sampled=True)
+    assert not sampler.should_sample(low, parent_sampled=False)
+    assert not RatioSampler(0.0).should_sample(low[:-1] + "1")
+
+def test_spans_nest_under_current_span():
+    tracer, exporter = make_tracer()
+    with tracer.trace("job analyze") as root:
+        with tracer.span("outer") as outer:
+            with tracer.span("inner", step=1):
+                pass
+    inner = exporter.by_name("inner")[0]
+    assert inner.parent_id == outer.span_id
+    assert outer.parent_id == root.span_id
+    assert root.parent_id is None
+    assert {span.trace_id for span in exporter.spans} == {root.trace_id}
+    assert inner.to_dict()["attributes"] == {"step": 1}
+
+def test_incoming_traceparent_is_continued():
+    tracer, exporter = make_tracer(rate=0.0)
+    parent = "00-" + "ab" * 16 + "-" + "cd" * 8 + "-01"
+    with tracer.trace("request", traceparent=parent):
+        pass
+    span = exporter.spans[0]
+    assert span.trace_id == "ab" * 16
+    assert span.parent_id == "cd" * 8
+
+def test_unsampled_traces_are_noops():
+    tracer, exporter = make_tracer(rate=0.0)
+    with tracer.trace("request") as root:
+        with tracer.span("stage") as span:
+            span.set_attribute("ignored", True)
+    assert root is span
+    assert not exporter.spans
+
+def test_errors_are_recorded_on_span():
+    tracer, exporter = make_tracer()
+    try:
+        with tracer.trace("request"):
+            with tracer.span("stage"):
+                raise ValueError("bad input")
+    except ValueError:
+        pass
+    stage = exporter.by_name("stage")[0]
+    assert stage.status == "error"
+    assert stage.to_dict()["status"]["message"] == "ValueError: bad input"
+
+def test_spans_in_concurrent_tasks_stay_separate():
+    tracer, exporter = make_tracer()
+
+    async def handle(name):
+        with tracer.trace(name):
+            await asyncio.sleep(0)
+            with tracer.span(f"{name}.stage"):
+                await asyncio.sleep(0)
+
+    async def main():
+        await asyncio.gather(handle("a"), handle("b"))
+
+    asyncio.run(main())
+    for name in ("a", "b"):
+        assert exporter.by_name(f"{name}.stage")[0].parent_id == exporter.by_name(name)[0].span_id
+
+def make_app(tracer):
+    app = FastAPI()
+    app.add_middleware(TracingMiddleware, tracer=tracer)
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int):
+        with tracer.span("items.load"):
+            pass
+        return {"id": item_id}
+
+    return app
+
+def test_middleware_names_root_span_after_route():
+    tracer, exporter = make_tracer()
+    client = TestClient(make_app(tracer))
+    response = client.get("/items/7")
+    assert response.status_code == 200
+    assert "Server-Timing" not in response.headers
+    root = exporter.by_name("GET /items/{item_id}")[0]
+    assert root.attributes["http.status_code"] == 200
+    assert exporter.by_name("items.load")[0].parent_id == root.span_id
+
+def test_debug_mode_returns_server_timing():
+    tracer, exporter = make_tracer(rate=0.0, debug=True)
+    client = TestClient(make_app(tracer))
+    response = client.get("/items/7")
+    timing = response.headers["Server-Timing"]
+    assert timing.startswith("items.load;dur=")
+    assert "total;dur=" in timing
+    # Recorded for the header, but not exported since the trace is unsampled
+    assert not exporter.spans
@@ -15,8 +15,15 @@ export default function EssayEditor() {
     setError(null);
     
     try {
-      const response = await essayService.submitEssay(content);
-      setFeedback(response.data.feedback);
+      const { data } = await essayService.submitEssay(content);
+      
+      // Analysis runs as a background job; long-poll until it finishes
+      let job = { status: data.status };
+      while (job.status === 'queued' || job.status === 'running') {
+        job = (await essayService.getJob(data.job_id)).data;
+      }
+      if (job.status !== 'succeeded') throw new Error(job.error);
+      setFeedback(job.result.feedback);
     } catch (err) {
       console.error('Error submitting essay:', err);
       setError('Failed to get feedback. Please try again.');
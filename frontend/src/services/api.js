@@ -36,7 +36,7 @@ export const authService = {
 
 export const chatService = {
   sendMessage: (message) => api.post('/chat', { message }),
-  getHistory: () => api.get('/chat/history'),
+  getHistory: (params) => api.get('/chat/history', { params }),
 };
 
 export const quizService = {
@@ -47,6 +47,7 @@ export const quizService = {
 
 export const essayService = {
   submitEssay: (content) => api.post('/essay', { content }),
+  getJob: (jobId, wait = 20) => api.get(`/essay/jobs/${jobId}`, { params: { wait } }),
 };
 
 export const collegeService = {